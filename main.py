@@ -1,6 +1,7 @@
 from dify_plugin import Plugin, DifyPluginEnv
 
-plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=120))
-
 if __name__ == '__main__':
+    # Created only in the main process: preprocessing workers (tools/preprocess.py)
+    # are spawned and re-import this module, and must not start a second plugin
+    plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=120))
     plugin.run()
@@ -1,12 +1,36 @@
 from typing import Any
+import time
 import requests
 
 from dify_plugin import ToolProvider
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
 
+from tools import metrics
+
+
+def _get(target: str, url: str, headers: dict) -> requests.Response:
+    try:
+        resp = requests.get(url, headers=headers, timeout=15)
+    except Exception:
+        metrics.VALIDATION_REQUESTS.inc(target, "error")
+        raise
+    metrics.VALIDATION_REQUESTS.inc(target, str(resp.status_code))
+    return resp
+
 
 class OpenaiAudioProvider(ToolProvider):
     def _validate_credentials(self, credentials: dict[str, Any]) -> None:
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            self._validate(credentials)
+            outcome = "ok"
+        finally:
+            metrics.CREDENTIAL_VALIDATIONS.inc(outcome)
+            metrics.CREDENTIAL_VALIDATION_SECONDS.observe(time.monotonic() - started)
+            metrics.REGISTRY.maybe_export()
+
+    def _validate(self, credentials: dict[str, Any]) -> None:
         try:
             # Normalize endpoints
             def _norm(ep: str | None) -> str | None:
@@ -32,7 +56,7 @@ class OpenaiAudioProvider(ToolProvider):
                 headers = {"api-key": azure_api_key}
                 def _list_deployments(endpoint: str, version: str):
                     url = f"{endpoint}/openai/deployments?api-version={version}"
-                    r = requests.get(url, headers=headers, timeout=15)
+                    r = _get("azure_transcribe", url, headers)
                     return r
                 resp = _list_deployments(azure_endpoint, azure_api_version)
                 # Fallback to older preview version if resource returns 404 Resource not found
@@ -80,13 +104,13 @@ class OpenaiAudioProvider(ToolProvider):
                     raise ValueError("Azure Whisper API key is required when azure_endpoint_whisper is set")
                 headers = {"api-key": whisper_api_key}
                 url = f"{whisper_endpoint}/openai/deployments?api-version={whisper_api_version}"
-                resp = requests.get(url, headers=headers, timeout=15)
+                resp = _get("azure_whisper", url, headers)
                 # Allow 404 fallback for older deployments listing APIs
                 if resp.status_code == 404:
                     for fv in ["2024-02-01", "2024-02-15-preview", "2023-03-15-preview"]:
                         if fv == whisper_api_version:
                             continue
-                        r2 = requests.get(f"{whisper_endpoint}/openai/deployments?api-version={fv}", headers=headers, timeout=15)
+                        r2 = _get("azure_whisper", f"{whisper_endpoint}/openai/deployments?api-version={fv}", headers)
                         if r2.status_code == 200:
                             resp = r2
                             whisper_api_version = fv
@@ -116,7 +140,7 @@ class OpenaiAudioProvider(ToolProvider):
                 api_key = credentials.get("api_key")
                 if api_key:
                     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-                    response = requests.get("https://api.openai.com/v1/models", headers=headers, timeout=15)
+                    response = _get("openai", "https://api.openai.com/v1/models", headers)
                     if response.status_code != 200:
                         error_message = f"API key validation failed with status code: {response.status_code}"
                         try:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Plugin cold start: import time of the tool and provider modules and latency
+of the first (and second) invocation, each run in a fresh interpreter.
+
+Uses the dify_plugin stand-in from test_harness and an in-process fake for
+requests.post, so the numbers are plugin code only (no network, no SDK).
+Also lists which deferred modules were loaded after import and after the
+first plain invocation; they should only appear once a request needs them.
+
+The budgets below are enforced by tests/test_cold_start.py."""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+SCRIPTS = pathlib.Path(__file__).resolve().parent
+
+# Regression budget; generous against CI noise, tight enough to catch an eager heavy import
+IMPORT_BUDGET_SECONDS = 0.5
+FIRST_INVOCATION_BUDGET_SECONDS = 0.25
+# Optional subsystems that must not be loaded by import or a plain transcription
+DEFERRED_MODULES = (
+    "numpy",
+    "sqlite3",
+    "multiprocessing",
+    "concurrent.futures.process",
+    "http.server",
+    "tools.job_store",
+    "tools.preprocess",
+    "tools.profiling",
+)
+
+CHILD = r"""
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, SCRIPTS)
+import test_harness  # dify_plugin stand-in + tools.openai_audio
+import provider.openai_audio
+t1 = time.perf_counter()
+after_import = [m for m in DEFERRED if m in sys.modules]
+
+import requests
+class _Resp:
+    status_code = 200
+    text = "hello"
+    content = b'{"text": "hello"}'
+    def json(self):
+        return {"text": "hello"}
+requests.post = lambda *a, **k: _Resp()
+wav = (b"RIFF" + (36 + 16000).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little")
+       + bytes.fromhex("01000100803e0000007d00000200 1000".replace(" ", ""))
+       + b"data" + (16000).to_bytes(4, "little") + b"\x00" * 16000)
+params = {"file": {"name": "a.wav", "type": "audio/wav", "content": wav}, "model": "whisper-1", "response_format": "json"}
+tool = test_harness.OpenaiAudioTool()
+tool.runtime.credentials = {"api_key": "k"}
+t2 = time.perf_counter()
+list(tool._invoke(dict(params)))
+t3 = time.perf_counter()
+list(tool._invoke(dict(params)))
+t4 = time.perf_counter()
+after_first = [m for m in DEFERRED if m in sys.modules]
+
+import json
+print(json.dumps({
+    "import_seconds": t1 - t0,
+    "first_invocation_seconds": t3 - t2,
+    "second_invocation_seconds": t4 - t3,
+    "deferred_loaded_after_import": after_import,
+    "deferred_loaded_after_first_invocation": after_first,
+}))
+"""
+
+
+def measure_once() -> dict:
+    code = f"SCRIPTS = {str(SCRIPTS)!r}\nDEFERRED = {DEFERRED_MODULES!r}\n" + CHILD
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=SCRIPTS.parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int = 5) -> dict:
+    """Median timings over ``runs`` fresh processes; module lists from the last run."""
+    samples = [measure_once() for _ in range(runs)]
+    result = dict(samples[-1])
+    for key in ("import_seconds", "first_invocation_seconds", "second_invocation_seconds"):
+        result[key] = statistics.median(s[key] for s in samples)
+    return result
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args()
+    r = measure(args.runs)
+    print(f"import            {r['import_seconds'] * 1000:7.1f} ms   (budget {IMPORT_BUDGET_SECONDS * 1000:.0f} ms)")
+    print(f"first invocation  {r['first_invocation_seconds'] * 1000:7.1f} ms   (budget {FIRST_INVOCATION_BUDGET_SECONDS * 1000:.0f} ms)")
+    print(f"second invocation {r['second_invocation_seconds'] * 1000:7.1f} ms")
+    print(f"deferred modules loaded after import: {r['deferred_loaded_after_import'] or 'none'}")
+    print(f"deferred modules loaded after first invocation: {r['deferred_loaded_after_first_invocation'] or 'none'}")
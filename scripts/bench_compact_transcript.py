@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Parse time and memory of a synthetic verbose_json transcript (default 2h),
+as plain dicts versus CompactTranscript columns.
+
+The first table decodes the body directly; "retained" is what is left after
+decoding, "peak" the high-water mark while doing it. The second table runs the
+tool's real response path (``_invoke`` with a stubbed ``requests.post``) per
+``output_format`` and reports the peak of parsing alone (result formatting
+stubbed out) and of the whole invocation."""
+import argparse
+import gc
+import json
+import pathlib
+import random
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools.compact_transcript import CompactTranscript, loads, loads_compact, orjson  # noqa: E402
+
+WORDS = "the quick brown fox jumps over a lazy dog while we talk about audio models and timestamps".split()
+
+
+def synthetic_verbose_json(hours: float, seed: int = 0) -> bytes:
+    # ~2.6 words/s speech, segments of ~12 words, Whisper-style segment fields
+    rnd = random.Random(seed)
+    words, segments = [], []
+    t = 0.0
+    end_time = hours * 3600
+    while t < end_time:
+        seg_words = []
+        for _ in range(rnd.randint(8, 16)):
+            d = round(rnd.uniform(0.15, 0.6), 2)
+            seg_words.append({"word": rnd.choice(WORDS), "start": round(t, 2), "end": round(t + d, 2)})
+            t += d + round(rnd.uniform(0.0, 0.1), 2)
+        words.extend(seg_words)
+        segments.append({
+            "id": len(segments),
+            "seek": int(seg_words[0]["start"] * 100) // 3000 * 3000,
+            "start": seg_words[0]["start"],
+            "end": seg_words[-1]["end"],
+            "text": " " + " ".join(w["word"] for w in seg_words),
+            "tokens": [rnd.randint(100, 50000) for _ in range(len(seg_words) + 2)],
+            "temperature": 0.0,
+            "avg_logprob": round(rnd.uniform(-0.6, -0.1), 6),
+            "compression_ratio": round(rnd.uniform(1.2, 1.8), 6),
+            "no_speech_prob": round(rnd.uniform(0.0, 0.05), 6),
+        })
+    text = "".join(s["text"] for s in segments).strip()
+    result = {"task": "transcribe", "language": "english", "duration": round(t, 2), "text": text, "segments": segments, "words": words}
+    return json.dumps(result).encode()
+
+
+def _wav(seconds: float = 0.5) -> bytes:
+    data = b"\x00" * int(16000 * 2 * seconds)
+    fmt = (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + (16000).to_bytes(4, "little") + (32000).to_bytes(4, "little")
+    fmt += (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+    return b"RIFF" + (36 + len(data)).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little") + fmt + b"data" + len(data).to_bytes(4, "little") + data
+
+
+def measure_tool_path(body: bytes) -> None:
+    """Peak memory of the tool's own response handling for each output format."""
+    import test_harness  # dify_plugin stand-in; must come before tools.openai_audio
+    import requests
+    import tools.openai_audio as openai_audio
+
+    class Resp:
+        status_code = 200
+        content = body
+        text = ""
+        def json(self):
+            return loads(body)
+
+    requests.post = lambda *a, **k: Resp()
+    tool = test_harness.OpenaiAudioTool()
+    tool.runtime.credentials = {"api_key": "k"}
+    params = {
+        "file": {"name": "a.wav", "type": "audio/wav", "content": _wav()},
+        "model": "whisper-1",
+        "response_format": "verbose_json",
+        "timestamp_granularities": "segment_and_word",
+        "stream": False,
+    }
+    format_result = openai_audio.OpenaiAudioTool._format_result
+
+    def invoke(output_format: str, parse_only: bool) -> None:
+        # parse_only: the result is dropped as soon as the response is parsed
+        openai_audio.OpenaiAudioTool._format_result = (lambda self, *a, **k: iter(())) if parse_only else format_result
+        try:
+            list(tool._invoke(dict(params, output_format=output_format)))
+        finally:
+            openai_audio.OpenaiAudioTool._format_result = format_result
+
+    print("\ntool response path (OPENAI_AUDIO_COMPACT_MIN_KB=%d)" % (openai_audio.COMPACT_MIN_BYTES // 1024))
+    for output_format in ("json_only", "text_only", "default", "file"):
+        for parse_only in (True, False):
+            label = f"{output_format}: {'parse' if parse_only else 'invoke'}"
+            measure(label, lambda: invoke(output_format, parse_only), repeat=3)
+
+
+def _timed(build) -> float:
+    t0 = time.perf_counter()
+    build()
+    return time.perf_counter() - t0
+
+
+def measure(label: str, build, repeat: int = 5) -> object:
+    # Time without tracing, then measure memory in a separate traced run
+    elapsed = min(_timed(build) for _ in range(repeat))
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms   retained {retained / 1e6:7.1f} MB   peak {peak / 1e6:7.1f} MB")
+    return obj
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--hours", type=float, default=2.0)
+    args = p.parse_args()
+
+    body = synthetic_verbose_json(args.hours)
+    probe = json.loads(body)
+    print(f"body: {len(body) / 1e6:.1f} MB, {len(probe['segments'])} segments, {len(probe['words'])} words"
+          f" (decoder: {'orjson' if orjson else 'json'})")
+    del probe
+
+    measure("json.loads -> dicts", lambda: json.loads(body))
+    measure("loads -> dicts", lambda: loads(body))
+    measure("loads -> from_result", lambda: CompactTranscript.from_result(loads(body)))
+    compact = measure("loads_compact", lambda: loads_compact(body))
+    plain = measure("CompactTranscript.to_dict", compact.to_dict)
+    assert plain == json.loads(body)
+    t0 = time.perf_counter()
+    compact.text
+    print(f"{'text only':<28} {(time.perf_counter() - t0) * 1000:8.3f} ms   (no dicts built)")
+    print(f"column payload: {compact.nbytes() / 1e6:.1f} MB")
+    measure_tool_path(body)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Time Mp3FrameIndex.build/split on a synthetic CBR stream (default ~200MB)."""
+import argparse
+import pathlib
+import struct
+import sys
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools.audio_probe import parse_mp3_header  # noqa: E402
+from tools.mp3_frames import Mp3FrameIndex  # noqa: E402
+
+
+def synthetic_mp3(megabytes: int) -> bytes:
+    # 128kbps / 44.1kHz MPEG1 Layer III; padding on every third frame like a real encoder
+    block = bytearray()
+    for i in range(300):
+        header = 0xFFFB9000 | ((i % 3 == 0) << 9)
+        block += struct.pack(">I", header) + b"\x55" * (parse_mp3_header(header).frame_length - 4)
+    return bytes(block) * (megabytes * 1024 * 1024 // len(block))
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--mb", type=int, default=200)
+    p.add_argument("--part-mb", type=int, default=25)
+    args = p.parse_args()
+
+    data = synthetic_mp3(args.mb)
+    t0 = time.perf_counter()
+    index = Mp3FrameIndex.build(data)
+    t1 = time.perf_counter()
+    parts = index.split(data, args.part_mb * 1024 * 1024)
+    t2 = time.perf_counter()
+    print(f"input: {len(data) / 1e6:.1f} MB, {len(index)} frames, {index.duration / 3600:.2f} h")
+    print(f"index: {t1 - t0:.3f}s ({len(data) / 1e6 / (t1 - t0):.0f} MB/s), index size {(index.offsets.itemsize + index.samples.itemsize) * len(index.offsets) / 1e6:.1f} MB")
+    print(f"split: {t2 - t1:.3f}s into {len(parts)} parts")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Preprocessing throughput and I/O-thread responsiveness, inline versus the process pool.
+
+N threads (standing in for concurrent invocations) each index and split a
+synthetic MP3 of --mb megabytes; a probe thread meanwhile wakes every
+millisecond like an HTTP thread waiting on a socket and records how late it
+runs. Inline, the stages hold the GIL: throughput stays flat as N grows and
+the probe lag climbs. In the pool, throughput scales with cores and the probe
+stays on time."""
+import argparse
+import os
+import pathlib
+import statistics
+import sys
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools.audio_probe import parse_mp3_header  # noqa: E402
+from tools.preprocess import PreprocessPool, split_mp3  # noqa: E402
+
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+
+def synthetic_mp3(megabytes: float) -> bytes:
+    # 128kbps 44.1kHz MPEG1 Layer III frames with zeroed payloads
+    header = 0xFFFB9000
+    frame = header.to_bytes(4, "big") + b"\x00" * (parse_mp3_header(header).frame_length - 4)
+    return frame * int(megabytes * 1024 * 1024 // len(frame))
+
+
+def probe(stop: threading.Event, lags: list) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        time.sleep(0.001)
+        lags.append(time.perf_counter() - t0 - 0.001)
+
+
+def run(pool: PreprocessPool, data: bytes, threads: int, rounds: int) -> tuple[float, list]:
+    stop = threading.Event()
+    lags: list = []
+    prober = threading.Thread(target=probe, args=(stop, lags))
+    prober.start()
+
+    def work():
+        for _ in range(rounds):
+            split_mp3(pool, data, MAX_UPLOAD_BYTES)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    return elapsed, lags
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--mb", type=float, default=60.0)
+    p.add_argument("--rounds", type=int, default=2)
+    p.add_argument("--threads", default="1,2,4")
+    args = p.parse_args()
+
+    data = synthetic_mp3(args.mb)
+    print(f"input: {len(data) / 1e6:.1f} MB MP3, {os.cpu_count()} CPUs")
+    for n in [int(x) for x in args.threads.split(",")]:
+        for label, pool in (("inline", PreprocessPool(0)), ("pool", PreprocessPool(n, min_bytes=0))):
+            if pool.max_workers:
+                split_mp3(pool, data[:1 << 20], MAX_UPLOAD_BYTES)  # start the workers outside the timing
+            elapsed, lags = run(pool, data, n, args.rounds)
+            pool.shutdown()
+            mb = len(data) * n * args.rounds / 1e6
+            lags.sort()
+            p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+            print(
+                f"threads={n:<2} {label:<6} {mb / elapsed:8.1f} MB/s   "
+                f"probe lag median {statistics.median(lags) * 1000 if lags else 0:6.2f} ms  p99 {p99 * 1000:7.2f} ms"
+            )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Result delivery cost for a synthetic verbose_json transcript (default 2h):
+inline JSON + text messages versus one file message with an inline summary.
+
+"host" simulates the Dify side serializing every message it receives
+(json.dumps of the message; blobs are passed on as bytes)."""
+import argparse
+import gc
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+SCRIPTS = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS))
+
+# test_harness puts the repo on sys.path and installs the dify_plugin stand-in
+from test_harness import OpenaiAudioTool  # noqa: E402
+import tools.openai_audio as openai_audio  # noqa: E402
+from bench_compact_transcript import synthetic_verbose_json  # noqa: E402
+from tools.compact_transcript import CompactTranscript, loads  # noqa: E402
+
+
+def deliver(tool, result, offload_min: int) -> int:
+    openai_audio.OFFLOAD_MIN_BYTES = offload_min
+    sent = 0
+    for msg in tool._format_result(result, {"audio_duration": 0.0}, "default", "verbose_json", "call.wav"):
+        if msg.type == "blob":
+            sent += len(msg.data["blob"])
+        else:
+            sent += len(json.dumps(msg.to_dict(), ensure_ascii=False).encode())
+    return sent
+
+
+def measure(label: str, run, repeat: int = 3) -> None:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    sent = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {min(times) * 1000:8.1f} ms   sent {sent / 1e6:6.1f} MB   peak {peak / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--hours", type=float, default=2.0)
+    args = p.parse_args()
+
+    body = synthetic_verbose_json(args.hours)
+    print(f"body: {len(body) / 1e6:.1f} MB")
+    tool = OpenaiAudioTool()
+    plain = loads(body)
+    compact = CompactTranscript.from_result(loads(body))
+    measure("dicts: inline JSON + text", lambda: deliver(tool, plain, 0))
+    measure("dicts: file + summary", lambda: deliver(tool, plain, 1))
+    measure("compact: inline JSON + text", lambda: deliver(tool, compact, 0))
+    measure("compact: file + summary", lambda: deliver(tool, compact, 1))
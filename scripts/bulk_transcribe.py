@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Bulk transcription of a directory tree (or file list) with OpenaiAudioTool.
+
+Results are appended to a JSONL file as each file finishes, and a manifest
+records every finished file so that an interrupted run can be restarted with
+the same arguments without redoing completed work.
+
+Examples:
+    python scripts/bulk_transcribe.py recordings/ --out results.jsonl --workers 8
+    python scripts/bulk_transcribe.py --file-list todo.txt --out results.jsonl --mock
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Iterable, Iterator, Optional
+
+# Reuse the harness: it installs the dify_plugin mock and puts the repo on sys.path
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from test_harness import (  # noqa: E402
+    AUDIO_MIME_TYPES,
+    OpenaiAudioTool,
+    guess_mime,
+    install_mock_http,
+    load_env_credentials,
+)
+
+
+def iter_audio_files(root: pathlib.Path, extensions: set[str]) -> Iterator[pathlib.Path]:
+    """Walk ``root`` depth-first in a stable (sorted) order, yielding audio files."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name, reverse=True)
+        except (NotADirectoryError, FileNotFoundError):
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(pathlib.Path(entry.path))
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                yield pathlib.Path(entry.path)
+
+
+def iter_file_list(list_path: pathlib.Path) -> Iterator[pathlib.Path]:
+    for line in list_path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield pathlib.Path(line)
+
+
+def manifest_key(path: pathlib.Path) -> str:
+    # Absolute and symlink-free, so a relative or linked re-run finds the same entries
+    return str(path.resolve())
+
+
+class Manifest:
+    """Append-only JSONL record of finished files, keyed by resolved path + size + mtime."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.done: dict[str, dict] = {}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a truncated last line; ignore it
+                    continue
+                self.done[entry["path"]] = entry
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def is_done(self, file_path: pathlib.Path, size: int, mtime: float, retry_failed: bool = True) -> bool:
+        # Manifests written before paths were resolved are keyed by the path as given
+        entry = self.done.get(manifest_key(file_path)) or self.done.get(str(file_path))
+        if not entry or entry.get("size") != size or entry.get("mtime") != mtime:
+            return False
+        return entry.get("status") == "ok" or not retry_failed
+
+    def record(self, entry: dict) -> None:
+        self.done[entry["path"]] = entry
+        self._fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class ParquetSink:
+    """Optional columnar output: rows are buffered and flushed as numbered part files."""
+
+    def __init__(self, directory: pathlib.Path, batch_size: int):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("--parquet-dir requires pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.rows: list[dict] = []
+        directory.mkdir(parents=True, exist_ok=True)
+        self._part = len(list(directory.glob("part-*.parquet")))
+
+    def add(self, row: dict) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        import pyarrow
+        import pyarrow.parquet
+
+        columns = ["path", "status", "text", "error", "bytes", "elapsed"]
+        table = pyarrow.table({c: [r.get(c) for r in self.rows] for c in columns})
+        pyarrow.parquet.write_table(table, self.directory / f"part-{self._part:05d}.parquet")
+        self._part += 1
+        self.rows = []
+
+
+class Progress:
+    """Throughput/ETA reporter, printed to stderr at most every ``interval`` seconds."""
+
+    def __init__(self, total: int, interval: float = 5.0):
+        self.total = total
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = 0.0
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def update(self, ok: bool, nbytes: int) -> None:
+        self.done += 1
+        self.bytes += nbytes
+        if not ok:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self.last_report >= self.interval or self.done == self.total:
+            self.last_report = now
+            print(self.line(now), file=sys.stderr, flush=True)
+
+    def line(self, now: Optional[float] = None) -> str:
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        rate = self.done / elapsed
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else float("inf")
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+        return (
+            f"[bulk] {self.done}/{self.total} done ({self.failed} failed) "
+            f"{rate:.2f} files/s {self.bytes / elapsed / 1e6:.2f} MB/s ETA {eta_text}"
+        )
+
+
+def transcribe_file(path: pathlib.Path, creds: dict, tool_params: dict) -> dict:
+    """Run one file through the tool and return a result row (never raises)."""
+    started = time.monotonic()
+    row: dict[str, Any] = {"path": str(path), "name": path.name}
+    try:
+        data = path.read_bytes()
+        row["bytes"] = len(data)
+        tool = OpenaiAudioTool()
+        tool.runtime = types.SimpleNamespace(credentials=creds)
+        params = dict(tool_params)
+        params["file"] = {"name": path.name, "type": guess_mime(path), "content": data}
+        result = None
+        texts = []
+        for msg in tool._invoke(params):
+            if msg.type == "json":
+                result = msg.data.get("result")
+            elif msg.type == "text":
+                texts.append(msg.text)
+        if isinstance(result, dict) and "text" in result:
+            row["text"] = result["text"]
+        else:
+            row["text"] = "".join(texts)
+        row["result"] = result
+        row["status"] = "ok"
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = str(e)
+    row["elapsed"] = round(time.monotonic() - started, 3)
+    return row
+
+
+def run_bulk(
+    files: Iterable[pathlib.Path],
+    creds: dict,
+    tool_params: dict,
+    out_path: pathlib.Path,
+    manifest_path: pathlib.Path,
+    workers: int = 4,
+    retry_failed: bool = True,
+    parquet: Optional[ParquetSink] = None,
+    progress_interval: float = 5.0,
+) -> Progress:
+    manifest = Manifest(manifest_path)
+    pending = []
+    skipped = 0
+    for path in files:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if manifest.is_done(path, st.st_size, st.st_mtime, retry_failed=retry_failed):
+            skipped += 1
+            continue
+        pending.append((path, st.st_size, st.st_mtime))
+    if skipped:
+        print(f"[bulk] resuming: {skipped} files already in manifest", file=sys.stderr)
+
+    progress = Progress(len(pending), interval=progress_interval)
+    out_fh = open(out_path, "a", encoding="utf-8")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of in-flight files so memory stays proportional to workers
+            queue = iter(pending)
+            inflight = {}
+
+            def _submit_next() -> bool:
+                item = next(queue, None)
+                if item is None:
+                    return False
+                inflight[pool.submit(transcribe_file, item[0], creds, tool_params)] = item
+                return True
+
+            for _ in range(workers * 2):
+                if not _submit_next():
+                    break
+            while inflight:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path, size, mtime = inflight.pop(fut)
+                    row = fut.result()
+                    # Output first, manifest second: a crash in between re-runs the file
+                    # (duplicate row) instead of losing its result.
+                    out_fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    out_fh.flush()
+                    if parquet is not None:
+                        parquet.add(row)
+                    manifest.record({
+                        "path": manifest_key(path),
+                        "size": size,
+                        "mtime": mtime,
+                        "status": row["status"],
+                        "error": row.get("error"),
+                        "elapsed": row["elapsed"],
+                    })
+                    progress.update(row["status"] == "ok", row.get("bytes", 0))
+                    _submit_next()
+    finally:
+        out_fh.close()
+        manifest.close()
+        if parquet is not None:
+            parquet.flush()
+    return progress
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Bulk transcription with a resumable manifest")
+    p.add_argument("source", nargs="?", help="Directory to walk recursively")
+    p.add_argument("--file-list", help="Text file with one audio path per line")
+    p.add_argument("--out", required=True, help="JSONL output file (appended to)")
+    p.add_argument("--manifest", help="Manifest path (default: <out>.manifest.jsonl)")
+    p.add_argument("--parquet-dir", help="Also write batched Parquet part files here (needs pyarrow)")
+    p.add_argument("--batch-size", type=int, default=500, help="Rows per Parquet part file")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--extensions", default=",".join(sorted(AUDIO_MIME_TYPES)), help="Comma-separated extensions to include")
+    p.add_argument("--no-retry-failed", action="store_true", help="Skip files that failed in a previous run")
+    p.add_argument("--progress-interval", type=float, default=5.0)
+    p.add_argument("--provider", choices=["openai", "azure"], default="openai")
+    p.add_argument("--model", default="gpt-4o-transcribe")
+    p.add_argument("--translate", action="store_true")
+    p.add_argument("--response-format", default="text", choices=["text", "json", "verbose_json", "srt", "vtt"])
+    p.add_argument("--language", default="")
+    p.add_argument("--azure-deployment", default=None)
+    p.add_argument("--priority", default="bulk", choices=["bulk", "interactive", "auto"], help="Scheduling lane (default: bulk)")
+    p.add_argument("--mock", action="store_true", help="Mock HTTP calls (no network)")
+    args = p.parse_args()
+
+    if not args.source and not args.file_list:
+        p.error("provide a source directory or --file-list")
+
+    creds = load_env_credentials()
+    if args.provider == "openai" and "api_key" not in creds and not args.mock:
+        print("Missing OPENAI_API_KEY in .env", file=sys.stderr)
+        sys.exit(1)
+    if args.azure_deployment:
+        creds["azure_deployment"] = args.azure_deployment
+    if args.mock:
+        install_mock_http(creds)
+        creds.setdefault("api_key", "mock")
+
+    if args.file_list:
+        files: Iterable[pathlib.Path] = iter_file_list(pathlib.Path(args.file_list))
+    else:
+        exts = {e if e.startswith(".") else f".{e}" for e in args.extensions.split(",") if e}
+        files = iter_audio_files(pathlib.Path(args.source), exts)
+
+    tool_params = {
+        "transcription_type": "translate" if args.translate else "transcribe",
+        "model": args.model,
+        "response_format": args.response_format,
+        "language": args.language,
+        "stream": False,
+        "output_format": "json_only",
+        # Backfills must not take capacity from interactive callers in the same process
+        "priority": args.priority,
+    }
+    if args.azure_deployment:
+        tool_params["azure_deployment"] = args.azure_deployment
+
+    out_path = pathlib.Path(args.out)
+    manifest_path = pathlib.Path(args.manifest) if args.manifest else out_path.with_name(out_path.name + ".manifest.jsonl")
+    parquet = ParquetSink(pathlib.Path(args.parquet_dir), args.batch_size) if args.parquet_dir else None
+
+    progress = run_bulk(
+        files,
+        creds,
+        tool_params,
+        out_path,
+        manifest_path,
+        workers=args.workers,
+        retry_failed=not args.no_retry_failed,
+        parquet=parquet,
+        progress_interval=args.progress_interval,
+    )
+    print(progress.line(), file=sys.stderr)
+    sys.exit(1 if progress.failed else 0)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""Record/replay of HTTP exchanges with the OpenAI/Azure audio endpoints.
+
+A cassette is a JSON file of interactions: the request (method, path+query,
+form fields, upload name, bytes sent) and the response (status, headers and
+body chunks with their arrival offsets). Recording wraps the real
+``requests.post``/``requests.get``; replay serves the recorded responses
+offline as real ``requests.Response`` objects, sleeping to reproduce the
+original timing, so SSE streams arrive at their recorded pace.
+
+Replay is strict: a request with no matching unplayed interaction raises
+``CassetteMismatch``, and ``calls``/``summary()`` expose what the code under
+test actually sent, so tests can pin upload counts, bytes and fallbacks.
+API keys and request headers are never written to a cassette.
+
+Record the bundled scenarios against the local stand-in server:
+
+    python scripts/cassette.py record tests/cassettes
+"""
+import base64
+import io
+import json
+import pathlib
+import sys
+import threading
+import time
+import wave
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_VERSION = 1
+# Response headers kept in cassettes
+_KEPT_HEADERS = ("Content-Type",)
+
+
+class CassetteMismatch(Exception):
+    pass
+
+
+def _path_of(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def _fields_of(data: Any) -> dict:
+    return json.loads(json.dumps(data or {}, sort_keys=True, default=str))
+
+
+def _encode_chunk(offset: float, chunk: bytes) -> dict:
+    try:
+        return {"t": round(offset, 4), "text": chunk.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"t": round(offset, 4), "b64": base64.b64encode(chunk).decode()}
+
+
+def _decode_chunk(chunk: dict) -> bytes:
+    return chunk["text"].encode("utf-8") if "text" in chunk else base64.b64decode(chunk["b64"])
+
+
+def _body_length(body: Any) -> int:
+    if body is None:
+        return 0
+    return len(body.encode() if isinstance(body, str) else body)
+
+
+class _ReplayRaw:
+    """Stands in for urllib3's response: yields recorded chunks at their offsets."""
+
+    def __init__(self, chunks: list[dict], started: float, speed: float):
+        self._chunks = chunks
+        self._started = started
+        self._speed = speed
+        self.released = False
+
+    def stream(self, amt=None, decode_content=True):
+        try:
+            for chunk in self._chunks:
+                delay = self._started + chunk["t"] / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.released:
+                    return
+                yield _decode_chunk(chunk)
+        finally:
+            # A drained body hands its connection back to the pool
+            self.released = True
+
+    def close(self) -> None:
+        self.released = True
+
+    def release_conn(self) -> None:
+        self.released = True
+
+
+class Cassette:
+    """Context manager patching ``requests.post``/``requests.get`` to record or replay."""
+
+    def __init__(self, path: str, mode: str = "replay", speed: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        self.path = pathlib.Path(path)
+        self.mode = mode
+        self.speed = speed
+        self.interactions: list[dict] = []
+        self.duration = 0.0
+        # Requests made while the cassette was active, in order
+        self.calls: list[dict] = []
+        self._played: set[int] = set()
+        self._raws: list[_ReplayRaw] = []
+        self._lock = threading.Lock()
+        self._saved: dict = {}
+        self._started = 0.0
+        if mode == "replay":
+            doc = json.loads(self.path.read_text(encoding="utf-8"))
+            if doc.get("version") != CASSETTE_VERSION:
+                raise CassetteMismatch(f"{self.path}: unsupported cassette version {doc.get('version')}")
+            self.interactions = doc["interactions"]
+            self.duration = doc.get("duration", 0.0)
+
+    def __enter__(self) -> "Cassette":
+        self._saved = {"post": requests.post, "get": requests.get}
+        handler = self._record if self.mode == "record" else self._replay
+        requests.post = lambda url, **kw: handler("POST", url, kw)  # type: ignore[assignment]
+        requests.get = lambda url, **kw: handler("GET", url, kw)  # type: ignore[assignment]
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        requests.post = self._saved["post"]  # type: ignore[assignment]
+        requests.get = self._saved["get"]  # type: ignore[assignment]
+        if self.mode == "record" and exc_type is None:
+            self.duration = round(time.monotonic() - self._started, 4)
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        doc = {"version": CASSETTE_VERSION, "duration": self.duration, "interactions": self.interactions}
+        self.path.write_text(json.dumps(doc, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    @staticmethod
+    def _request_key(method: str, url: str, kwargs: dict) -> dict:
+        files = kwargs.get("files") or {}
+        upload = files.get("file")
+        return {
+            "method": method,
+            "path": _path_of(url),
+            "fields": _fields_of(kwargs.get("data")),
+            "file": upload[0] if upload else None,
+        }
+
+    def _log_call(self, request: dict, status: int, bytes_sent: int) -> None:
+        with self._lock:
+            self.calls.append(dict(request, status=status, bytes_sent=bytes_sent))
+
+    def _record(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        request = self._request_key(method, url, kwargs)
+        started = time.monotonic()
+        real = self._saved["post" if method == "POST" else "get"]
+        response = real(url, **kwargs)
+        elapsed = time.monotonic() - started
+        bytes_sent = _body_length(response.request.body) if response.request is not None else 0
+        interaction = {
+            "request": dict(request, bytes_sent=bytes_sent),
+            "response": {
+                "status": response.status_code,
+                "headers": {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers},
+                "elapsed": round(elapsed, 4),
+                "chunks": [],
+            },
+        }
+        chunks = interaction["response"]["chunks"]
+        if kwargs.get("stream"):
+            original = response.raw.stream
+
+            def stream(*args, **kw):
+                for chunk in original(*args, **kw):
+                    chunks.append(_encode_chunk(time.monotonic() - started, chunk))
+                    yield chunk
+
+            response.raw.stream = stream
+        elif response.content:
+            chunks.append(_encode_chunk(elapsed, response.content))
+        with self._lock:
+            self.interactions.append(interaction)
+        self._log_call(request, response.status_code, bytes_sent)
+        return response
+
+    def _replay(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        started = time.monotonic()
+        request = self._request_key(method, url, kwargs)
+        with self._lock:
+            for index, interaction in enumerate(self.interactions):
+                recorded = {k: interaction["request"].get(k) for k in request}
+                if index not in self._played and recorded == request:
+                    self._played.add(index)
+                    break
+            else:
+                raise CassetteMismatch(f"no unplayed interaction in {self.path.name} for {method} {request['path']} {request['fields']}")
+
+        # Same body the real call would send (multipart boundaries have a fixed length)
+        prepared = requests.Request(
+            method, url, headers=kwargs.get("headers"), data=kwargs.get("data"), files=kwargs.get("files")
+        ).prepare()
+        recorded = interaction["response"]
+        delay = started + recorded["elapsed"] / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        raw = _ReplayRaw(recorded["chunks"], started, self.speed)
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        response.request = prepared
+        response.raw = raw
+        if not kwargs.get("stream"):
+            response.content  # noqa: B018 - read eagerly, as requests does without stream=True
+        with self._lock:
+            self._raws.append(raw)
+        self._log_call(request, response.status_code, _body_length(prepared.body))
+        return response
+
+    @property
+    def unplayed(self) -> list[dict]:
+        return [i["request"] for n, i in enumerate(self.interactions) if n not in self._played]
+
+    @property
+    def open_responses(self) -> int:
+        """Replayed responses neither drained nor closed (i.e. still holding a connection)."""
+        return sum(1 for raw in self._raws if not raw.released)
+
+    def summary(self) -> dict:
+        return {
+            "requests": len(self.calls),
+            "uploads": sum(1 for c in self.calls if c["file"]),
+            "bytes_sent": sum(c["bytes_sent"] for c in self.calls),
+            "statuses": [c["status"] for c in self.calls],
+        }
+
+    def recorded_summary(self) -> dict:
+        """What the cassette itself contains, for comparison with ``summary()``."""
+        return {
+            "requests": len(self.interactions),
+            "uploads": sum(1 for i in self.interactions if i["request"]["file"]),
+            "bytes_sent": sum(i["request"]["bytes_sent"] for i in self.interactions),
+            "statuses": [i["response"]["status"] for i in self.interactions],
+        }
+
+
+def scenario_audio(seconds: float = 1.0, sample_rate: int = 8000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def _azure_transcribe_creds(url: str, version: str = "2024-12-01-preview") -> dict:
+    return {
+        "azure_endpoint_transcribe": url,
+        "azure_api_key_transcribe": "key",
+        "azure_api_version_transcribe": version,
+        "azure_deployment_transcribe": "gpt-4o-transcribe",
+    }
+
+
+def _azure_whisper_creds(url: str) -> dict:
+    return {
+        "azure_endpoint_whisper": url,
+        "azure_api_key_whisper": "key",
+        "azure_api_version_whisper": "2024-02-01",
+        "azure_deployment_whisper": "whisper-1",
+    }
+
+
+# name -> stand-in server settings, credentials for a base URL, tool parameters
+SCENARIOS: dict[str, dict] = {
+    "azure_transcribe_version_fallback": {
+        "server": {"text": "hello world", "not_found_versions": ("2024-12-01-preview",)},
+        "creds": _azure_transcribe_creds,
+        "params": {"stream": False, "response_format": "json"},
+    },
+    "azure_transcribe_stream": {
+        "server": {"text": "the quick brown fox jumps over the lazy dog", "stream_events": 40, "event_interval": 0.01},
+        "creds": _azure_transcribe_creds,
+        "params": {"stream": True},
+    },
+    "azure_whisper_translate_fallback": {
+        "server": {"text": "hello world", "translation_text": "你好世界"},
+        "creds": _azure_whisper_creds,
+        "params": {"transcription_type": "translate", "model": "whisper-1", "stream": False},
+    },
+}
+
+
+def scenario_params(name: str) -> dict:
+    params = dict(SCENARIOS[name]["params"])
+    params["file"] = {"name": "sample.wav", "type": "audio/wav", "content": scenario_audio()}
+    return params
+
+
+def record_scenarios(directory: str, names: Optional[list[str]] = None) -> list[pathlib.Path]:
+    import types
+
+    from standin_server import StandInServer
+    from test_harness import OpenaiAudioTool
+
+    written = []
+    for name in names or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        with StandInServer(**scenario["server"]) as server:
+            tool = OpenaiAudioTool()
+            tool.runtime = types.SimpleNamespace(credentials=scenario["creds"](server.url))
+            path = pathlib.Path(directory) / f"{name}.json"
+            with Cassette(str(path), mode="record"):
+                list(tool._invoke(scenario_params(name)))
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+    p = argparse.ArgumentParser(description="Record audio API cassettes against the local stand-in server")
+    sub = p.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("directory")
+    rec.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    args = p.parse_args()
+    for path in record_scenarios(args.directory, args.scenario):
+        print(f"wrote {path}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI/Azure audio endpoints.
+
+Accepts multipart uploads on any path and answers like the real services:
+JSON/text for normal requests, SSE ``transcript.text.delta`` events when the
+form has ``stream=True``, and 404 for Azure api-versions listed in
+``not_found_versions``. It counts open connections and bytes received so
+tests and stress scripts can check for leaks and extra uploads.
+
+Run standalone:  python scripts/standin_server.py --port 8765
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class StandInServer:
+    def __init__(
+        self,
+        text: str = "hello world",
+        stream_events: int = 3,
+        event_interval: float = 0.0,
+        not_found_versions: tuple = (),
+        translation_text: Optional[str] = None,
+        port: int = 0,
+    ):
+        self.text = text
+        self.stream_events = stream_events
+        self.event_interval = event_interval
+        self.not_found_versions = set(not_found_versions)
+        self.translation_text = translation_text
+        self.lock = threading.Lock()
+        self.active_connections = 0
+        self.requests: list[dict] = []
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def wait_idle(self, timeout: float = 2.0) -> int:
+        """Wait for all connections to close; returns the number still open."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.active_connections:
+            time.sleep(0.01)
+        return self.active_connections
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.active_connections += 1
+
+            def finish(self):
+                try:
+                    super().finish()
+                finally:
+                    with server.lock:
+                        server.active_connections -= 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._send(200, json.dumps({"data": [{"name": "gpt-4o-transcribe"}, {"name": "whisper-1"}]}).encode())
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                parsed = urlparse(self.path)
+                version = parse_qs(parsed.query).get("api-version", [None])[0]
+                with server.lock:
+                    server.requests.append({"path": self.path, "bytes": len(body)})
+                if version in server.not_found_versions:
+                    self._send(404, json.dumps({"error": {"code": "404", "message": "Resource not found"}}).encode())
+                    return
+                text = server.text
+                if parsed.path.endswith("/translations") and server.translation_text is not None:
+                    text = server.translation_text
+                if b'name="stream"\r\n\r\nTrue' in body:
+                    self._stream(text)
+                    return
+                self._send(200, json.dumps({"text": text}).encode())
+
+            def _stream(self, text: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = text.split(" ")
+                try:
+                    for i in range(server.stream_events):
+                        delta = words[i % len(words)] + " "
+                        event = {"type": "transcript.text.delta", "delta": delta}
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                        self.wfile.flush()
+                        if server.event_interval:
+                            time.sleep(server.event_interval)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Stand-in OpenAI/Azure audio server")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--stream-events", type=int, default=20)
+    p.add_argument("--event-interval", type=float, default=0.05)
+    args = p.parse_args()
+    srv = StandInServer(stream_events=args.stream_events, event_interval=args.event_interval, port=args.port)
+    print(f"listening on {srv.url}")
+    srv.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Abort thousands of streamed transcriptions and check that sockets are released.
+
+Each iteration starts a streaming invocation against the local stand-in server,
+reads the first delta, then closes the generator (what Dify does when a client
+disconnects). Open sockets are sampled on both sides; they should stay flat.
+"""
+import argparse
+import os
+import pathlib
+import sys
+import time
+import types
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from standin_server import StandInServer  # noqa: E402
+from test_harness import OpenaiAudioTool  # noqa: E402
+
+
+def open_socket_count() -> int:
+    """Sockets held by this process (Linux /proc; -1 elsewhere)."""
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        return -1
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+def abort_streams(server_url: str, iterations: int, audio: bytes) -> None:
+    creds = {
+        "azure_endpoint_transcribe": server_url,
+        "azure_api_key_transcribe": "key",
+        "azure_deployment_transcribe": "gpt-4o-transcribe",
+    }
+    for _ in range(iterations):
+        tool = OpenaiAudioTool()
+        tool.runtime = types.SimpleNamespace(credentials=creds)
+        gen = tool._invoke({
+            "file": {"name": "a.wav", "type": "audio/wav", "content": audio},
+            "model": "gpt-4o-transcribe",
+            "stream": True,
+        })
+        next(gen)
+        gen.close()
+
+
+if __name__ == "__main__":
+    import io
+    import wave
+
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--iterations", type=int, default=2000)
+    p.add_argument("--report-every", type=int, default=250)
+    args = p.parse_args()
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * 8000)
+    audio = buf.getvalue()
+
+    with StandInServer(stream_events=100000, event_interval=0.001) as server:
+        baseline = open_socket_count()
+        started = time.monotonic()
+        done = 0
+        while done < args.iterations:
+            batch = min(args.report_every, args.iterations - done)
+            abort_streams(server.url, batch, audio)
+            done += batch
+            print(
+                f"{done} aborted streams: client sockets {open_socket_count() - baseline:+d}, "
+                f"server connections {server.active_connections}, {done / (time.monotonic() - started):.0f}/s"
+            )
+        leaked = server.wait_idle(5.0)
+        print(f"server connections after idle wait: {leaked}")
+        sys.exit(1 if leaked else 0)
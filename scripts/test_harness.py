@@ -20,6 +20,8 @@ class _MockMsg:
     def to_dict(self):
         if self.type == "text":
             return {"type": "text", "text": getattr(self, "text", "")}
+        if self.type == "blob":
+            return {"type": "blob", "meta": self.data["meta"], "size": len(self.data["blob"])}
         return {"type": "json", "data": getattr(self, "data", {})}
 
 class _MockTool:
@@ -29,65 +31,84 @@ class _MockTool:
         return _MockMsg("text", text)
     def create_json_message(self, data: dict):
         return _MockMsg("json", data)
+    def create_blob_message(self, blob: bytes, meta: dict = None):
+        return _MockMsg("blob", {"blob": blob, "meta": meta or {}})
+
+class _MockToolProvider:
+    pass
+
+class _MockCredentialError(Exception):
+    pass
 
 mock_module = types.ModuleType("dify_plugin")
 setattr(mock_module, "Tool", _MockTool)
+setattr(mock_module, "ToolProvider", _MockToolProvider)
 entities_module = types.ModuleType("dify_plugin.entities")
 entities_tool_module = types.ModuleType("dify_plugin.entities.tool")
 setattr(entities_tool_module, "ToolInvokeMessage", _MockMsg)
+errors_module = types.ModuleType("dify_plugin.errors")
+errors_tool_module = types.ModuleType("dify_plugin.errors.tool")
+setattr(errors_tool_module, "ToolProviderCredentialValidationError", _MockCredentialError)
 sys.modules["dify_plugin"] = mock_module
 sys.modules["dify_plugin.entities"] = entities_module
 sys.modules["dify_plugin.entities.tool"] = entities_tool_module
+sys.modules["dify_plugin.errors"] = errors_module
+sys.modules["dify_plugin.errors.tool"] = errors_tool_module
 
 from tools.openai_audio import OpenaiAudioTool  # type: ignore
 
 
+def install_mock_http(creds: dict):
+    """Replace requests.post/get with offline fakes (used by --mock)."""
+    import requests
+    class _Resp:
+        def __init__(self, status=200, text="mock transcript", json_obj=None, stream=False):
+            self.status_code = status
+            self.text = text
+            self._json = json_obj if json_obj is not None else {"text": text}
+            self._stream = stream
+        def json(self):
+            return self._json
+        def iter_lines(self):
+            if not self._stream:
+                return iter(())
+            lines = [
+                b"data: {\"type\": \"transcript.text.delta\", \"delta\": \"Hello \"}",
+                b"data: {\"type\": \"transcript.text.delta\", \"delta\": \"world\"}",
+                b"data: [DONE]",
+            ]
+            return iter(lines)
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return False
+    def _fake_post(url, headers=None, data=None, files=None, stream=False, timeout=None):
+        if stream:
+            return _Resp(stream=True)
+        return _Resp()
+    requests.post = _fake_post  # type: ignore
+    def _fake_get(url, headers=None, timeout=None):
+        class _G:
+            status_code = 200
+            def json(self):
+                dep = (
+                    creds.get("azure_deployment_transcribe")
+                    or creds.get("azure_deployment_gpt4o")
+                    or creds.get("azure_deployment")
+                    or "gpt-4o-transcribe"
+                )
+                return {"data": [{"name": dep}]} 
+        return _G()
+    requests.get = _fake_get  # type: ignore
+
+
 def run(tool_params: dict, creds: dict, mock: bool = False):
     tool = OpenaiAudioTool()
     tool.runtime = types.SimpleNamespace(credentials=creds)
 
     # Optional mock HTTP layer
     if mock:
-        import requests
-        class _Resp:
-            def __init__(self, status=200, text="mock transcript", json_obj=None, stream=False):
-                self.status_code = status
-                self.text = text
-                self._json = json_obj if json_obj is not None else {"text": text}
-                self._stream = stream
-            def json(self):
-                return self._json
-            def iter_lines(self):
-                if not self._stream:
-                    return iter(())
-                lines = [
-                    b"data: {\"type\": \"transcript.text.delta\", \"delta\": \"Hello \"}",
-                    b"data: {\"type\": \"transcript.text.delta\", \"delta\": \"world\"}",
-                    b"data: [DONE]",
-                ]
-                return iter(lines)
-            def __enter__(self):
-                return self
-            def __exit__(self, *exc):
-                return False
-        def _fake_post(url, headers=None, data=None, files=None, stream=False, timeout=None):
-            if stream:
-                return _Resp(stream=True)
-            return _Resp()
-        requests.post = _fake_post  # type: ignore
-        def _fake_get(url, headers=None, timeout=None):
-            class _G:
-                status_code = 200
-                def json(self):
-                    dep = (
-                        creds.get("azure_deployment_transcribe")
-                        or creds.get("azure_deployment_gpt4o")
-                        or creds.get("azure_deployment")
-                        or "gpt-4o-transcribe"
-                    )
-                    return {"data": [{"name": dep}]} 
-            return _G()
-        requests.get = _fake_get  # type: ignore
+        install_mock_http(creds)
 
     outputs = []
     for msg in tool._invoke(tool_params):
@@ -98,6 +119,27 @@ def run(tool_params: dict, creds: dict, mock: bool = False):
     return outputs
 
 
+# Extension -> MIME for the formats the Audio API accepts (plus a few common extras)
+AUDIO_MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".mpga": "audio/mpeg",
+    ".mpeg": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".wav": "audio/wav",
+    ".webm": "audio/webm",
+    ".ogg": "audio/ogg",
+    ".oga": "audio/ogg",
+    ".flac": "audio/flac",
+    ".aiff": "audio/aiff",
+    ".aif": "audio/aiff",
+}
+
+
+def guess_mime(path: pathlib.Path) -> str:
+    return AUDIO_MIME_TYPES.get(path.suffix.lower(), "application/octet-stream")
+
+
 def load_env_credentials():
     env_path = REPO_ROOT / ".env"
     creds = {}
@@ -237,17 +279,7 @@ if __name__ == "__main__":
     audio_path = pathlib.Path(args.audio)
     data = audio_path.read_bytes()
 
-    # Guess MIME from extension
-    ext = audio_path.suffix.lower()
-    mime = "application/octet-stream"
-    if ext in [".mp3"]:
-        mime = "audio/mpeg"
-    elif ext in [".m4a", ".mp4"]:
-        mime = "audio/mp4"
-    elif ext in [".wav"]:
-        mime = "audio/wav"
-    elif ext in [".aiff", ".aif"]:
-        mime = "audio/aiff"
+    mime = guess_mime(audio_path)
 
     params = {
         "file": {"name": audio_path.name, "type": mime, "content": data},
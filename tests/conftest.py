@@ -14,6 +14,8 @@ class _MockMsg:
     def to_dict(self):
         if self.type == "text":
             return {"type": "text", "text": getattr(self, "text", "")}
+        if self.type == "blob":
+            return {"type": "blob", "meta": self.data["meta"], "size": len(self.data["blob"])}
         return {"type": "json", "data": getattr(self, "data", {})}
 
 class _MockTool:
@@ -23,16 +25,30 @@ class _MockTool:
         return _MockMsg("text", text)
     def create_json_message(self, data: dict):
         return _MockMsg("json", data)
+    def create_blob_message(self, blob: bytes, meta: dict = None):
+        return _MockMsg("blob", {"blob": blob, "meta": meta or {}})
+
+class _MockToolProvider:
+    pass
+
+class _MockCredentialError(Exception):
+    pass
 
 # Install mocked modules before tests import tool code
 mock_module = types.ModuleType("dify_plugin")
 setattr(mock_module, "Tool", _MockTool)
+setattr(mock_module, "ToolProvider", _MockToolProvider)
 entities_module = types.ModuleType("dify_plugin.entities")
 entities_tool_module = types.ModuleType("dify_plugin.entities.tool")
 setattr(entities_tool_module, "ToolInvokeMessage", _MockMsg)
+errors_module = types.ModuleType("dify_plugin.errors")
+errors_tool_module = types.ModuleType("dify_plugin.errors.tool")
+setattr(errors_tool_module, "ToolProviderCredentialValidationError", _MockCredentialError)
 sys.modules["dify_plugin"] = mock_module
 sys.modules["dify_plugin.entities"] = entities_module
 sys.modules["dify_plugin.entities.tool"] = entities_tool_module
+sys.modules["dify_plugin.errors"] = errors_module
+sys.modules["dify_plugin.errors.tool"] = errors_tool_module
 
 @pytest.fixture
 def make_tool():
@@ -42,3 +58,66 @@ def make_tool():
         t.runtime = types.SimpleNamespace(credentials=creds)
         return t
     return _mk
+
+
+def _wav_bytes(seconds: float = 1.0, sample_rate: int = 8000, channels: int = 1, frames=None) -> bytes:
+    import io
+    import wave
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(frames if frames is not None else b"\x00\x00" * channels * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def _mp3_bytes(n_frames: int = 100, bitrate_idx: int = 9, xing_frames=None, id3: bool = False) -> bytes:
+    """Synthetic MPEG1 Layer III stream (44.1kHz stereo, 128kbps by default) with zeroed payloads."""
+    import struct
+    from tools.audio_probe import parse_mp3_header
+    out = bytearray()
+    if id3:
+        out += b"ID3\x04\x00\x00\x00\x00\x00\x10" + b"\x00" * 16
+    header = 0xFFFB0000 | (bitrate_idx << 12)
+    hdr = parse_mp3_header(header)
+    if xing_frames is not None:
+        frame = bytearray(hdr.frame_length)
+        frame[0:4] = struct.pack(">I", header)
+        frame[36:40] = b"Xing"
+        frame[40:48] = struct.pack(">II", 1, xing_frames)
+        out += frame
+    for i in range(n_frames):
+        h = header | ((i % 3 == 0) << 9)
+        length = parse_mp3_header(h).frame_length
+        out += struct.pack(">I", h) + bytes([i % 251]) * (length - 4)
+    return bytes(out)
+
+
+def _mp4_bytes(timescale: int = 1000, duration: int = 1000, version: int = 0) -> bytes:
+    """Minimal M4A: ftyp, a small mdat and a moov holding only mvhd."""
+    import struct
+    ftyp = struct.pack(">I4s4sI4s", 20, b"ftyp", b"M4A ", 0, b"isom")
+    if version == 1:
+        body = struct.pack(">B3xQQIQ", 1, 0, 0, timescale, duration) + b"\x00" * 80
+    else:
+        body = struct.pack(">B3xIIII", 0, 0, 0, timescale, duration) + b"\x00" * 80
+    mvhd = struct.pack(">I4s", 8 + len(body), b"mvhd") + body
+    moov = struct.pack(">I4s", 8 + len(mvhd), b"moov") + mvhd
+    mdat = struct.pack(">I4s", 16, b"mdat") + b"\x00" * 8
+    return ftyp + mdat + moov
+
+
+@pytest.fixture
+def make_wav():
+    return _wav_bytes
+
+
+@pytest.fixture
+def make_mp3():
+    return _mp3_bytes
+
+
+@pytest.fixture
+def make_mp4():
+    return _mp4_bytes
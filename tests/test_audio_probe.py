@@ -0,0 +1,57 @@
+import pytest
+import requests
+
+from tools.audio_probe import _wav_duration, adaptive_read_timeout, estimate_duration
+
+
+def test_wav_duration(make_wav):
+    assert estimate_duration(make_wav(seconds=2.5, sample_rate=16000)) == pytest.approx(2.5)
+
+
+def test_mp3_duration_cbr_and_xing(make_mp3):
+    # 383 frames * 1152 samples / 44100 Hz ~= 10s
+    assert estimate_duration(make_mp3(n_frames=383, id3=True)) == pytest.approx(10.0, rel=0.01)
+    # Xing frame count wins over the byte-size estimate
+    assert estimate_duration(make_mp3(n_frames=10, xing_frames=3828)) == pytest.approx(100.0, rel=0.001)
+
+
+def test_mp4_duration(make_mp4):
+    assert estimate_duration(make_mp4(1000, 42500)) == pytest.approx(42.5)
+    assert estimate_duration(make_mp4(48000, 48000 * 90, version=1)) == pytest.approx(90.0)
+
+
+def test_unknown_or_corrupt_input():
+    assert estimate_duration(b"x") is None
+    assert estimate_duration(b"RIFF\x00\x00\x00\x00WAVEjunk") is None
+    # fmt chunk cut off inside the byte-rate field: rejected by the bounds check, not by struct.error
+    assert _wav_duration(b"RIFF\x00\x00\x00\x00WAVEfmt \x10\x00\x00\x00" + b"\x00" * 10) is None
+
+
+def test_adaptive_read_timeout_bounds():
+    assert adaptive_read_timeout(None, "whisper-1", 120, 600) == 120
+    assert adaptive_read_timeout(3, "gpt-4o-transcribe", 120, 600) == 30
+    assert adaptive_read_timeout(3600, "whisper-1", 120, 600) == 600
+
+
+def test_short_clip_gets_short_timeout_and_stats(make_tool, make_wav, monkeypatch):
+    seen = {}
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        seen["timeout"] = timeout
+        class Resp:
+            status_code = 200
+            text = "hi"
+            def json(self):
+                return {"text": "hi"}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    tool = make_tool({"api_key": "k"})
+    msgs = list(tool._invoke({
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav(seconds=3)},
+        "model": "gpt-4o-transcribe",
+        "stream": False,
+    }))
+    assert seen["timeout"] == (10, 30)
+    stats = next(m.data["stats"] for m in msgs if m.type == "json")
+    assert stats["audio_duration"] == pytest.approx(3.0)
+    assert "real_time_factor" in stats
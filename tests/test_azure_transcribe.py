@@ -3,7 +3,7 @@ import json
 import types
 import requests
 
-def test_azure_transcribe_fallback(make_tool, monkeypatch):
+def test_azure_transcribe_fallback(make_tool, make_wav, monkeypatch):
     # Arrange: simulate Azure 404 for initial version then success on fallback
     creds = {
         "azure_endpoint_transcribe": "https://example.openai.azure.com",
@@ -40,7 +40,7 @@ def test_azure_transcribe_fallback(make_tool, monkeypatch):
     monkeypatch.setattr(requests, "post", fake_post)
 
     # Act: invoke with a small bytes content
-    file_bytes = b"data"
+    file_bytes = make_wav()
     msgs = list(tool._invoke({
         "file": {"name": "a.wav", "type": "audio/wav", "content": file_bytes},
         "transcription_type": "transcribe",
@@ -53,7 +53,7 @@ def test_azure_transcribe_fallback(make_tool, monkeypatch):
     assert any(m.type == "json" and m.data.get("result", {}).get("text") == "hello world" for m in msgs)
 
 
-def test_azure_transcribe_streaming(make_tool, monkeypatch):
+def test_azure_transcribe_streaming(make_tool, make_wav, monkeypatch):
     creds = {
         "azure_endpoint_transcribe": "https://example.openai.azure.com",
         "azure_api_key_transcribe": "key",
@@ -79,7 +79,7 @@ def test_azure_transcribe_streaming(make_tool, monkeypatch):
     monkeypatch.setattr(requests, "post", fake_post)
 
     msgs = list(tool._invoke({
-        "file": {"name": "a.wav", "type": "audio/wav", "content": b"x"},
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
         "transcription_type": "transcribe",
         "model": "gpt-4o-transcribe",
         "response_format": "text",
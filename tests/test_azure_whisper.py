@@ -2,7 +2,7 @@ import json
 import requests
 
 
-def test_whisper_transcribe_verbose_json(make_tool, monkeypatch):
+def test_whisper_transcribe_verbose_json(make_tool, make_wav, monkeypatch):
     creds = {
         "azure_endpoint_whisper": "https://example.openai.azure.com",
         "azure_api_key_whisper": "key",
@@ -16,6 +16,7 @@ def test_whisper_transcribe_verbose_json(make_tool, monkeypatch):
             status_code = 200
             def json(self):
                 return {
+                    "text": "Hello world",
                     "segments": [
                         {"id": 0, "start": 0.0, "end": 1.0, "text": "Hello"},
                         {"id": 1, "start": 1.0, "end": 2.0, "text": "world"},
@@ -27,7 +28,7 @@ def test_whisper_transcribe_verbose_json(make_tool, monkeypatch):
     monkeypatch.setattr(requests, "post", fake_post)
 
     msgs = list(tool._invoke({
-        "file": {"name": "a.wav", "type": "audio/wav", "content": b"x"},
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
         "transcription_type": "transcribe",
         "model": "whisper-1",
         "response_format": "verbose_json",
@@ -38,8 +39,19 @@ def test_whisper_transcribe_verbose_json(make_tool, monkeypatch):
     # Expect verbose_json payload
     assert any(m.type == "json" and "segments" in m.data.get("result", {}) for m in msgs)
 
+    # Timestamps force a verbose_json request, but a text caller still gets just the text
+    msgs = list(tool._invoke({
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
+        "model": "whisper-1",
+        "response_format": "text",
+        "timestamp_granularities": "segment",
+        "stream": False,
+        "output_format": "json_only",
+    }))
+    assert set(msgs[0].data["result"]) == {"text"}
+
 
-def test_whisper_translate_fallback(make_tool, monkeypatch):
+def test_whisper_translate_fallback(make_tool, make_wav, monkeypatch):
     creds = {
         "azure_endpoint_whisper": "https://example.openai.azure.com",
         "azure_api_key_whisper": "key",
@@ -69,7 +81,7 @@ def test_whisper_translate_fallback(make_tool, monkeypatch):
     monkeypatch.setattr(requests, "post", fake_post)
 
     msgs = list(tool._invoke({
-        "file": {"name": "a.wav", "type": "audio/wav", "content": b"x"},
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
         "transcription_type": "translate",
         "model": "whisper-1",
         "response_format": "text",
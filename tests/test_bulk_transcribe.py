@@ -0,0 +1,66 @@
+import json
+import pathlib
+import sys
+
+import requests
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+import bulk_transcribe  # noqa: E402
+
+
+def _fake_post_factory(calls, fail_names=()):
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name = files["file"][0]
+        calls.append(name)
+        class Resp:
+            status_code = 500 if name in fail_names else 200
+            text = "boom" if name in fail_names else f"text of {name}"
+            def json(self):
+                return {"text": self.text}
+        return Resp()
+    return fake_post
+
+
+def test_bulk_resumes_from_manifest(tmp_path, monkeypatch, make_wav, make_mp3, make_mp4):
+    audio_dir = tmp_path / "audio"
+    (audio_dir / "nested").mkdir(parents=True)
+    for rel, data in [("a.wav", make_wav()), ("b.mp3", make_mp3()), ("nested/c.m4a", make_mp4())]:
+        (audio_dir / rel).write_bytes(data)
+    (audio_dir / "notes.txt").write_text("not audio")
+    out = tmp_path / "out.jsonl"
+    manifest = tmp_path / "out.manifest.jsonl"
+    params = {"model": "gpt-4o-transcribe", "response_format": "text", "stream": False, "output_format": "json_only"}
+    files = lambda: bulk_transcribe.iter_audio_files(audio_dir, {".wav", ".mp3", ".m4a"})  # noqa: E731
+
+    calls = []
+    monkeypatch.setattr(requests, "post", _fake_post_factory(calls, fail_names={"b.mp3"}))
+    progress = bulk_transcribe.run_bulk(files(), {"api_key": "k"}, params, out, manifest, workers=2)
+    assert sorted(calls) == ["a.wav", "b.mp3", "c.m4a"]
+    assert progress.done == 3 and progress.failed == 1
+
+    # Second run only retries the failed file
+    calls.clear()
+    monkeypatch.setattr(requests, "post", _fake_post_factory(calls))
+    progress = bulk_transcribe.run_bulk(files(), {"api_key": "k"}, params, out, manifest, workers=2)
+    assert calls == ["b.mp3"]
+    assert progress.failed == 0
+
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    ok = {pathlib.Path(r["path"]).name: r["text"] for r in rows if r["status"] == "ok"}
+    assert ok == {"a.wav": "text of a.wav", "b.mp3": "text of b.mp3", "c.m4a": "text of c.m4a"}
+
+    # Third run has nothing left to do
+    calls.clear()
+    bulk_transcribe.run_bulk(files(), {"api_key": "k"}, params, out, manifest, workers=2)
+    assert calls == []
+
+    # Same files through a relative path or a symlinked directory are still found
+    monkeypatch.chdir(tmp_path)
+    bulk_transcribe.run_bulk(
+        bulk_transcribe.iter_audio_files(pathlib.Path("audio"), {".wav", ".mp3", ".m4a"}), {"api_key": "k"}, params, out, manifest
+    )
+    (tmp_path / "linked").symlink_to(audio_dir, target_is_directory=True)
+    bulk_transcribe.run_bulk(
+        bulk_transcribe.iter_audio_files(tmp_path / "linked", {".wav", ".mp3", ".m4a"}), {"api_key": "k"}, params, out, manifest
+    )
+    assert calls == []
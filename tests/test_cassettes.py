@@ -0,0 +1,76 @@
+import pathlib
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+from cassette import SCENARIOS, Cassette, CassetteMismatch, scenario_params  # noqa: E402
+
+CASSETTES = pathlib.Path(__file__).resolve().parent / "cassettes"
+# Replays may not take longer than the recording by more than this
+BUDGET_FACTOR = 1.5
+BUDGET_SLACK = 0.3
+
+
+def _replay(make_tool, name, creds=None):
+    tool = make_tool(creds or SCENARIOS[name]["creds"]("https://example.openai.azure.com"))
+    with Cassette(str(CASSETTES / f"{name}.json")) as cassette:
+        started = time.monotonic()
+        msgs = list(tool._invoke(scenario_params(name)))
+        elapsed = time.monotonic() - started
+    return cassette, msgs, elapsed
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_replay_matches_recording(make_tool, name):
+    cassette, msgs, elapsed = _replay(make_tool, name)
+    # Same requests, same bytes, nothing left over, every connection released
+    assert cassette.summary() == cassette.recorded_summary()
+    assert cassette.unplayed == []
+    assert cassette.open_responses == 0
+    assert elapsed <= cassette.duration * BUDGET_FACTOR + BUDGET_SLACK
+    assert any(m.type == "text" and m.text for m in msgs)
+
+
+def test_version_fallback_uploads_twice(make_tool):
+    cassette, msgs, _ = _replay(make_tool, "azure_transcribe_version_fallback")
+    assert cassette.summary()["uploads"] == 2
+    assert [c["status"] for c in cassette.calls] == [404, 200]
+    assert "api-version=2024-02-15-preview" in cassette.calls[1]["path"]
+    assert msgs[-1].text == "hello world"
+
+
+def test_translate_fallback_uploads_twice(make_tool):
+    cassette, msgs, _ = _replay(make_tool, "azure_whisper_translate_fallback")
+    assert [c["path"].split("?")[0].rsplit("/", 1)[-1] for c in cassette.calls] == ["translations", "transcriptions"]
+    assert cassette.calls[1]["fields"]["translate"] is True
+    assert msgs[-1].text == "hello world"
+
+
+def test_stream_replays_sse_timing(make_tool):
+    cassette, msgs, elapsed = _replay(make_tool, "azure_transcribe_stream")
+    chunks = cassette.interactions[0]["response"]["chunks"]
+    assert len(chunks) > 1
+    # Deltas arrive at their recorded pace, not all at once
+    assert elapsed >= chunks[-1]["t"] * 0.9
+    assert cassette.summary()["uploads"] == 1
+    deltas = [m.text for m in msgs if m.type == "text"]
+    assert "".join(deltas).split()[:3] == ["the", "quick", "brown"]
+
+
+def test_unrecorded_request_fails(make_tool):
+    # A different api-version sends a request the cassette never saw
+    creds = SCENARIOS["azure_transcribe_version_fallback"]["creds"]("https://example.openai.azure.com", "2025-04-01-preview")
+    with pytest.raises(Exception, match="no unplayed interaction"):
+        _replay(make_tool, "azure_transcribe_version_fallback", creds)
+    # An extra upload finds every interaction already played
+    tool = make_tool(SCENARIOS["azure_transcribe_stream"]["creds"]("https://example.openai.azure.com"))
+    with Cassette(str(CASSETTES / "azure_transcribe_stream.json"), speed=100.0):
+        list(tool._invoke(scenario_params("azure_transcribe_stream")))
+        with pytest.raises(Exception, match="no unplayed interaction"):
+            list(tool._invoke(scenario_params("azure_transcribe_stream")))
+    with pytest.raises(CassetteMismatch):
+        with Cassette(str(CASSETTES / "azure_transcribe_stream.json")):
+            import requests
+            requests.get("https://example.openai.azure.com/openai/models")
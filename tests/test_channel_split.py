@@ -0,0 +1,142 @@
+import io
+import struct
+import threading
+import wave
+
+import pytest
+import requests
+
+import tools.channel_split as channel_split
+from tools.channel_split import channel_labels, parse_wav_layout, split_wav_channels
+from tools.transcript_merge import merge_channels
+
+
+def _interleaved(frames: int, channels: int, width: int) -> bytes:
+    # Sample value encodes (channel, frame) so misplaced bytes are detectable
+    out = bytearray()
+    for i in range(frames):
+        for ch in range(channels):
+            out += ((ch << 16) | i).to_bytes(4, "little")[:width]
+    return bytes(out)
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+@pytest.mark.parametrize("channels,width", [(2, 2), (3, 3), (2, 1), (4, 4)])
+def test_split_deinterleaves_channels(monkeypatch, make_wav, numpy_available, channels, width):
+    if not numpy_available:
+        monkeypatch.setattr(channel_split, "_numpy", False)
+    elif channel_split._load_numpy() is None:
+        pytest.skip("numpy not installed")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(8000)
+        w.writeframes(_interleaved(300, channels, width))
+    monos = split_wav_channels(buf.getvalue())
+    assert len(monos) == channels
+    for ch, mono in enumerate(monos):
+        with wave.open(io.BytesIO(mono)) as w:
+            assert (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()) == (1, width, 8000, 300)
+            samples = w.readframes(300)
+        expected = b"".join(((ch << 16) | i).to_bytes(4, "little")[:width] for i in range(300))
+        assert samples == expected
+
+
+def test_layout_rejects_non_pcm(make_wav, make_mp3):
+    assert parse_wav_layout(make_mp3(n_frames=5)) is None
+    assert split_wav_channels(b"RIFF\x00\x00\x00\x00WAVE") is None
+    layout = parse_wav_layout(make_wav(seconds=0.1, channels=2))
+    assert (layout.channels, layout.bits_per_sample, layout.data_size) == (2, 16, 3200)
+    # WAVE_FORMAT_EXTENSIBLE resolves to its PCM sub-format
+    pcm = _interleaved(10, 2, 2)
+    fmt = struct.pack("<HHIIHHHHI", 0xFFFE, 2, 8000, 32000, 4, 16, 22, 16, 3) + struct.pack("<H", 1) + b"\x00" * 14
+    data = b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(pcm)) + b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(pcm)) + pcm
+    assert parse_wav_layout(data).format_tag == 1
+    assert len(split_wav_channels(data)) == 2
+
+
+def test_labels():
+    assert channel_labels("", 2) == ["left", "right"]
+    assert channel_labels("agent, customer", 2) == ["agent", "customer"]
+    assert channel_labels("a", 3) == ["a", "channel_2", "channel_3"]
+
+
+def test_merge_channels_timeline():
+    agent = {"text": "hello how can I help", "language": "english", "duration": 9.0, "segments": [
+        {"id": 0, "start": 0.0, "end": 2.0, "text": " hello"},
+        {"id": 1, "start": 2.0, "end": 3.0, "text": " how can I help"},
+        {"id": 2, "start": 8.0, "end": 9.0, "text": " sure"},
+    ]}
+    customer = {"text": "my order", "duration": 10.0, "segments": [{"id": 0, "start": 4.0, "end": 7.5, "text": " my order is late"}]}
+    merged = merge_channels([agent, customer], ["agent", "customer"], "verbose_json")
+    assert merged["text"] == "agent: hello how can I help\ncustomer: my order is late\nagent: sure"
+    assert [(s["id"], s["speaker"], s["start"]) for s in merged["segments"]] == [
+        (0, "agent", 0.0), (1, "agent", 2.0), (2, "customer", 4.0), (3, "agent", 8.0)
+    ]
+    assert merged["duration"] == 10.0
+    assert merged["language"] == "english"
+
+    srt = merge_channels([agent, customer], ["agent", "customer"], "srt")["text"]
+    assert srt.startswith("1\n00:00:00,000 --> 00:00:02,000\nagent: hello\n\n2\n")
+    assert "3\n00:00:04,000 --> 00:00:07,500\ncustomer: my order is late" in srt
+
+    # Text-only results (gpt-4o models) are listed per channel
+    plain = merge_channels([{"text": "hi"}, {"text": "hello"}], ["left", "right"], "json")
+    assert plain["text"] == "left: hi\nright: hello"
+
+
+def test_tool_transcribes_channels_concurrently(make_tool, make_wav, monkeypatch):
+    stereo = make_wav(seconds=1.0, channels=2)
+    both_in_flight = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, body, mime = files["file"]
+        calls.append((name, len(body), mime, data["response_format"]))
+        both_in_flight.wait()
+        speaker_start = 0.0 if "agent" in name else 1.0
+        class Resp:
+            status_code = 200
+            text = ""
+            def json(self):
+                return {"text": name, "segments": [{"id": 0, "start": speaker_start, "end": speaker_start + 0.5, "text": name}]}
+        return Resp()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    msgs = list(make_tool({"api_key": "k"})._invoke({
+        "file": {"name": "call.wav", "type": "audio/wav", "content": stereo},
+        "model": "whisper-1",
+        "response_format": "text",
+        "channel_mode": "split",
+        "channel_labels": "agent,customer",
+        "output_format": "json_only",
+    }))
+    assert sorted(c[0] for c in calls) == ["call.agent.wav", "call.customer.wav"]
+    # Each channel is uploaded as a mono WAV of about half the size
+    assert all(c[1] == (len(stereo) - 44) // 2 + 44 and c[2] == "audio/wav" and c[3] == "verbose_json" for c in calls)
+    data = msgs[0].data
+    assert data["result"]["text"] == "agent: call.agent.wav\ncustomer: call.customer.wav"
+    # verbose_json parts keep their segments even though the caller asked for text
+    assert [(s["speaker"], s["start"]) for s in data["result"]["segments"]] == [("agent", 0.0), ("customer", 1.0)]
+    assert data["stats"]["channels"] == 2
+
+    msgs = list(make_tool({"api_key": "k"})._invoke({
+        "file": {"name": "call.wav", "type": "audio/wav", "content": stereo},
+        "model": "whisper-1",
+        "response_format": "srt",
+        "channel_mode": "split",
+        "channel_labels": "agent,customer",
+        "output_format": "json_only",
+    }))
+    srt = msgs[0].data["result"]["text"]
+    assert srt.startswith("1\n00:00:00,000 --> 00:00:00,500\nagent: call.agent.wav\n\n")
+    assert "2\n00:00:01,000 --> 00:00:01,500\ncustomer: call.customer.wav" in srt
+
+
+def test_tool_split_requires_wav(make_tool, make_mp3):
+    with pytest.raises(Exception, match="requires a PCM WAV"):
+        list(make_tool({"api_key": "k"})._invoke({
+            "file": {"name": "a.mp3", "type": "audio/mpeg", "content": make_mp3(n_frames=10)},
+            "channel_mode": "split",
+        }))
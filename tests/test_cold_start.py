@@ -0,0 +1,22 @@
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+from bench_cold_start import FIRST_INVOCATION_BUDGET_SECONDS, IMPORT_BUDGET_SECONDS, measure  # noqa: E402
+
+
+def test_cold_start_budget():
+    result = measure(runs=3)
+    # Optional subsystems stay unloaded until a request needs them
+    assert result["deferred_loaded_after_import"] == []
+    assert result["deferred_loaded_after_first_invocation"] == []
+    assert result["import_seconds"] < IMPORT_BUDGET_SECONDS
+    assert result["first_invocation_seconds"] < FIRST_INVOCATION_BUDGET_SECONDS
+
+
+def test_deferred_modules_load_on_demand(make_wav):
+    import tools.channel_split as channel_split
+
+    channel_split.split_wav_channels(make_wav(seconds=0.1, channels=2))
+    # Loaded (or found missing) by the first split, not before
+    assert channel_split._numpy is not None
@@ -0,0 +1,123 @@
+import json
+
+import requests
+
+import tools.openai_audio as openai_audio
+from tools import compact_transcript
+from tools.compact_transcript import ColumnTable, CompactTranscript, loads, loads_compact, to_plain
+from tools.transcript_merge import merge_results
+
+
+def _verbose(n_segments: int = 3, start: float = 0.0) -> dict:
+    segments, words = [], []
+    t = start
+    for i in range(n_segments):
+        seg_words = [{"word": w, "start": round(t + j * 0.5, 3), "end": round(t + j * 0.5 + 0.4, 3)} for j, w in enumerate(["héllo", "there"])]
+        words.extend(seg_words)
+        segments.append({
+            "id": i, "seek": 0, "start": t, "end": t + 1.0, "text": " héllo there",
+            "tokens": [50364, 2425 + i, 456], "temperature": 0.0, "avg_logprob": -0.25, "no_speech_prob": 0.01,
+        })
+        t += 1.0
+    return {"task": "transcribe", "language": "english", "duration": t, "text": "héllo there " * n_segments, "segments": segments, "words": words}
+
+
+def test_round_trip_is_exact(monkeypatch):
+    result = _verbose(5)
+    compact = CompactTranscript.from_result(loads(json.dumps(result).encode()))
+    assert isinstance(compact, CompactTranscript)
+    assert compact.to_dict() == result
+    assert json.dumps(compact.to_dict()) == json.dumps(result)
+    words = compact.table("words")
+    assert len(words) == 10
+    assert words[3] == result["words"][3]
+    assert words[-1] == result["words"][-1]
+    assert compact.table("segments")[2]["tokens"] == [50364, 2427, 456]
+    assert compact.text == result["text"]
+    # Written from the columns without the dicts: in orjson batches, or column by column
+    # giving byte for byte what json.dumps gives
+    monkeypatch.setattr(compact_transcript, "JSON_BATCH_ROWS", 3)
+    assert json.loads(compact.to_json_bytes()) == result
+    assert json.loads(compact.table("segments").to_json_bytes()) == result["segments"]
+    monkeypatch.setattr(compact_transcript, "orjson", None)
+    assert compact.to_json_bytes() == json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def test_non_uniform_lists_stay_plain():
+    assert ColumnTable.from_items([{"word": "a", "start": 0.0}, {"word": "b", "start": 1}]) is None
+    assert ColumnTable.from_items([{"word": "a", "start": 0.0}, {"word": "b", "start": 1.0, "x": 1}]) is None
+    assert ColumnTable.from_items([{"word": "a", "flag": True}]) is None
+    assert ColumnTable.from_items([{"word": "a", "end": None}]) is None
+    plain = {"text": "a", "words": [{"word": "a", "end": None}]}
+    assert CompactTranscript.from_result(plain) is plain
+    mixed = CompactTranscript.from_result({"text": "a", "segments": [{"id": 0, "tokens": [1, "x"]}], "words": [{"word": "a", "start": 0.0}]})
+    assert isinstance(mixed.fields["segments"], list)
+    assert mixed.table("words") is not None
+
+
+def test_compact_merge_matches_plain_merge():
+    parts = [_verbose(2), _verbose(3), _verbose(1)]
+    offsets = [0.0, 600.0, 1200.5]
+    expected = merge_results(parts, offsets, "verbose_json")
+    merged = merge_results([CompactTranscript.from_result(p) for p in parts], offsets, "verbose_json")
+    assert isinstance(merged, CompactTranscript)
+    assert merged.to_dict() == expected
+    # A part that could not be compacted falls back to the dict merge
+    mixed = merge_results([CompactTranscript.from_result(parts[0]), parts[1], parts[2]], offsets, "verbose_json")
+    assert mixed == expected
+
+
+def test_tool_keeps_large_results_compact(make_tool, make_wav, monkeypatch):
+    result = _verbose(50)
+    body = json.dumps(result).encode()
+
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        class Resp:
+            status_code = 200
+            content = body
+            text = body.decode()
+            def json(self):
+                raise AssertionError("large bodies must take the bytes decoder path")
+        return Resp()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(openai_audio, "COMPACT_MIN_BYTES", 1024)
+    tool = make_tool({"api_key": "k"})
+    params = {
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
+        "model": "whisper-1",
+        "response_format": "verbose_json",
+        "timestamp_granularities": "segment_and_word",
+        "stream": False,
+    }
+    compacted = []
+    monkeypatch.setattr(openai_audio, "loads_compact", lambda b: compacted.append(b) or loads_compact(b))
+    # Only the text is needed: nothing is compacted
+    msgs = list(tool._invoke(dict(params, output_format="text_only")))
+    assert [m.text for m in msgs] == [result["text"]]
+    # A JSON message needs the dicts anyway: the decoded result is passed through uncompacted
+    msgs = list(tool._invoke(dict(params, output_format="json_only")))
+    assert msgs[0].data["result"] == result
+    monkeypatch.setattr(openai_audio, "OFFLOAD_MIN_BYTES", len(body) + 1)
+    msgs = list(tool._invoke(dict(params, output_format="default")))
+    assert msgs[0].data["result"] == result
+    assert compacted == []
+    # Written out as a file: decoded straight into columns
+    msgs = list(tool._invoke(dict(params, output_format="file")))
+    assert json.loads(msgs[1].data["blob"]) == result
+    assert compacted == [body]
+
+
+def test_loads_compact_matches_decode_then_compact():
+    result = _verbose(4)
+    nested = {"text": "x", "segments": [{"id": 0, "words": [{"word": "a", "start": 0.0}]}], "words": [{"word": "a", "start": 0.0}]}
+    mixed = {"text": "x", "segments": [{"id": 0, "ok": True}], "words": [{"word": "a", "start": 0.0}, {"word": "b", "start": 1}]}
+    for doc in (result, nested, mixed, {"text": "plain"}, [{"a": 1}], {"text": "x", "words": []}):
+        body = json.dumps(doc, ensure_ascii=False).encode()
+        got, want = loads_compact(body), CompactTranscript.from_result(json.loads(body))
+        assert type(got) is type(want)
+        assert to_plain(got) == doc
+    assert isinstance(loads_compact(json.dumps(nested).encode()).fields["words"], ColumnTable)
+    # A duplicated key drops rows the decoder already saw: still decoded exactly
+    dup = b'{"text":"x","words":[{"w":"a","s":1.0}],"words":[{"w":"b","s":2.0}],"segments":[{"w":"c","s":3.0}]}'
+    assert to_plain(loads_compact(dup)) == json.loads(dup)
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import tools.job_store as job_store
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    r = job_store.JobRunner(job_store.JobStore(str(tmp_path)), max_workers=1)
+    monkeypatch.setattr(job_store, "_runner", r)
+    return r
+
+
+@pytest.fixture
+def fake_post(monkeypatch):
+    calls = []
+    def _post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        calls.append(url)
+        class Resp:
+            status_code = 200
+            text = "long transcript"
+            def json(self):
+                return {"text": "long transcript"}
+        return Resp()
+    monkeypatch.setattr(requests, "post", _post)
+    return calls
+
+
+def _poll_until_done(tool, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        msgs = list(tool._invoke({"job_mode": "poll", "job_id": job_id}))
+        job = msgs[0].data["job"]
+        if job["status"] in ("succeeded", "failed"):
+            return job, msgs
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_submit_then_poll(make_tool, make_wav, runner, fake_post):
+    tool = make_tool({"api_key": "k"})
+    msgs = list(tool._invoke({
+        "job_mode": "submit",
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
+        "model": "gpt-4o-transcribe",
+        "stream": False,
+    }))
+    job_id = msgs[0].data["job"]["id"]
+    assert msgs[1].text == job_id
+
+    job, msgs = _poll_until_done(tool, job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"text": "long transcript"}
+    assert msgs[-1].type == "text" and msgs[-1].text == "long transcript"
+    assert len(fake_post) == 1
+
+
+def _orphan(store, make_wav, credentials, lease_expires):
+    # A previous process took the job and stopped renewing its lease at lease_expires
+    job_id = store.create(
+        {"model": "whisper-1", "file_meta": {"name": "a.wav", "type": "audio/wav"}},
+        make_wav(),
+        job_store.credential_fingerprint(credentials),
+        lease_owner="dead-process",
+    )
+    store.set_status(job_id, "running")
+    store._execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (lease_expires, job_id))
+    return job_id
+
+
+def test_orphaned_job_resumes_after_restart(make_tool, make_wav, tmp_path, monkeypatch, fake_post):
+    job_id = _orphan(job_store.JobStore(str(tmp_path)), make_wav, {"api_key": "k"}, time.time() - 1)
+
+    restarted = job_store.JobRunner(job_store.JobStore(str(tmp_path)), max_workers=1)
+    monkeypatch.setattr(job_store, "_runner", restarted)
+    job, _ = _poll_until_done(make_tool({"api_key": "k"}), job_id)
+    assert job["status"] == "succeeded"
+    assert not list((tmp_path / "spool").iterdir())
+
+
+def test_orphans_only_resume_with_matching_credentials(make_tool, make_wav, tmp_path, monkeypatch, fake_post):
+    store = job_store.JobStore(str(tmp_path))
+    tenant_a = _orphan(store, make_wav, {"api_key": "key-a"}, time.time() - 1)
+    runner = job_store.JobRunner(job_store.JobStore(str(tmp_path)), max_workers=1)
+    monkeypatch.setattr(job_store, "_runner", runner)
+
+    tool_b = make_tool({"api_key": "key-b"})
+    submitted = list(tool_b._invoke({"job_mode": "submit", "file": {"name": "b.wav", "type": "audio/wav", "content": make_wav()}}))
+    job, _ = _poll_until_done(tool_b, submitted[0].data["job"]["id"])
+    assert job["status"] == "succeeded"
+    # Tenant B's calls neither ran tenant A's job nor can see it
+    assert len(fake_post) == 1
+    assert store.get(tenant_a)["status"] == "running"
+    with pytest.raises(Exception, match="Unknown job id"):
+        list(tool_b._invoke({"job_mode": "poll", "job_id": tenant_a}))
+    assert "key-a" not in (store.get(tenant_a)["owner"] or "")
+
+    job, _ = _poll_until_done(make_tool({"api_key": "key-a"}), tenant_a)
+    assert job["status"] == "succeeded"
+
+
+def test_live_lease_is_not_taken_over(make_tool, make_wav, tmp_path, monkeypatch, fake_post):
+    # Another plugin process sharing the directory is still running this job
+    store = job_store.JobStore(str(tmp_path))
+    job_id = _orphan(store, make_wav, {"api_key": "k"}, time.time() + 60)
+    runner = job_store.JobRunner(job_store.JobStore(str(tmp_path)), max_workers=1)
+    monkeypatch.setattr(job_store, "_runner", runner)
+    msgs = list(make_tool({"api_key": "k"})._invoke({"job_mode": "poll", "job_id": job_id}))
+    assert msgs[0].data["job"]["status"] == "running"
+    assert runner.recover(lambda job, on_partial: None, job_store.credential_fingerprint({"api_key": "k"})) == 0
+    assert fake_post == []
+
+
+def test_heartbeat_renews_leases(make_wav, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_store, "JOB_LEASE_SECONDS", 0.15)
+    runner = job_store.JobRunner(job_store.JobStore(str(tmp_path)), max_workers=1)
+    release = threading.Event()
+    job_id = runner.submit({}, make_wav(), "owner")
+    runner.dispatch(job_id, lambda job, on_partial: release.wait(5))
+    time.sleep(0.5)
+    # Well past the original lease, yet the job is not an orphan while it runs
+    assert runner.store.orphaned("owner") == []
+    release.set()
+
+
+def test_poll_purges_expired_jobs(make_tool, make_wav, runner, monkeypatch, fake_post):
+    old = runner.store.create({}, make_wav(), "someone")
+    runner.store.finish(old, result={"result": {"text": "x"}})
+    runner.store._execute("UPDATE jobs SET updated = 0 WHERE id = ?", (old,))
+    tool = make_tool({"api_key": "k"})
+    submitted = list(tool._invoke({"job_mode": "submit", "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()}}))
+    assert runner.store.get(old) is None
+    _poll_until_done(tool, submitted[0].data["job"]["id"])
+
+
+def test_split_job_reports_per_part_text(make_tool, make_mp3, runner, monkeypatch):
+    import tools.openai_audio as openai_audio
+
+    seen_partial = []
+    parts_done = []
+
+    def _post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name = files["file"][0]
+        if "part2" in name:
+            # Hold the last part until the first part's text has been published
+            deadline = time.monotonic() + 5
+            while not seen_partial and time.monotonic() < deadline:
+                job = runner.store.get(job_id_box[0]) if job_id_box else None
+                if job and job["partial_text"]:
+                    seen_partial.append(job["partial_text"])
+                time.sleep(0.01)
+        parts_done.append(name)
+        class Resp:
+            status_code = 200
+            text = ""
+            def json(self):
+                return {"text": f"text of {name}"}
+        return Resp()
+
+    job_id_box = []
+    monkeypatch.setattr(requests, "post", _post)
+    monkeypatch.setattr(openai_audio, "MAX_UPLOAD_BYTES", 30_000)
+    monkeypatch.setattr(openai_audio, "SPLIT_CONCURRENCY", 1)
+    monkeypatch.setattr(job_store, "PARTIAL_FLUSH_SECONDS", 0.0)
+    tool = make_tool({"api_key": "k"})
+    submitted = list(tool._invoke({
+        "job_mode": "submit",
+        "file": {"name": "long.mp3", "type": "audio/mpeg", "content": make_mp3(n_frames=100)},
+        "model": "gpt-4o-transcribe",
+    }))
+    job_id_box.append(submitted[0].data["job"]["id"])
+    job, _ = _poll_until_done(tool, job_id_box[0])
+    assert job["status"] == "succeeded"
+    assert seen_partial == ["text of long.part1.mp3"]
+
+
+def test_failed_job_reports_error(make_tool, make_wav, runner, monkeypatch):
+    def _post(*args, **kwargs):
+        class Resp:
+            status_code = 401
+            text = "bad key"
+            def json(self):
+                return {"error": {"message": "bad key"}}
+        return Resp()
+    monkeypatch.setattr(requests, "post", _post)
+    tool = make_tool({"api_key": "k"})
+    msgs = list(tool._invoke({"job_mode": "submit", "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()}}))
+    job, _ = _poll_until_done(tool, msgs[0].data["job"]["id"])
+    assert job["status"] == "failed"
+    assert "bad key" in job["error"]
+
+
+def test_poll_unknown_job(make_tool, runner):
+    with pytest.raises(Exception, match="Unknown job id"):
+        list(make_tool({"api_key": "k"})._invoke({"job_mode": "poll", "job_id": "nope"}))
@@ -0,0 +1,91 @@
+import urllib.request
+
+import pytest
+import requests
+
+from tools import metrics
+from tools.metrics import Counter, Histogram, Registry
+
+
+def test_render_prometheus_text():
+    reg = Registry()
+    c = reg.register(Counter("x_total", "Things.", ("kind",)))
+    h = reg.register(Histogram("lat_seconds", "Latency.", ("ep",), buckets=(0.1, 1.0)))
+    c.inc('a"b')
+    c.inc('a"b', amount=2)
+    h.observe(0.05, "e")
+    h.observe(0.5, "e")
+    h.observe(5, "e")
+    text = reg.render()
+    assert '# TYPE x_total counter\nx_total{kind="a\\"b"} 3\n' in text
+    assert 'lat_seconds_bucket{ep="e",le="0.1"} 1\n' in text
+    assert 'lat_seconds_bucket{ep="e",le="1"} 2\n' in text
+    assert 'lat_seconds_bucket{ep="e",le="+Inf"} 3\n' in text
+    assert 'lat_seconds_sum{ep="e"} 5.55\n' in text
+    assert 'lat_seconds_count{ep="e"} 3\n' in text
+
+
+def test_exports(tmp_path):
+    reg = Registry()
+    reg.counter("up_total", "Up.").inc()
+    path = tmp_path / "metrics.prom"
+    reg.write_textfile(str(path))
+    assert "up_total 1" in path.read_text()
+
+    server = reg.start_http_server(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+        assert "up_total 1" in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_tool_records_requests_and_fallbacks(make_tool, make_wav, monkeypatch):
+    creds = {
+        "azure_endpoint_transcribe": "https://example.openai.azure.com",
+        "azure_api_key_transcribe": "key",
+        "azure_api_version_transcribe": "2024-12-01-preview",
+        "azure_deployment_transcribe": "dep-m",
+    }
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        class Resp:
+            status_code = 404 if "2024-12-01-preview" in url else 200
+            text = "ok"
+            def json(self):
+                return {"text": "ok"}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+    labels = ("example.openai.azure.com/transcriptions", "dep-m", "gpt-4o-transcribe")
+    before_404 = metrics.REQUESTS.value(*labels, "404")
+    before_ok = metrics.REQUESTS.value(*labels, "200")
+    before_fb = metrics.AZURE_VERSION_FALLBACKS.value("dep-m", "2024-02-15-preview", "ok")
+    before_inv = metrics.INVOCATIONS.value("sync", "ok")
+    audio = make_wav(seconds=0.5)
+
+    list(make_tool(creds)._invoke({"file": {"name": "a.wav", "type": "audio/wav", "content": audio}, "stream": False}))
+
+    assert metrics.REQUESTS.value(*labels, "404") == before_404 + 1
+    assert metrics.REQUESTS.value(*labels, "200") == before_ok + 1
+    assert metrics.AZURE_VERSION_FALLBACKS.value("dep-m", "2024-02-15-preview", "ok") == before_fb + 1
+    assert metrics.INVOCATIONS.value("sync", "ok") == before_inv + 1
+    assert metrics.UPLOAD_BYTES.value(*labels) >= 2 * len(audio)
+
+
+def test_provider_validation_counted(monkeypatch):
+    from provider.openai_audio import OpenaiAudioProvider
+
+    def fake_get(url, headers=None, timeout=None):
+        class Resp:
+            status_code = 401
+            def json(self):
+                return {"error": {"message": "bad key"}}
+        return Resp()
+    monkeypatch.setattr(requests, "get", fake_get)
+    before = metrics.CREDENTIAL_VALIDATIONS.value("error")
+    before_req = metrics.VALIDATION_REQUESTS.value("openai", "401")
+    with pytest.raises(Exception, match="bad key"):
+        OpenaiAudioProvider()._validate_credentials({"api_key": "k"})
+    assert metrics.CREDENTIAL_VALIDATIONS.value("error") == before + 1
+    assert metrics.VALIDATION_REQUESTS.value("openai", "401") == before_req + 1
@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+import requests
+
+import tools.openai_audio as openai_audio
+from tools.audio_probe import parse_mp3_header
+from tools.mp3_frames import Mp3FrameIndex
+from tools.transcript_merge import merge_results, merge_subtitles
+
+
+def test_index_skips_tags_and_xing_frame(make_mp3):
+    data = make_mp3(n_frames=50, xing_frames=50, id3=True)
+    index = Mp3FrameIndex.build(data)
+    assert len(index) == 50
+    assert index.duration == pytest.approx(50 * 1152 / 44100)
+    # Every indexed offset is a real frame header
+    assert all(parse_mp3_header(int.from_bytes(data[o:o + 4], "big")) for o in index.offsets[:-1])
+    assert index.offsets[-1] == len(data)
+
+
+def test_index_resyncs_over_junk(make_mp3):
+    data = make_mp3(n_frames=10) + b"\x00junk\x00" + make_mp3(n_frames=10)
+    assert len(Mp3FrameIndex.build(data)) == 20
+    # A gap longer than the initial-sync window (e.g. an embedded picture) is not the end of the stream
+    data = make_mp3(n_frames=10) + b"APIC" + b"\x00" * 100_000 + make_mp3(n_frames=10)
+    index = Mp3FrameIndex.build(data)
+    assert len(index) == 20
+    assert index.offsets[-1] == len(data)
+    assert b"".join(p.data for p in index.split(data, 40_000))[-len(make_mp3(n_frames=10)):] == make_mp3(n_frames=10)
+
+
+def test_split_parts_are_frame_aligned(make_mp3):
+    data = make_mp3(n_frames=100)
+    index = Mp3FrameIndex.build(data)
+    parts = index.split(data, 4000)
+    assert all(len(p.data) <= 4000 for p in parts)
+    assert b"".join(p.data for p in parts) == data
+    for p in parts:
+        assert len(Mp3FrameIndex.build(p.data)) > 0
+        assert parse_mp3_header(int.from_bytes(p.data[:4], "big")) is not None
+    assert parts[0].start_time == 0
+    assert all(a.end_time == b.start_time for a, b in zip(parts, parts[1:]))
+    assert parts[-1].end_time == pytest.approx(index.duration)
+
+
+def test_low_bitrate_split_is_capped_by_duration(make_mp3):
+    # 32kbps: 100 frames (~2.6s) are only ~10KB, far below the byte limit
+    data = make_mp3(n_frames=100, bitrate_idx=1)
+    index = Mp3FrameIndex.build(data)
+    assert len(index.split(data, 25 * 1024 * 1024)) == 1
+    parts = index.split(data, 25 * 1024 * 1024, max_seconds=1.0)
+    assert len(parts) == 3
+    assert all(p.end_time - p.start_time <= 1.0 for p in parts)
+    assert b"".join(p.data for p in parts) == data
+    # Whichever limit is hit first wins
+    assert all(len(p.data) <= 2000 for p in index.split(data, 2000, max_seconds=1.0))
+
+
+def test_merge_verbose_and_subtitles():
+    merged = merge_results(
+        [
+            {"text": "one", "language": "en", "duration": 10.0, "segments": [{"id": 0, "start": 0.0, "end": 10.0, "text": "one"}]},
+            {"text": "two", "language": "en", "duration": 5.0, "segments": [{"id": 0, "start": 1.0, "end": 5.0, "text": "two"}]},
+        ],
+        [0.0, 10.0],
+        "verbose_json",
+    )
+    assert merged["text"] == "one two"
+    assert merged["duration"] == 15.0
+    assert [(s["id"], s["start"]) for s in merged["segments"]] == [(0, 0.0), (1, 11.0)]
+
+    srt = "1\n00:00:01,000 --> 00:00:02,500\nhi\n"
+    assert merge_subtitles([srt, srt], [0.0, 61.0], "srt") == (
+        "1\n00:00:01,000 --> 00:00:02,500\nhi\n\n2\n00:01:02,000 --> 00:01:03,500\nhi\n"
+    )
+
+
+def test_oversized_mp3_is_split_and_uploaded_concurrently(make_tool, make_mp3, monkeypatch):
+    monkeypatch.setattr(openai_audio, "MAX_UPLOAD_BYTES", 8000)
+    data = make_mp3(n_frames=60)
+    uploads = []
+    lock = threading.Lock()
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, payload, mime = files["file"]
+        with lock:
+            uploads.append((name, len(payload), mime, stream))
+        class Resp:
+            status_code = 200
+            text = name
+            def json(self):
+                return {"text": name}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    tool = make_tool({"api_key": "k"})
+    msgs = list(tool._invoke({
+        "file": {"name": "talk.mp3", "type": "", "content": data},
+        "model": "gpt-4o-transcribe",
+        "stream": True,
+        # Internal hooks are not tool parameters
+        "_on_progress": lambda text: pytest.fail("caller-supplied hook must be ignored"),
+    }))
+    assert len(uploads) == 4
+    assert all(size <= 8000 and mime == "audio/mpeg" and not stream for _, size, mime, stream in uploads)
+    result = next(m.data for m in msgs if m.type == "json")
+    assert result["result"]["text"] == "talk.part1.mp3 talk.part2.mp3 talk.part3.mp3 talk.part4.mp3"
+    assert result["stats"]["parts"] == 4
+
+
+def test_oversized_non_mp3_is_rejected(make_tool, make_wav, monkeypatch):
+    monkeypatch.setattr(openai_audio, "MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(requests, "post", lambda *a, **k: pytest.fail("should not upload"))
+    tool = make_tool({"api_key": "k"})
+    with pytest.raises(Exception, match="too large"):
+        list(tool._invoke({"file": {"name": "a.wav", "type": "audio/wav", "content": make_wav(seconds=1)}}))
+
+
+def test_overlong_mp3_is_split_for_gpt4o(make_tool, make_mp3, monkeypatch):
+    monkeypatch.setattr(openai_audio, "MODEL_MAX_SECONDS", {"gpt-4o-transcribe": 1.0})
+    data = make_mp3(n_frames=100, bitrate_idx=1)
+    uploads = []
+    lock = threading.Lock()
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, payload, mime = files["file"]
+        with lock:
+            uploads.append((name, data["model"]))
+        class Resp:
+            status_code = 200
+            text = name
+            def json(self):
+                return {"text": name}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    tool = make_tool({"api_key": "k"})
+    params = {"file": {"name": "talk.mp3", "type": "audio/mpeg", "content": data}, "stream": False, "output_format": "json_only"}
+    msgs = list(tool._invoke(dict(params, model="gpt-4o-transcribe")))
+    assert sorted(uploads) == [(f"talk.part{i}.mp3", "gpt-4o-transcribe") for i in (1, 2, 3)]
+    assert msgs[0].data["stats"]["parts"] == 3
+    # Models without a duration limit get the file in one piece
+    uploads.clear()
+    list(tool._invoke(dict(params, model="whisper-1")))
+    assert [name for name, _ in uploads] == ["talk.mp3"]
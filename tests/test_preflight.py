@@ -0,0 +1,130 @@
+import struct
+import time
+
+import pytest
+import requests
+
+import tools.openai_audio as openai_audio
+from tools import metrics
+from tools.preflight import PreflightError, check_audio, normalise_name, sniff_format
+
+
+def _ogg() -> bytes:
+    return b"OggS\x00\x02" + b"\x00" * 20 + b"\x01\x1e" + b"\x01vorbis" + b"\x00" * 40
+
+
+def _flac() -> bytes:
+    streaminfo = b"\x00" * 10 + struct.pack(">Q", (16000 << 44) | (1 << 36) | 16000) + b"\x00" * 16
+    return b"fLaC" + b"\x80" + (34).to_bytes(3, "big") + streaminfo + b"\x00" * 16
+
+
+def _ebml(doc_type: bytes) -> bytes:
+    header = b"\x42\x86\x81\x01" + b"\x42\x82" + bytes([0x80 | len(doc_type)]) + doc_type
+    return b"\x1a\x45\xdf\xa3" + bytes([0x80 | len(header)]) + header + b"\x00" * 32
+
+
+def test_sniff_by_magic_bytes(make_wav, make_mp3, make_mp4):
+    assert sniff_format(make_wav()).name == "wav"
+    assert sniff_format(make_mp3(n_frames=5)).name == "mp3"
+    assert sniff_format(make_mp3(n_frames=5, id3=True)).name == "mp3"
+    assert sniff_format(make_mp4()).name == "m4a"
+    assert sniff_format(_ogg()).name == "ogg"
+    assert sniff_format(_flac()).name == "flac"
+    assert sniff_format(_ebml(b"webm")).name == "webm"
+    assert sniff_format(_ebml(b"matroska")) is None
+    assert sniff_format(b"FORM\x00\x00\x00\x10AIFFCOMM") is None
+
+
+@pytest.mark.parametrize("data,message", [
+    (b"", "Empty file content"),
+    (b"hello, this is a text file", "Unsupported audio format (unrecognised data)"),
+    (b"FORM\x00\x00\x00\x10AIFFCOMM" + b"\x00" * 32, "Unsupported audio format (AIFF)"),
+    (_ebml(b"matroska"), "Unsupported audio format (Matroska (matroska))"),
+    (b"RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00" + struct.pack("<HHIIHH", 1, 1, 16000, 32000, 2, 16), "WAV file has no data chunk"),
+    (b"RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00" + b"\x00" * 16, "WAV header declares no channels"),
+    (b"ID3\x04\x00\x00\x00\x00\x00\x10" + b"\x00" * 16, "MP3 file has an ID3 tag but no audio"),
+])
+def test_rejects_bad_input(data, message):
+    with pytest.raises(PreflightError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        check_audio(data)
+
+
+def test_integrity_checks(make_wav, make_mp4, make_mp3):
+    with pytest.raises(PreflightError, match="too short"):
+        check_audio(make_wav(seconds=0.05))
+    m4a = make_mp4()
+    with pytest.raises(PreflightError, match="truncated"):
+        check_audio(m4a[:-20])
+    no_moov = m4a[:m4a.index(b"moov") - 4]
+    with pytest.raises(PreflightError, match="no moov"):
+        check_audio(no_moov)
+    with pytest.raises(PreflightError, match="no valid MPEG audio frames"):
+        check_audio(b"ID3\x04\x00\x00\x00\x00\x00\x10" + b"\x00" * 16 + b"\x00" * 4096)
+    with pytest.raises(PreflightError, match="STREAMINFO"):
+        check_audio(b"fLaC\x84" + b"\x00" * 60)
+    assert check_audio(make_mp3()).name == "mp3"
+    assert check_audio(_ogg()).name == "ogg"
+    assert check_audio(_flac()).name == "flac"
+
+
+def test_normalise_name(make_wav, make_mp3):
+    mp3 = sniff_format(make_mp3(n_frames=5))
+    wav = sniff_format(make_wav())
+    assert normalise_name("audio_file.mp4", mp3) == "audio_file.mp3"
+    assert normalise_name("Call.MP3", mp3) == "Call.MP3"
+    assert normalise_name("clip.mpga", mp3) == "clip.mpga"
+    assert normalise_name("audio_file", wav) == "audio_file.wav"
+    assert normalise_name("", wav) == "audio_file.wav"
+
+
+def test_tool_rejects_before_any_connection(make_tool, monkeypatch):
+    def no_post(*args, **kwargs):
+        raise AssertionError("nothing may be uploaded")
+    monkeypatch.setattr(requests, "post", no_post)
+    before = metrics.PREFLIGHT_REJECTIONS.value("unsupported")
+    started = time.monotonic()
+    with pytest.raises(Exception, match="Unsupported audio format"):
+        list(make_tool({"api_key": "k"})._invoke({"file": {"name": "a.mp3", "type": "audio/mpeg", "content": b"<html>" + b"x" * 5_000_000}}))
+    assert time.monotonic() - started < 0.5
+    assert metrics.PREFLIGHT_REJECTIONS.value("unsupported") == before + 1
+
+
+def test_tool_corrects_name_and_mime(make_tool, make_mp3, monkeypatch):
+    seen = []
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, _, mime = files["file"]
+        seen.append((name, mime))
+        class Resp:
+            status_code = 200
+            text = "ok"
+            def json(self):
+                return {"text": "ok"}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+    list(make_tool({"api_key": "k"})._invoke({"file": {"name": "audio_file.mp4", "type": "", "content": make_mp3()}, "stream": False}))
+    assert seen == [("audio_file.mp3", "audio/mpeg")]
+
+
+def test_download_without_content_length_is_capped(make_tool, monkeypatch):
+    File = type("File", (), {"__module__": "dify_plugin.file.file"})
+    remote = File()
+    remote.url = "https://files.example/audio"
+    remote.filename = "big.wav"
+    state = {"chunks": 0, "closed": False}
+
+    class Resp:
+        status_code = 200
+        headers = {}
+        def iter_content(self, chunk_size=None):
+            while True:
+                state["chunks"] += 1
+                yield b"\x00" * 1024
+        def close(self):
+            state["closed"] = True
+
+    monkeypatch.setattr(requests, "get", lambda url, timeout=None, stream=False: Resp())
+    monkeypatch.setattr(openai_audio, "MAX_INPUT_BYTES", 10 * 1024)
+    with pytest.raises(Exception, match="too large"):
+        list(make_tool({"api_key": "k"})._invoke({"file": remote}))
+    assert state["chunks"] == 11
+    assert state["closed"]
@@ -0,0 +1,152 @@
+import os
+import pathlib
+import threading
+import time
+
+import pytest
+import requests
+
+import tools.preprocess as preprocess
+from tools import metrics
+from tools.channel_split import split_wav_channels
+from tools.mp3_frames import Mp3FrameIndex
+from tools.preprocess import PreprocessPool, split_channels, split_mp3
+
+SHM_DIR = pathlib.Path("/dev/shm")
+
+
+def _segments() -> set:
+    # Shared-memory blocks only; the pool's own semaphores also live in /dev/shm
+    return {n for n in os.listdir(SHM_DIR) if n.startswith("psm_")} if SHM_DIR.is_dir() else set()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    # min_bytes=0: every input goes through a worker process
+    p = PreprocessPool(2, min_bytes=0)
+    yield p
+    p.shutdown()
+
+
+def test_pool_channel_split_matches_inline(pool, make_wav):
+    stereo = make_wav(seconds=0.5, channels=2, frames=bytes(range(256)) * 32)
+    before = _segments()
+    pooled_count = metrics.PREPROCESS_SECONDS.count("split_channels", "pool")
+    result = split_channels(pool, stereo)
+    assert all(isinstance(b, memoryview) for b in result.buffers)
+    assert [bytes(b) for b in result.buffers] == split_wav_channels(stereo)
+    result.close()
+    assert result.buffers == []
+    assert metrics.PREPROCESS_SECONDS.count("split_channels", "pool") == pooled_count + 1
+    # Both segments are unlinked once the caller is done
+    assert _segments() == before
+    with split_channels(pool, make_wav(seconds=0.1)) as mono:
+        assert mono.buffers[0] == make_wav(seconds=0.1)
+    assert split_channels(pool, b"not a wav file") is None
+
+
+def test_pool_mp3_split_matches_index(pool, make_mp3):
+    data = make_mp3(n_frames=400)
+    before = _segments()
+    parts = split_mp3(pool, data, 40_000)
+    expected = Mp3FrameIndex.build(data).split(data, 40_000)
+    assert len(parts) == len(expected) > 1
+    for got, want in zip(parts, expected):
+        # Parts are slices of the caller's buffer, not copies
+        assert isinstance(got.data, memoryview) and got.data.obj is data
+        assert (bytes(got.data), got.start_time, got.end_time) == want
+    assert split_mp3(pool, b"\x00" * 1024, 40_000) is None
+    assert _segments() == before
+
+
+def test_small_inputs_and_failures_run_inline(monkeypatch, make_wav):
+    stereo = make_wav(seconds=0.1, channels=2)
+    small = PreprocessPool(2, min_bytes=len(stereo) + 1)
+    result = split_channels(small, stereo)
+    assert all(isinstance(b, bytes) for b in result.buffers)
+    assert small._executor is None
+
+    attempts = []
+    def no_shm(*args, **kwargs):
+        attempts.append(args)
+        raise OSError("no /dev/shm")
+    monkeypatch.setattr(preprocess.shared_memory, "SharedMemory", no_shm)
+    inline_count = metrics.PREPROCESS_SECONDS.count("split_channels", "inline")
+    no_shm_pool = PreprocessPool(2, min_bytes=0)
+    result = split_channels(no_shm_pool, stereo)
+    assert [bytes(b) for b in result.buffers] == split_wav_channels(stereo)
+    assert metrics.PREPROCESS_SECONDS.count("split_channels", "inline") == inline_count + 1
+    # Detected once: later calls run inline without another attempt or a fresh pool
+    assert no_shm_pool.disabled and no_shm_pool._executor is None
+    split_channels(no_shm_pool, stereo)
+    assert len(attempts) == 1 and no_shm_pool._executor is None
+
+
+def test_cancelled_task_runs_inline(pool, monkeypatch, make_wav):
+    stereo = make_wav(seconds=0.1, channels=2)
+    executor = pool._get_executor()
+
+    def cancelled(*args):
+        # What another caller's shutdown of the shared executor looks like from here
+        raise preprocess.CancelledError()
+    monkeypatch.setattr(pool, "_run_pooled", cancelled)
+    with split_channels(pool, stereo) as result:
+        assert [bytes(b) for b in result.buffers] == split_wav_channels(stereo)
+    # Nothing was torn down because of it
+    assert pool._executor is executor and not pool.disabled
+
+
+def test_tool_uploads_pooled_channels(pool, make_tool, make_wav, monkeypatch):
+    stereo = make_wav(seconds=1.0, channels=2)
+    uploads = []
+
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, body, mime = files["file"]
+        uploads.append((name, bytes(body)))
+        class Resp:
+            status_code = 200
+            text = ""
+            def json(self):
+                return {"text": name}
+        return Resp()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(preprocess, "_pool", pool)
+    before = _segments()
+    list(make_tool({"api_key": "k"})._invoke({
+        "file": {"name": "call.wav", "type": "audio/wav", "content": stereo},
+        "model": "gpt-4o-transcribe",
+        "channel_mode": "split",
+    }))
+    assert sorted(uploads) == sorted(zip(["call.left.wav", "call.right.wav"], split_wav_channels(stereo)))
+    assert _segments() == before
+
+
+def test_failed_channel_waits_for_sibling_uploads(pool, make_tool, make_wav, monkeypatch):
+    stereo = make_wav(seconds=1.0, channels=2)
+    both_in_flight = threading.Barrier(2, timeout=5)
+    read = []
+
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        name, body, mime = files["file"]
+        both_in_flight.wait()
+        class Resp:
+            status_code = 500 if "left" in name else 200
+            text = "boom"
+            def json(self):
+                return {"text": name}
+        if "right" in name:
+            # Still reading the pooled buffer after the other channel has failed
+            time.sleep(0.2)
+            read.append(bytes(body))
+        return Resp()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(preprocess, "_pool", pool)
+    with pytest.raises(Exception, match="500"):
+        list(make_tool({"api_key": "k"})._invoke({
+            "file": {"name": "call.wav", "type": "audio/wav", "content": stereo},
+            "model": "gpt-4o-transcribe",
+            "channel_mode": "split",
+        }))
+    assert read == [split_wav_channels(stereo)[1]]
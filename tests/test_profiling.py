@@ -0,0 +1,88 @@
+import json
+import pathlib
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+from cassette import SCENARIOS, Cassette, scenario_params  # noqa: E402
+
+import tools.profiling as profiling
+
+CASSETTES = pathlib.Path(__file__).resolve().parent / "cassettes"
+
+
+def _stream_tool(make_tool):
+    return make_tool(SCENARIOS["azure_transcribe_stream"]["creds"]("https://example.openai.azure.com"))
+
+
+def test_debug_profile_appends_report(make_tool):
+    params = dict(scenario_params("azure_transcribe_stream"), debug_profile=True)
+    with Cassette(str(CASSETTES / "azure_transcribe_stream.json"), speed=20.0):
+        msgs = list(_stream_tool(make_tool)._invoke(params))
+    assert msgs[-1].type == "json"
+    report = msgs[-1].data["profile"]
+    functions = " ".join(row["function"] for row in report["plugin_cpu"])
+    # The suspected hot spots show up by name
+    assert "_parse_sse_line" in functions
+    assert "_read_file_data" in functions
+    assert report["wall_seconds"] > 0
+    assert report["allocations"] == [] or "site" in report["allocations"][0]
+    # Everything before the report is the normal output
+    assert "".join(m.text for m in msgs if m.type == "text").startswith("the quick")
+
+
+def test_profile_dir_writes_files(make_tool, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_AUDIO_PROFILE_DIR", str(tmp_path))
+    params = dict(scenario_params("azure_transcribe_version_fallback"), output_format="text_only")
+    creds = SCENARIOS["azure_transcribe_version_fallback"]["creds"]("https://example.openai.azure.com")
+    with Cassette(str(CASSETTES / "azure_transcribe_version_fallback.json"), speed=20.0):
+        msgs = list(make_tool(creds)._invoke(params))
+    # No extra message without debug_profile
+    assert [m.type for m in msgs] == ["text"]
+    reports = list(tmp_path.glob("*.json"))
+    assert len(reports) == 1
+    assert reports[0].with_suffix(".prof").exists()
+    report = json.loads(reports[0].read_text())
+    assert any("_format_result" in row["function"] for row in report["plugin_cpu"])
+
+
+def test_off_by_default(make_tool, monkeypatch):
+    monkeypatch.delenv("OPENAI_AUDIO_PROFILE_DIR", raising=False)
+    def fail(*args, **kwargs):
+        raise AssertionError("profiler must not run when disabled")
+    monkeypatch.setattr(profiling.InvocationProfiler, "wrap", fail)
+    with Cassette(str(CASSETTES / "azure_transcribe_stream.json"), speed=20.0):
+        msgs = list(_stream_tool(make_tool)._invoke(scenario_params("azure_transcribe_stream")))
+    assert all("profile" not in (m.data if m.type == "json" else {}) for m in msgs)
+
+
+def test_failed_invocation_still_writes_report(make_tool, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_AUDIO_PROFILE_DIR", str(tmp_path))
+    with pytest.raises(Exception, match="No audio file provided"):
+        list(make_tool({"api_key": "k"})._invoke({"debug_profile": True}))
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_one_invocation_traces_allocations_at_a_time():
+    def work():
+        blob = [bytearray(1024) for _ in range(64)]
+        yield len(blob)
+
+    first = profiling.InvocationProfiler("first")
+    outer = first.wrap(work())
+    next(outer)
+    assert tracemalloc.is_tracing()
+    # A concurrent invocation gets CPU data only and leaves the tracer alone
+    second = profiling.InvocationProfiler("second")
+    assert list(second.wrap(work())) == [64]
+    assert second.report["allocations_skipped"] and second.report["peak_traced_kb"] is None
+    assert tracemalloc.is_tracing()
+    list(outer)
+    assert not tracemalloc.is_tracing()
+    assert "allocations_skipped" not in first.report and first.report["peak_traced_kb"] > 0
+    # Free again for the next invocation
+    third = profiling.InvocationProfiler("third")
+    list(third.wrap(work()))
+    assert "allocations_skipped" not in third.report
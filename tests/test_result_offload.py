@@ -0,0 +1,111 @@
+import hashlib
+import json
+
+import requests
+
+import tools.openai_audio as openai_audio
+from tools import metrics
+from tools.compact_transcript import CompactTranscript
+from tools.result_offload import PREVIEW_CHARS, encode_result, summarize
+
+
+def _verbose(n_segments: int) -> dict:
+    segments = [{"id": i, "start": float(i), "end": i + 1.0, "text": f" segment number {i}"} for i in range(n_segments)]
+    return {"task": "transcribe", "language": "english", "duration": float(n_segments),
+            "text": "".join(s["text"] for s in segments).strip(), "segments": segments}
+
+
+def _fake_post(body):
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        class Resp:
+            status_code = 200
+            content = json.dumps(body).encode() if isinstance(body, dict) else body.encode()
+            text = body if isinstance(body, str) else json.dumps(body)
+            def json(self):
+                if isinstance(body, dict):
+                    return body
+                raise ValueError("not json")
+        return Resp()
+    return fake_post
+
+
+def test_encode_goes_by_result_shape():
+    result = _verbose(3)
+    encoded = encode_result(result, "text")
+    assert (encoded.mime_type, encoded.extension) == ("application/json", ".json")
+    assert json.loads(encoded.payload) == result
+    assert json.loads(encode_result(CompactTranscript.from_result(result), "verbose_json").payload) == result
+    srt = encode_result({"text": "1\n00:00:00,000 --> 00:00:01,000\nhéllo\n"}, "srt")
+    assert (srt.mime_type, srt.extension) == ("application/x-subrip", ".srt")
+    assert srt.payload.decode() == "1\n00:00:00,000 --> 00:00:01,000\nhéllo\n"
+    assert encode_result({"text": "plain"}, "json").extension == ".txt"
+
+
+def test_summary_fields():
+    result = _verbose(100)
+    encoded = encode_result(result, "verbose_json")
+    summary = summarize(result, encoded, "call.transcript.json", {"audio_duration": 1.0})
+    assert summary["text"] == result["text"][:PREVIEW_CHARS]
+    assert summary["truncated"] is True
+    assert summary["word_count"] == 300
+    assert summary["duration"] == 100.0
+    assert summary["language"] == "english"
+    assert summary["file"] == {
+        "filename": "call.transcript.json",
+        "mime_type": "application/json",
+        "size": len(encoded.payload),
+        "sha256": hashlib.sha256(encoded.payload).hexdigest(),
+    }
+    vtt = {"text": "WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nhello there\n\n00:00:01.000 --> 00:00:02.000\nbye\n"}
+    assert summarize(vtt, encode_result(vtt, "vtt"), "a.vtt", {"audio_duration": 2.0})["word_count"] == 3
+    assert summarize(vtt, encode_result(vtt, "vtt"), "a.vtt", {"audio_duration": 2.0})["duration"] == 2.0
+
+
+def test_default_output_offloads_large_results(make_tool, make_wav, monkeypatch):
+    result = _verbose(200)
+    monkeypatch.setattr(requests, "post", _fake_post(result))
+    monkeypatch.setattr(openai_audio, "OFFLOAD_MIN_BYTES", 4096)
+    before = metrics.RESULT_OFFLOADS.value("json")
+    params = {
+        "file": {"name": "call.wav", "type": "audio/wav", "content": make_wav()},
+        "model": "whisper-1",
+        "response_format": "verbose_json",
+        "stream": False,
+    }
+    msgs = list(make_tool({"api_key": "k"})._invoke(params))
+    # One summary and one file; the transcript is not repeated as a text message
+    assert [m.type for m in msgs] == ["json", "blob"]
+    summary = msgs[0].data["result"]
+    blob = msgs[1].data
+    assert blob["meta"] == {"mime_type": "application/json", "filename": "call.transcript.json"}
+    assert json.loads(blob["blob"]) == result
+    assert summary["file"]["size"] == len(blob["blob"])
+    assert "segments" not in summary
+    assert "processing_seconds" in msgs[0].data["stats"]
+    assert metrics.RESULT_OFFLOADS.value("json") == before + 1
+
+    # Below the threshold the usual JSON + text pair is sent, without encoding the result to size it
+    encoded = []
+    monkeypatch.setattr(openai_audio, "encode_result", lambda *a: encoded.append(a) or encode_result(*a))
+    monkeypatch.setattr(requests, "post", _fake_post(_verbose(2)))
+    msgs = list(make_tool({"api_key": "k"})._invoke(params))
+    assert [m.type for m in msgs] == ["json", "text"]
+    assert msgs[0].data["result"] == _verbose(2)
+    assert encoded == []
+
+
+def test_file_output_always_offloads(make_tool, make_wav, monkeypatch):
+    srt = "1\n00:00:00,000 --> 00:00:01,000\nhello\n"
+    monkeypatch.setattr(requests, "post", _fake_post(srt))
+    msgs = list(make_tool({"api_key": "k"})._invoke({
+        "file": {"name": "clip", "type": "audio/wav", "content": make_wav()},
+        "model": "whisper-1",
+        "response_format": "srt",
+        "output_format": "file",
+        "stream": True,
+    }))
+    assert [m.type for m in msgs] == ["json", "blob"]
+    assert msgs[1].data["blob"] == srt.encode()
+    assert msgs[1].data["meta"]["filename"] == "clip.transcript.srt"
+    assert msgs[0].data["result"]["word_count"] == 1
+    assert msgs[0].data["result"]["truncated"] is False
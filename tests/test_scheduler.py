@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import tools.scheduler as scheduler_mod
+from tools.scheduler import BULK, INTERACTIVE, LaneConfig, LaneRejected, LaneScheduler, choose_lane
+
+
+def _scheduler(capacity=1, bulk_cap=1, bulk_queue=8, degrade_wait=10.0):
+    return LaneScheduler(
+        capacity,
+        {
+            INTERACTIVE: LaneConfig(capacity, 4.0, 8, 5.0),
+            BULK: LaneConfig(bulk_cap, 1.0, bulk_queue, 5.0),
+        },
+        degrade_wait=degrade_wait,
+    )
+
+
+def _grant_order(sched, lanes):
+    """Queue one waiter per entry of ``lanes`` behind a held slot and record grant order."""
+    order = []
+    sched.acquire(BULK)
+    threads = []
+    for i, lane in enumerate(lanes):
+        def work(lane=lane, i=i):
+            with sched.slot(lane):
+                order.append((lane, i))
+        t = threading.Thread(target=work)
+        t.start()
+        threads.append(t)
+        while sum(v["waiting"] for v in sched.snapshot().values()) < i + 1:
+            time.sleep(0.001)
+    sched.release(BULK)
+    for t in threads:
+        t.join(5)
+    return order
+
+
+def test_weighted_fair_share_prefers_interactive():
+    order = _grant_order(_scheduler(), [BULK] * 4 + [INTERACTIVE] * 4)
+    lanes = [lane for lane, _ in order]
+    # Interactive (weight 4) gets most early slots but bulk is not starved
+    assert lanes[:5].count(INTERACTIVE) >= 3
+    assert BULK in lanes[:5]
+    # FIFO within a lane
+    assert [i for lane, i in order if lane == BULK] == [0, 1, 2, 3]
+
+
+def test_degraded_interactive_defers_bulk():
+    sched = _scheduler(degrade_wait=0.0)
+    sched.interactive_wait_ewma = 1.0
+    order = _grant_order(sched, [BULK, BULK, INTERACTIVE, INTERACTIVE])
+    assert [lane for lane, _ in order] == [INTERACTIVE, INTERACTIVE, BULK, BULK]
+
+
+def test_degradation_decays_without_interactive_traffic():
+    sched = _scheduler(bulk_queue=1, degrade_wait=1.0)
+    sched.interactive_wait_ewma = 5.0
+    # No interactive request queued or running: bulk is neither deferred nor shed
+    assert not sched.degraded
+    sched.acquire(INTERACTIVE)
+    assert sched.degraded
+    # A degraded lane with max_queue=1 still admits one waiter
+    waiter = threading.Thread(target=lambda: sched.release(BULK) if sched.acquire(BULK) is not None else None)
+    waiter.start()
+    while sched.snapshot()[BULK]["waiting"] < 1:
+        time.sleep(0.001)
+    with pytest.raises(LaneRejected):
+        sched.acquire(BULK)
+    sched.release(INTERACTIVE)
+    waiter.join(5)
+
+    sched = _scheduler(degrade_wait=1.0)
+    sched.decay_half_life = 0.05
+    sched.interactive_wait_ewma = 4.0
+    time.sleep(0.2)
+    assert sched.interactive_wait_ewma < 1.0
+    sched.acquire(INTERACTIVE)
+    assert not sched.degraded
+    sched.release(INTERACTIVE)
+
+
+def test_full_bulk_queue_rejects_immediately():
+    sched = _scheduler(bulk_queue=0)
+    with pytest.raises(LaneRejected):
+        sched.acquire(BULK)
+    assert sched.acquire(INTERACTIVE) == pytest.approx(0, abs=0.05)
+
+
+def test_choose_lane():
+    assert choose_lane("auto", 1000, 5.0) == INTERACTIVE
+    assert choose_lane("auto", 6 * 1024 * 1024, None) == BULK
+    assert choose_lane("auto", 1000, 600.0) == BULK
+    assert choose_lane(BULK, 10, 1.0) == BULK
+
+
+def test_queue_wait_reported(make_tool, make_wav, monkeypatch):
+    monkeypatch.setattr(scheduler_mod, "_scheduler", _scheduler())
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        class Resp:
+            status_code = 200
+            text = "hi"
+            def json(self):
+                return {"text": "hi"}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+    msgs = list(make_tool({"api_key": "k"})._invoke({
+        "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav()},
+        "priority": "bulk",
+        "stream": False,
+    }))
+    stats = next(m.data["stats"] for m in msgs if m.type == "json")
+    assert stats["lane"] == BULK
+    assert stats["queue_wait"] >= 0
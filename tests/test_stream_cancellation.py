@@ -0,0 +1,84 @@
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+from standin_server import StandInServer  # noqa: E402
+from stress_stream_abort import open_socket_count  # noqa: E402
+
+
+def _azure_creds(url):
+    return {
+        "azure_endpoint_transcribe": url,
+        "azure_api_key_transcribe": "key",
+        "azure_deployment_transcribe": "gpt-4o-transcribe",
+    }
+
+
+def test_aborted_streams_release_connections(make_tool, make_wav, monkeypatch):
+    import requests
+
+    # Keep every response alive, as a lingering traceback or reference cycle would;
+    # only an explicit close can return the socket then.
+    held = []
+    real_post = requests.post
+    def holding_post(*args, **kwargs):
+        resp = real_post(*args, **kwargs)
+        held.append(resp)
+        return resp
+    monkeypatch.setattr(requests, "post", holding_post)
+
+    audio = make_wav(seconds=0.5)
+    # Effectively endless stream: only a client-side close ends it
+    with StandInServer(stream_events=100000, event_interval=0.001) as server:
+        baseline = open_socket_count()
+        for _ in range(100):
+            gen = make_tool(_azure_creds(server.url))._invoke({
+                "file": {"name": "a.wav", "type": "audio/wav", "content": audio},
+                "model": "gpt-4o-transcribe",
+                "stream": True,
+            })
+            first = next(gen)
+            assert first.type == "text"
+            gen.close()
+        assert server.wait_idle(5.0) == 0
+        if baseline >= 0:
+            assert open_socket_count() - baseline <= 2
+        assert len(server.requests) == 100
+
+
+def test_streamed_transcription_completes(make_tool, make_wav):
+    with StandInServer(text="hello there world", stream_events=3) as server:
+        msgs = list(make_tool(_azure_creds(server.url))._invoke({
+            "file": {"name": "a.wav", "type": "audio/wav", "content": make_wav(seconds=0.5)},
+            "model": "gpt-4o-transcribe",
+            "stream": True,
+        }))
+        assert [m.text for m in msgs if m.type == "text"] == ["hello ", "there ", "world "]
+        assert server.wait_idle() == 0
+
+
+def test_failed_part_cancels_remaining_uploads(make_tool, make_mp3, monkeypatch):
+    import requests
+    import tools.openai_audio as openai_audio
+
+    monkeypatch.setattr(openai_audio, "MAX_UPLOAD_BYTES", 2000)
+    monkeypatch.setattr(openai_audio, "SPLIT_CONCURRENCY", 1)
+    calls = []
+    def fake_post(url, headers=None, data=None, files=None, timeout=None, stream=False):
+        calls.append(files["file"][0])
+        class Resp:
+            status_code = 500
+            text = "boom"
+            def json(self):
+                return {"error": {"message": "boom"}}
+        return Resp()
+    monkeypatch.setattr(requests, "post", fake_post)
+    with pytest.raises(Exception, match="boom"):
+        list(make_tool({"api_key": "k"})._invoke({
+            "file": {"name": "a.mp3", "type": "audio/mpeg", "content": make_mp3(n_frames=40)},
+            "stream": False,
+        }))
+    # Eight parts, one worker: the first failure stops everything queued behind it
+    assert calls == ["a.part1.mp3"]
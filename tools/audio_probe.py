@@ -0,0 +1,210 @@
+"""Header-only audio inspection (no decoding).
+
+Estimates the duration of WAV, MP3 and MP4/M4A payloads by reading the RIFF
+header, the MP3 frame header plus Xing/Info/VBRI tag, or the MP4 ``mvhd`` box.
+Everything here works on the in-memory bytes already loaded by the tool and
+never raises on malformed input: unknown or broken files yield ``None``.
+"""
+import struct
+from typing import NamedTuple, Optional
+
+# MPEG audio Layer III bitrate tables (kbps), indexed by the 4-bit bitrate index
+_MP3_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0)
+_MP3_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0)
+# Sample rates indexed by [version bits][sample-rate index]; version bits: 0=2.5, 2=2, 3=1
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+
+class Mp3FrameHeader(NamedTuple):
+    version: int  # raw version bits: 3=MPEG1, 2=MPEG2, 0=MPEG2.5
+    bitrate: int  # bits per second
+    sample_rate: int
+    padding: int
+    channels: int
+    frame_length: int  # bytes, header included
+    samples: int  # PCM samples per frame
+
+
+def parse_mp3_header(header: int) -> Optional[Mp3FrameHeader]:
+    """Decode a 32-bit big-endian MPEG Layer III frame header, or return None."""
+    if (header >> 21) & 0x7FF != 0x7FF:
+        return None
+    version = (header >> 19) & 0x3
+    layer = (header >> 17) & 0x3
+    bitrate_idx = (header >> 12) & 0xF
+    sr_idx = (header >> 10) & 0x3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    padding = (header >> 9) & 0x1
+    channels = 1 if ((header >> 6) & 0x3) == 3 else 2
+    sample_rate = _MP3_SAMPLE_RATES[version][sr_idx]
+    if version == 3:
+        bitrate = _MP3_BITRATES_V1[bitrate_idx] * 1000
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        bitrate = _MP3_BITRATES_V2[bitrate_idx] * 1000
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    return Mp3FrameHeader(version, bitrate, sample_rate, padding, channels, frame_length, samples)
+
+
+def id3v2_size(data: bytes) -> int:
+    """Size in bytes of a leading ID3v2 tag (0 if absent)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_mp3_frame(data: bytes, start: int = 0, limit: int = 64 * 1024) -> Optional[tuple[int, Mp3FrameHeader]]:
+    """Find the first plausible frame at or after ``start``.
+
+    A candidate is accepted only when the next frame header also parses, which
+    filters out stray 0xFFEx bytes inside tags or garbage.
+    """
+    end = min(len(data) - 4, start + limit)
+    pos = data.find(b"\xff", start, end)
+    while 0 <= pos < end:
+        hdr = parse_mp3_header(struct.unpack_from(">I", data, pos)[0])
+        if hdr is not None:
+            nxt = pos + hdr.frame_length
+            if nxt + 4 > len(data) or parse_mp3_header(struct.unpack_from(">I", data, nxt)[0]) is not None:
+                return pos, hdr
+        pos = data.find(b"\xff", pos + 1, end)
+    return None
+
+
+def mp3_vbr_frame_count(data: bytes, pos: int, hdr: Mp3FrameHeader) -> Optional[int]:
+    """Total frame count from a Xing/Info or VBRI tag in the frame at ``pos``."""
+    if hdr.version == 3:
+        side_info = 32 if hdr.channels == 2 else 17
+    else:
+        side_info = 17 if hdr.channels == 2 else 9
+    xing = pos + 4 + side_info
+    tag = data[xing:xing + 4]
+    if tag in (b"Xing", b"Info") and len(data) >= xing + 12:
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 0x1:
+            return struct.unpack_from(">I", data, xing + 8)[0]
+        return None
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        return struct.unpack_from(">I", data, vbri + 14)[0]
+    return None
+
+
+def looks_like_mp3(data: bytes) -> bool:
+    """Cheap magic check: leading ID3v2 tag or an MPEG frame sync at offset 0."""
+    return data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0)
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    pos = 12
+    byte_rate = 0
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 20 <= len(data):
+            byte_rate = struct.unpack_from("<I", data, pos + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streaming writers leave 0/0xFFFFFFFF in the size field; fall back to what we have
+            if chunk_size in (0, 0xFFFFFFFF) or pos + 8 + chunk_size > len(data):
+                chunk_size = len(data) - pos - 8
+            return chunk_size / byte_rate
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _mp3_duration(data: bytes) -> Optional[float]:
+    found = find_mp3_frame(data, id3v2_size(data))
+    if found is None:
+        return None
+    pos, hdr = found
+    frames = mp3_vbr_frame_count(data, pos, hdr)
+    if frames:
+        return frames * hdr.samples / hdr.sample_rate
+    # CBR estimate: remaining bytes at the first frame's bitrate (ID3v1 tag excluded)
+    audio_bytes = len(data) - pos - (128 if data[-128:-125] == b"TAG" else 0)
+    return audio_bytes * 8 / hdr.bitrate
+
+
+def _mp4_duration(data: bytes) -> Optional[float]:
+    def _boxes(start: int, end: int):
+        pos = start
+        while pos + 8 <= end:
+            size, kind = struct.unpack_from(">I4s", data, pos)
+            header = 8
+            if size == 1 and pos + 16 <= end:
+                size = struct.unpack_from(">Q", data, pos + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - pos
+            if size < header:
+                return
+            yield kind, pos + header, min(pos + size, end)
+            pos += size
+
+    for kind, body, body_end in _boxes(0, len(data)):
+        if kind != b"moov":
+            continue
+        for sub, sub_body, _ in _boxes(body, body_end):
+            if sub != b"mvhd":
+                continue
+            version = data[sub_body]
+            if version == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, sub_body + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, sub_body + 12)
+            return duration / timescale if timescale else None
+    return None
+
+
+def estimate_duration(data: bytes) -> Optional[float]:
+    """Best-effort audio duration in seconds from container headers, or None."""
+    try:
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            return _wav_duration(data)
+        if data[4:8] == b"ftyp":
+            return _mp4_duration(data)
+        if looks_like_mp3(data):
+            return _mp3_duration(data)
+    except (struct.error, IndexError, ZeroDivisionError):
+        return None
+    return None
+
+
+# Rough server-side processing time per second of audio, by model. Used to size
+# read timeouts; deliberately pessimistic so healthy requests are never cut off.
+MODEL_REAL_TIME_FACTORS = {
+    "whisper-1": 0.25,
+    "gpt-4o-transcribe": 0.2,
+    "gpt-4o-mini-transcribe": 0.12,
+}
+
+
+def expected_processing_seconds(duration: Optional[float], model: str) -> Optional[float]:
+    if duration is None:
+        return None
+    return duration * MODEL_REAL_TIME_FACTORS.get(model, 0.25)
+
+
+def adaptive_read_timeout(
+    duration: Optional[float], model: str, default: float, ceiling: float, floor: float = 30.0
+) -> float:
+    """Read timeout scaled to the expected processing time.
+
+    Short clips get ``floor`` (never more than ``default``), long recordings may
+    go up to ``ceiling``, and unknown durations keep ``default``.
+    """
+    expected = expected_processing_seconds(duration, model)
+    if expected is None:
+        return default
+    return max(min(floor, default), min(ceiling, 15 + 4 * expected))
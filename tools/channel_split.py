@@ -0,0 +1,118 @@
+"""Split a multi-channel PCM WAV into one mono WAV per channel.
+
+Used by ``channel_mode=split`` for call recordings with one speaker per
+channel. Samples are de-interleaved without decoding: with NumPy as a
+strided view over (frames, channels, sample bytes), otherwise with
+bytearray extended-slice copies, one per sample byte, which also run in C.
+"""
+import struct
+from typing import NamedTuple, Optional
+
+# NumPy module once loaded, False if unavailable. Optional (the pure-Python path
+# gives identical output) and imported on first use to keep it off cold start
+_numpy = None
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # pragma: no cover - depends on environment
+            _numpy = False
+    return _numpy or None
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavLayout(NamedTuple):
+    format_tag: int  # PCM or IEEE float (EXTENSIBLE resolved to its subformat)
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int
+
+
+def parse_wav_layout(data: bytes) -> Optional[WavLayout]:
+    """Locate the fmt and data chunks of a PCM/float WAV; None for anything else."""
+    if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 24 <= len(data):
+            tag, channels, rate, _, block_align, bits = struct.unpack_from("<HHIIHH", data, pos + 8)
+            if tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40 and pos + 34 <= len(data):
+                # The sub-format GUID starts with the real format tag
+                tag = struct.unpack_from("<H", data, pos + 32)[0]
+            fmt = (tag, channels, rate, bits, block_align)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            tag, channels, rate, bits, block_align = fmt
+            if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT) or not channels or bits % 8:
+                return None
+            if block_align != channels * bits // 8:
+                return None
+            # Streaming writers leave 0/0xFFFFFFFF in the size field; use what we have
+            if chunk_size in (0, 0xFFFFFFFF) or pos + 8 + chunk_size > len(data):
+                chunk_size = len(data) - pos - 8
+            chunk_size -= chunk_size % block_align
+            return WavLayout(tag, channels, rate, bits, block_align, pos + 8, chunk_size)
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def mono_wav_header(layout: WavLayout, data_size: int) -> bytes:
+    width = layout.bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+        + b"fmt " + struct.pack(
+            "<IHHIIHH", 16, layout.format_tag, 1, layout.sample_rate,
+            layout.sample_rate * width, width, layout.bits_per_sample,
+        )
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def deinterleave(pcm: bytes, channels: int, width: int) -> list[bytes]:
+    """Interleaved frames -> one contiguous sample buffer per channel."""
+    if channels == 1:
+        return [bytes(pcm)]
+    frames = len(pcm) // (channels * width)
+    numpy = _load_numpy()
+    if numpy is not None:
+        view = numpy.frombuffer(pcm, dtype=numpy.uint8, count=frames * channels * width).reshape(frames, channels, width)
+        return [view[:, ch, :].tobytes() for ch in range(channels)]
+    stride = channels * width
+    out = []
+    for ch in range(channels):
+        mono = bytearray(frames * width)
+        for k in range(width):
+            mono[k::width] = pcm[ch * width + k:frames * stride:stride]
+        out.append(bytes(mono))
+    return out
+
+
+def split_wav_channels(data: bytes) -> Optional[list[bytes]]:
+    """One mono WAV file per channel, or None if ``data`` is not PCM/float WAV."""
+    layout = parse_wav_layout(data)
+    if layout is None:
+        return None
+    pcm = memoryview(data)[layout.data_offset:layout.data_offset + layout.data_size]
+    buffers = deinterleave(pcm, layout.channels, layout.bits_per_sample // 8)
+    return [mono_wav_header(layout, len(b)) + b for b in buffers]
+
+
+def channel_labels(spec: Optional[str], channels: int) -> list[str]:
+    """Speaker labels from a comma-separated spec, defaulting to left/right or channel_N."""
+    given = [s.strip() for s in (spec or "").split(",") if s.strip()]
+    defaults = ["left", "right"] if channels == 2 else [f"channel_{i + 1}" for i in range(channels)]
+    return [given[i] if i < len(given) else defaults[i] for i in range(channels)]
@@ -0,0 +1,408 @@
+"""Array-backed storage for large ``verbose_json`` results.
+
+Word- and segment-level timestamps on long audio arrive as tens of thousands
+of small objects. ``CompactTranscript`` keeps each list as columns instead:
+numbers in ``array`` buffers, strings as offsets into one joined string and
+integer lists (segment ``tokens``) flattened with a bounds array. A word then
+costs ~30 bytes instead of ~400 as a dict with boxed floats. The original
+dict shape is rebuilt only when asked for (``to_dict``), e.g. for the JSON
+message, and ``to_json_bytes`` writes the JSON document from the columns (in
+bounded row batches with orjson) without it.
+
+``loads_compact`` fills the columns while the body is being decoded, so the
+full dict tree never exists at once: peak memory is about half that of a
+plain decode, which is the point of the format (measured by
+``scripts/bench_compact_transcript.py``). Decoding first and compacting
+afterwards (``CompactTranscript.from_result``) only lowers what is retained.
+
+Lists whose items do not share one key set and one value type per key are
+kept as plain lists, so the round trip through ``to_dict`` is always exact.
+"""
+import json
+from array import array
+from io import StringIO
+from json.encoder import encode_basestring
+from itertools import accumulate
+from typing import Any, Iterator, Optional
+
+try:  # optional faster decoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+# List-valued keys stored as columns when present
+TABLE_KEYS = ("segments", "words")
+# Rows expanded at a time when orjson writes a table
+JSON_BATCH_ROWS = 2048
+
+
+def loads(body: bytes) -> Any:
+    """Decode a JSON response body straight from bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to UTF-8 JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+_NON_FINITE = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+def _floats_json(values: array) -> list[str]:
+    # float repr is what json.dumps writes, except for the NaN/Infinity spelling
+    out = list(map(float.__repr__, values))
+    if _NON_FINITE.keys() & set(out):
+        out = [_NON_FINITE.get(v, v) for v in out]
+    return out
+
+
+def _column_kind(value: Any) -> Optional[str]:
+    # bool is an int subclass but must round-trip as bool
+    if type(value) is float:
+        return "float"
+    if type(value) is int:
+        return "int"
+    if type(value) is str:
+        return "str"
+    if type(value) is list and all(type(v) is int for v in value):
+        return "ints"
+    return None
+
+
+class ColumnTable:
+    """A list of same-shaped dicts stored column-wise."""
+
+    def __init__(self, keys: tuple, kinds: tuple, columns: list, length: int):
+        self.keys = keys
+        self.kinds = kinds
+        # float/int: array of values; str: (joined text, bounds); ints: (flat values, bounds)
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_items(cls, items: list) -> Optional["ColumnTable"]:
+        """Build a table, or return None when the items are not uniform."""
+        if not items or type(items[0]) is not dict:
+            return None
+        keys = tuple(items[0])
+        kinds = tuple(_column_kind(v) for v in items[0].values())
+        if None in kinds:
+            return None
+        columns = []
+        for key, kind in zip(keys, kinds):
+            try:
+                values = [item[key] for item in items]
+            except (KeyError, TypeError):
+                return None
+            if any(_column_kind(v) != kind for v in values):
+                return None
+            if kind == "float":
+                columns.append(array("d", values))
+            elif kind == "int":
+                try:
+                    columns.append(array("q", values))
+                except OverflowError:
+                    return None
+            elif kind == "str":
+                columns.append(("".join(values), array("Q", accumulate(map(len, values), initial=0))))
+            else:
+                flat = array("q")
+                for v in values:
+                    flat.extend(v)
+                columns.append((flat, array("Q", accumulate(map(len, values), initial=0))))
+        if any(len(item) != len(keys) for item in items):
+            return None
+        return cls(keys, kinds, columns, len(items))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _column_values(self, index: int, start: int = 0, stop: Optional[int] = None) -> list:
+        kind = self.kinds[index]
+        column = self.columns[index]
+        stop = self.length if stop is None else stop
+        if kind in ("float", "int"):
+            return column[start:stop].tolist()
+        data, bounds = column
+        bounds = bounds[start:stop + 1]
+        if kind == "ints":
+            data = data[bounds[0]:bounds[-1]].tolist()
+            return [data[a - bounds[0]:b - bounds[0]] for a, b in zip(bounds, bounds[1:])]
+        return [data[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    def _column_json(self, index: int) -> list[str]:
+        # Each value of the column as JSON text
+        kind = self.kinds[index]
+        column = self.columns[index]
+        if kind == "float":
+            return _floats_json(column)
+        if kind == "int":
+            return list(map(str, column))
+        data, bounds = column
+        if kind == "str":
+            return [encode_basestring(data[a:b]) for a, b in zip(bounds, bounds[1:])]
+        values = list(map(str, data))
+        return ["[" + ",".join(values[a:b]) + "]" for a, b in zip(bounds, bounds[1:])]
+
+    def to_json(self) -> str:
+        """The list as JSON text, built from the columns without per-item dicts."""
+        row = "{" + ",".join(encode_basestring(k).replace("%", "%%") + ":%s" for k in self.keys) + "}"
+        return "[" + ",".join(row % values for values in zip(*(self._column_json(i) for i in range(len(self.keys))))) + "]"
+
+    def to_json_bytes(self) -> bytes:
+        """UTF-8 JSON of the list; with orjson, a batch of rows at a time."""
+        if orjson is None:
+            return self.to_json().encode("utf-8")
+        batches = (
+            orjson.dumps(self.to_list(start, start + JSON_BATCH_ROWS))[1:-1]
+            for start in range(0, self.length, JSON_BATCH_ROWS)
+        )
+        return b"[" + b",".join(batches) + b"]"
+
+    def column(self, key: str) -> list:
+        return self._column_values(self.keys.index(key))
+
+    def to_list(self, start: int = 0, stop: Optional[int] = None) -> list[dict]:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in zip(*(self._column_values(i, start, stop) for i in range(len(keys))))]
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.to_list())
+
+    def __getitem__(self, i: int) -> dict:
+        if not -self.length <= i < self.length:
+            raise IndexError(i)
+        i %= self.length
+        item = {}
+        for key, kind, column in zip(self.keys, self.kinds, self.columns):
+            if kind in ("float", "int"):
+                item[key] = column[i]
+            else:
+                data, bounds = column
+                value = data[bounds[i]:bounds[i + 1]]
+                item[key] = value.tolist() if kind == "ints" else value
+        return item
+
+    def slice(self, start: int, stop: int) -> "ColumnTable":
+        """Rows ``[start, stop)`` as a new table."""
+        columns = []
+        for kind, column in zip(self.kinds, self.columns):
+            if kind in ("float", "int"):
+                columns.append(column[start:stop])
+            else:
+                data, bounds = column
+                base = bounds[start]
+                columns.append((data[base:bounds[stop]], array("Q", (b - base for b in bounds[start:stop + 1]))))
+        return ColumnTable(self.keys, self.kinds, columns, stop - start)
+
+    def shifted(self, offset: float, renumber_from: Optional[int] = None) -> "ColumnTable":
+        """Copy with ``start``/``end`` moved by ``offset`` (and ``id`` renumbered)."""
+        columns = list(self.columns)
+        for i, (key, kind) in enumerate(zip(self.keys, self.kinds)):
+            if key in ("start", "end") and kind == "float":
+                columns[i] = array("d", [round(v + offset, 3) for v in columns[i]])
+            elif key == "id" and kind == "int" and renumber_from is not None:
+                columns[i] = array("q", range(renumber_from, renumber_from + self.length))
+        return ColumnTable(self.keys, self.kinds, columns, self.length)
+
+    @classmethod
+    def concat(cls, tables: list["ColumnTable"]) -> Optional["ColumnTable"]:
+        """Append same-shaped tables; None when their shapes differ."""
+        first = tables[0]
+        if any(t.keys != first.keys or t.kinds != first.kinds for t in tables):
+            return None
+        columns = []
+        for i, kind in enumerate(first.kinds):
+            if kind in ("float", "int"):
+                merged = array(first.columns[i].typecode)
+                for t in tables:
+                    merged.extend(t.columns[i])
+                columns.append(merged)
+                continue
+            data = "" if kind == "str" else array("q")
+            bounds = array("Q", [0])
+            for t in tables:
+                part, part_bounds = t.columns[i]
+                base = bounds[-1]
+                bounds.extend(b + base for b in part_bounds[1:])
+                data += part
+            columns.append((data, bounds))
+        return cls(first.keys, first.kinds, columns, sum(t.length for t in tables))
+
+    def nbytes(self) -> int:
+        total = 0
+        for kind, column in zip(self.kinds, self.columns):
+            if kind in ("float", "int"):
+                total += column.itemsize * len(column)
+            else:
+                data, bounds = column
+                total += bounds.itemsize * len(bounds)
+                total += len(data) if kind == "str" else data.itemsize * len(data)
+        return total
+
+
+class CompactTranscript:
+    """A transcription result with its segment/word lists stored as ``ColumnTable``s."""
+
+    def __init__(self, fields: dict):
+        # Key order of the original result, with tables in place of their lists
+        self.fields = fields
+
+    @classmethod
+    def from_result(cls, result: Any) -> Any:
+        """Compact a decoded result; anything without uniform tables is returned unchanged."""
+        if not isinstance(result, dict):
+            return result
+        fields = dict(result)
+        compacted = False
+        for key in TABLE_KEYS:
+            if isinstance(fields.get(key), list):
+                table = ColumnTable.from_items(fields[key])
+                if table is not None:
+                    fields[key] = table
+                    compacted = True
+        return cls(fields) if compacted else result
+
+    @property
+    def text(self) -> str:
+        return str(self.fields.get("text", ""))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.fields.get(key, default)
+        return value.to_list() if isinstance(value, ColumnTable) else value
+
+    def table(self, key: str) -> Optional[ColumnTable]:
+        value = self.fields.get(key)
+        return value if isinstance(value, ColumnTable) else None
+
+    def to_dict(self) -> dict:
+        return {k: v.to_list() if isinstance(v, ColumnTable) else v for k, v in self.fields.items()}
+
+    def to_json_bytes(self) -> bytes:
+        """UTF-8 JSON of ``to_dict()``, written from the columns without building it."""
+        parts = [
+            dumps(key) + b":" + (value.to_json_bytes() if isinstance(value, ColumnTable) else dumps(value))
+            for key, value in self.fields.items()
+        ]
+        return b"{" + b",".join(parts) + b"}"
+
+    def nbytes(self) -> int:
+        """Approximate payload size of the columns (excluding small scalar fields)."""
+        return sum(v.nbytes() for v in self.fields.values() if isinstance(v, ColumnTable))
+
+
+_INT64 = range(-(1 << 63), 1 << 63)
+
+
+def _row_kinds(obj: dict) -> Optional[tuple]:
+    """Column kinds of a flat object that fits a ``ColumnTable`` row, else None."""
+    kinds = tuple(map(_column_kind, obj.values()))
+    if None in kinds:
+        return None
+    for kind, value in zip(kinds, obj.values()):
+        if (kind == "int" and value not in _INT64) or (kind == "ints" and not all(v in _INT64 for v in value)):
+            return None
+    return kinds
+
+
+class _RowBuilder:
+    """Columns filled one decoded object at a time (see ``loads_compact``)."""
+
+    def __init__(self, keys: tuple, kinds: tuple):
+        self.keys = keys
+        self.kinds = kinds
+        self.length = 0
+        self.columns: list = []
+        for kind in kinds:
+            if kind in ("float", "int"):
+                self.columns.append(array("d" if kind == "float" else "q"))
+            else:
+                self.columns.append((StringIO() if kind == "str" else array("q"), array("Q", [0])))
+
+    def append(self, values) -> None:
+        for kind, column, value in zip(self.kinds, self.columns, values):
+            if kind in ("float", "int"):
+                column.append(value)
+                continue
+            data, bounds = column
+            if kind == "str":
+                data.write(value)
+            else:
+                data.extend(value)
+            bounds.append(bounds[-1] + len(value))
+        self.length += 1
+
+    def table(self) -> ColumnTable:
+        columns = [
+            (column[0].getvalue(), column[1]) if kind == "str" else column
+            for kind, column in zip(self.kinds, self.columns)
+        ]
+        return ColumnTable(self.keys, self.kinds, columns, self.length)
+
+
+def _settle(value: Any, tables: dict, cursors: dict, table_key: bool = False) -> Any:
+    # Replace builder references (in document order) by their table, or by their rows as dicts
+    if isinstance(value, _RowBuilder):
+        cursors[value] += 1
+        return tables[value][cursors[value] - 1]
+    if isinstance(value, list):
+        first = value[0] if value else None
+        if table_key and isinstance(first, _RowBuilder) and all(v is first for v in value):
+            start = cursors[first]
+            cursors[first] = start + len(value)
+            table = tables[first]
+            return table if len(value) == len(table) else table.slice(start, start + len(value))
+        return [_settle(v, tables, cursors) for v in value]
+    if isinstance(value, dict):
+        return {k: _settle(v, tables, cursors) for k, v in value.items()}
+    return value
+
+
+def loads_compact(body: bytes) -> Any:
+    """Decode a JSON body into what ``CompactTranscript.from_result(loads(body))`` gives,
+    without ever holding the decoded dict tree.
+
+    The decoder hands every object to a hook as soon as it is parsed. Flat
+    objects are appended to the column builder for their shape and replaced by
+    a reference to it, so each item dict is freed right away; lists at
+    ``TABLE_KEYS`` made of one builder's rows become that builder's table, and
+    any other reference is expanded back to its dict. Uses the standard
+    ``json`` decoder (orjson has no object hook).
+    """
+    builders: dict[tuple, _RowBuilder] = {}
+
+    def hook(obj: dict) -> Any:
+        kinds = _row_kinds(obj)
+        if kinds is None:
+            return obj
+        shape = (tuple(obj), kinds)
+        builder = builders.get(shape)
+        if builder is None:
+            builder = builders[shape] = _RowBuilder(*shape)
+        builder.append(obj.values())
+        return builder
+
+    decoded = json.loads(body, object_hook=hook)
+    if not builders:
+        return decoded
+    tables = {b: b.table() for b in builders.values()}
+    cursors = dict.fromkeys(tables, 0)
+    if isinstance(decoded, dict):
+        fields = {k: _settle(v, tables, cursors, k in TABLE_KEYS) for k, v in decoded.items()}
+        result = CompactTranscript(fields) if any(isinstance(v, ColumnTable) for v in fields.values()) else fields
+    else:
+        result = _settle(decoded, tables, cursors)
+    if any(cursors[b] != b.length for b in tables):
+        # Rows of an object dropped as a duplicate key shift every later position: decode plainly
+        return CompactTranscript.from_result(loads(body))
+    return result
+
+
+def to_plain(result: Any) -> Any:
+    """Existing dict shape for any result the tool produces."""
+    return result.to_dict() if isinstance(result, CompactTranscript) else result
@@ -0,0 +1,283 @@
+"""Persistent background jobs for long transcriptions (``job_mode=submit|poll``).
+
+Jobs live in a small SQLite database next to a spool directory holding the
+submitted audio, so both survive a plugin restart. Credentials are never
+persisted, only a one-way fingerprint of them (``owner``): a job runs with the
+credentials of the invocation that dispatched it, and an orphaned job is only
+re-dispatched by a later submit/poll call whose credentials have the same
+fingerprint. Each queued or running job carries a lease held by the runner
+that owns it and renewed by a heartbeat; a job is orphaned once its lease has
+expired, so several plugin processes can share one job directory.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+JOB_DIR = os.getenv("OPENAI_AUDIO_JOB_DIR") or os.path.join(tempfile.gettempdir(), "openai_audio_jobs")
+# Background workers; kept small so long jobs cannot crowd out interactive calls
+JOB_MAX_WORKERS = int(os.getenv("OPENAI_AUDIO_JOB_WORKERS", "2"))
+# Finished jobs (and their results) are purged after this many seconds
+JOB_TTL_SECONDS = int(os.getenv("OPENAI_AUDIO_JOB_TTL", str(24 * 3600)))
+# Minimum interval between partial-text writes for one job
+PARTIAL_FLUSH_SECONDS = 1.0
+# A job whose lease is not renewed for this long is treated as orphaned
+JOB_LEASE_SECONDS = float(os.getenv("OPENAI_AUDIO_JOB_LEASE", "60"))
+# Minimum interval between purges of expired jobs (done on submit/poll)
+PURGE_INTERVAL_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    audio_path TEXT,
+    partial_text TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    owner TEXT,
+    lease_owner TEXT,
+    lease_expires REAL
+)
+"""
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = (("owner", "TEXT"), ("lease_owner", "TEXT"), ("lease_expires", "REAL"))
+
+
+def credential_fingerprint(credentials: dict) -> str:
+    """One-way fingerprint of a credential set; identifies who may resume a job."""
+    canonical = json.dumps({k: v for k, v in (credentials or {}).items() if v}, sort_keys=True, default=str)
+    return hashlib.sha256(b"openai-audio-job-owner\0" + canonical.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    def __init__(self, directory: str):
+        self.directory = pathlib.Path(directory)
+        self.spool = self.directory / "spool"
+        self.spool.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / "jobs.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in _MIGRATIONS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _execute(self, sql: str, args: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def _update(self, sql: str, args: tuple = ()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, args).rowcount
+
+    def create(self, params: dict, audio: bytes, owner: str, lease_owner: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        audio_path = self.spool / f"{job_id}.audio"
+        audio_path.write_bytes(audio)
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, params, audio_path, created, updated, owner, lease_owner, lease_expires)"
+            " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, json.dumps(params), str(audio_path), now, now, owner, lease_owner, now + JOB_LEASE_SECONDS if lease_owner else None),
+        )
+        return job_id
+
+    def claim(self, job_id: str, lease_owner: str) -> bool:
+        """Take (or keep) the lease on an unfinished job; False if another live runner holds it."""
+        now = time.time()
+        return self._update(
+            "UPDATE jobs SET lease_owner = ?, lease_expires = ? WHERE id = ? AND status IN ('queued', 'running')"
+            " AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires IS NULL OR lease_expires < ?)",
+            (lease_owner, now + JOB_LEASE_SECONDS, job_id, lease_owner, now),
+        ) == 1
+
+    def renew(self, job_ids: list[str], lease_owner: str) -> None:
+        expires = time.time() + JOB_LEASE_SECONDS
+        for job_id in job_ids:
+            self._execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ?", (expires, job_id, lease_owner))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute(
+            "SELECT id, status, params, audio_path, partial_text, result, error, created, updated, owner FROM jobs WHERE id = ?",
+            (job_id,),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "id": row[0],
+            "status": row[1],
+            "params": json.loads(row[2]),
+            "audio_path": row[3],
+            "partial_text": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created": row[7],
+            "updated": row[8],
+            "owner": row[9],
+        }
+
+    def set_status(self, job_id: str, status: str) -> None:
+        self._execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def set_partial(self, job_id: str, text: str) -> None:
+        self._execute("UPDATE jobs SET partial_text = ?, updated = ? WHERE id = ?", (text, time.time(), job_id))
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None, partial_text: str = "") -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, partial_text = ?, updated = ? WHERE id = ?",
+            (
+                "failed" if error else "succeeded",
+                json.dumps(result) if result is not None else None,
+                error,
+                partial_text,
+                time.time(),
+                job_id,
+            ),
+        )
+        self._remove_audio(job_id)
+
+    def orphaned(self, owner: str) -> list[str]:
+        """Unfinished jobs of ``owner`` whose runner has stopped renewing its lease."""
+        return [
+            r[0]
+            for r in self._execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status IN ('queued', 'running')"
+                " AND (lease_expires IS NULL OR lease_expires < ?) ORDER BY created",
+                (owner, time.time()),
+            )
+        ]
+
+    def purge(self, ttl_seconds: float) -> None:
+        """Delete jobs untouched for ``ttl_seconds``, except ones a live runner still holds."""
+        now = time.time()
+        where = (
+            "updated < ? AND (status IN ('succeeded', 'failed') OR lease_expires IS NULL OR lease_expires < ?)"
+        )
+        args = (now - ttl_seconds, now)
+        for (job_id,) in self._execute(f"SELECT id FROM jobs WHERE {where}", args):
+            self._remove_audio(job_id)
+        self._execute(f"DELETE FROM jobs WHERE {where}", args)
+
+    def _remove_audio(self, job_id: str) -> None:
+        try:
+            (self.spool / f"{job_id}.audio").unlink()
+        except FileNotFoundError:
+            pass
+
+
+class JobRunner:
+    """Bounded worker pool executing jobs from a JobStore."""
+
+    def __init__(self, store: JobStore, max_workers: int = JOB_MAX_WORKERS):
+        self.store = store
+        # Lease holder id: unique per runner, so per plugin process
+        self.instance = uuid.uuid4().hex
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="openai-audio-job")
+        self._active: set[str] = set()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def submit(self, params: dict, audio: bytes, owner: str) -> str:
+        """Store a new job, leased to this runner until it is dispatched."""
+        return self.store.create(params, audio, owner, lease_owner=self.instance)
+
+    def dispatch(self, job_id: str, run: Callable[[dict, Callable[[str], None]], Any]) -> bool:
+        """Schedule ``run(job, on_partial)`` unless the job is already running here or leased elsewhere.
+
+        ``run`` returns the final result; ``on_partial`` receives the text so far.
+        """
+        with self._lock:
+            if job_id in self._active:
+                return False
+            if not self.store.claim(job_id, self.instance):
+                return False
+            self._active.add(job_id)
+            self._start_heartbeat()
+        self._pool.submit(self._execute, job_id, run)
+        return True
+
+    def recover(self, run: Callable[[dict, Callable[[str], None]], Any], owner: str) -> int:
+        """Re-dispatch ``owner``'s jobs whose runner died (expired lease) with ``run``.
+
+        ``run`` carries the caller's credentials, so only jobs submitted with the
+        same credential fingerprint are picked up.
+        """
+        return sum(1 for job_id in self.store.orphaned(owner) if self.dispatch(job_id, run))
+
+    def maybe_purge(self, ttl_seconds: float = JOB_TTL_SECONDS) -> None:
+        """Drop expired jobs, at most once per PURGE_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_purge and now - self._last_purge < PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = now
+        self.store.purge(ttl_seconds)
+
+    def _start_heartbeat(self) -> None:
+        # Called with self._lock held
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._renew_leases, daemon=True, name="openai-audio-job-lease")
+            self._heartbeat.start()
+
+    def _renew_leases(self) -> None:
+        while True:
+            time.sleep(JOB_LEASE_SECONDS / 3)
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._heartbeat = None
+                    return
+            try:
+                self.store.renew(active, self.instance)
+            except sqlite3.Error:
+                pass
+
+    def _execute(self, job_id: str, run: Callable[[dict, Callable[[str], None]], Any]) -> None:
+        partial = {"text": "", "flushed": 0.0}
+
+        def on_partial(text: str) -> None:
+            partial["text"] = text
+            now = time.monotonic()
+            if now - partial["flushed"] >= PARTIAL_FLUSH_SECONDS:
+                partial["flushed"] = now
+                self.store.set_partial(job_id, text)
+
+        try:
+            job = self.store.get(job_id)
+            # Re-check the lease: another runner may have taken an expired one meanwhile
+            if job is None or job["status"] not in ("queued", "running") or not self.store.claim(job_id, self.instance):
+                return
+            self.store.set_status(job_id, "running")
+            result = run(job, on_partial)
+            self.store.finish(job_id, result=result, partial_text=partial["text"])
+        except Exception as e:
+            self.store.finish(job_id, error=str(e), partial_text=partial["text"])
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Process-wide runner, created on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(JobStore(JOB_DIR))
+        return _runner
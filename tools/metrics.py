@@ -0,0 +1,243 @@
+"""In-process metrics with Prometheus text export.
+
+Counters and fixed-bucket histograms keyed by label tuples. Updates take one
+uncontended per-metric lock for a dict lookup and an add, so they are cheap
+enough for the request path. The registry can be rendered in Prometheus text
+format (0.0.4), written atomically to ``OPENAI_AUDIO_METRICS_FILE`` and/or
+served on ``127.0.0.1:OPENAI_AUDIO_METRICS_PORT`` at ``/metrics``.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # http.server is imported only when the endpoint is started
+    from http.server import ThreadingHTTPServer
+
+# Request latency buckets (seconds): sub-second clips up to long uploads
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Minimum seconds between metric file rewrites
+EXPORT_INTERVAL = 5.0
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # per label tuple: [bucket counts..., +Inf count], sum
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][idx] += 1
+            entry[1] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+        self._http_server: Optional["ThreadingHTTPServer"] = None
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomic write (temp file + rename) so scrapers never see a partial file."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="openai-audio-metrics").start()
+        return server
+
+    def maybe_export(self) -> None:
+        """Apply the environment's export settings; cheap when nothing is configured."""
+        port = os.getenv("OPENAI_AUDIO_METRICS_PORT")
+        if port and self._http_server is None:
+            with self._lock:
+                if self._http_server is None:
+                    try:
+                        self._http_server = self.start_http_server(int(port))
+                    except OSError:
+                        # Port taken (e.g. another plugin worker); don't retry on every call
+                        self._http_server = False  # type: ignore[assignment]
+        path = os.getenv("OPENAI_AUDIO_METRICS_FILE")
+        if path:
+            now = time.monotonic()
+            if now - self._last_export >= EXPORT_INTERVAL:
+                self._last_export = now
+                try:
+                    self.write_textfile(path)
+                except OSError:
+                    pass
+
+
+REGISTRY = Registry()
+
+INVOCATIONS = REGISTRY.counter(
+    "openai_audio_invocations_total", "Tool invocations by job mode and outcome.", ("mode", "outcome")
+)
+INVOCATION_SECONDS = REGISTRY.histogram(
+    "openai_audio_invocation_duration_seconds", "Wall-clock time of a tool invocation.", ("mode",)
+)
+REQUESTS = REGISTRY.counter(
+    "openai_audio_requests_total",
+    "Upload requests by endpoint, deployment, model and HTTP status.",
+    ("endpoint", "deployment", "model", "status"),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "openai_audio_request_duration_seconds",
+    "Time until response headers for one upload request.",
+    ("endpoint", "deployment", "model"),
+)
+UPLOAD_BYTES = REGISTRY.counter(
+    "openai_audio_upload_bytes_total", "Audio bytes uploaded.", ("endpoint", "deployment", "model")
+)
+STREAM_BYTES = REGISTRY.counter(
+    "openai_audio_stream_bytes_total", "SSE bytes received on streamed responses.", ("endpoint", "deployment", "model")
+)
+AZURE_VERSION_FALLBACKS = REGISTRY.counter(
+    "openai_audio_azure_version_fallbacks_total",
+    "Azure api-version retries after a 404, by version tried and outcome.",
+    ("deployment", "version", "outcome"),
+)
+TRANSLATE_FALLBACKS = REGISTRY.counter(
+    "openai_audio_translate_fallbacks_total",
+    "Azure translate retries via transcriptions?translate=true, by outcome.",
+    ("deployment", "outcome"),
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "openai_audio_queue_wait_seconds", "Time spent waiting for a scheduler lane slot.", ("lane",)
+)
+PREFLIGHT_REJECTIONS = REGISTRY.counter(
+    "openai_audio_preflight_rejections_total", "Inputs rejected locally before upload, by reason.", ("reason",)
+)
+PREPROCESS_SECONDS = REGISTRY.histogram(
+    "openai_audio_preprocess_seconds", "Local audio preprocessing time by stage and where it ran (inline or pool).", ("stage", "where")
+)
+RESULT_OFFLOADS = REGISTRY.counter(
+    "openai_audio_result_offloads_total", "Results delivered as a file instead of inline, by response format.", ("format",)
+)
+RESULT_OFFLOAD_BYTES = REGISTRY.counter(
+    "openai_audio_result_offload_bytes_total", "Bytes delivered as result files."
+)
+CREDENTIAL_VALIDATIONS = REGISTRY.counter(
+    "openai_audio_credential_validations_total", "Provider credential validations by outcome.", ("outcome",)
+)
+CREDENTIAL_VALIDATION_SECONDS = REGISTRY.histogram(
+    "openai_audio_credential_validation_duration_seconds", "Time to validate provider credentials."
+)
+VALIDATION_REQUESTS = REGISTRY.counter(
+    "openai_audio_validation_requests_total",
+    "Requests made while validating credentials, by target and HTTP status.",
+    ("target", "status"),
+)
@@ -0,0 +1,114 @@
+"""Decode-free MP3 frame index and frame-aligned splitting.
+
+The index stores one byte offset and one cumulative sample count per frame in
+``array`` columns (8 bytes each), so a 200MB file (~500k frames) costs ~8MB of
+index and is built by a single pass over the frame headers. Parts produced by
+:meth:`Mp3FrameIndex.split` are plain concatenations of whole frames and are
+valid MP3 streams on their own.
+"""
+import struct
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+
+from tools.audio_probe import find_mp3_frame, id3v2_size, mp3_vbr_frame_count, parse_mp3_header
+
+
+class Mp3Part(NamedTuple):
+    data: bytes
+    start_time: float  # seconds from the start of the original stream
+    end_time: float
+
+
+class Mp3FrameIndex:
+    def __init__(self, offsets: array, samples: array, sample_rate: int):
+        # offsets/samples carry one trailing sentinel: the end of the last frame
+        self.offsets = offsets
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def duration(self) -> float:
+        return self.samples[-1] / self.sample_rate if self.sample_rate else 0.0
+
+    def time_at(self, frame: int) -> float:
+        return self.samples[frame] / self.sample_rate
+
+    @classmethod
+    def build(cls, data: bytes) -> Optional["Mp3FrameIndex"]:
+        """Index every frame in ``data``; returns None if no MP3 stream is found."""
+        found = find_mp3_frame(data, id3v2_size(data))
+        if found is None:
+            return None
+        pos, first = found
+        # A leading Xing/Info/VBRI frame carries no audio and describes the whole file
+        if mp3_vbr_frame_count(data, pos, first) is not None:
+            pos += first.frame_length
+
+        offsets = array("Q")
+        samples = array("Q")
+        # Frame length/sample count depend only on header bits 31..9, so memoise on them
+        cache: dict[int, Optional[tuple[int, int]]] = {}
+        unpack_from = struct.unpack_from
+        append_offset = offsets.append
+        append_samples = samples.append
+        end = len(data)
+        total = 0
+        while pos + 4 <= end:
+            key = unpack_from(">I", data, pos)[0] >> 9
+            info = cache.get(key, False)
+            if info is False:
+                hdr = parse_mp3_header(key << 9)
+                info = cache[key] = (hdr.frame_length, hdr.samples) if hdr else None
+            if info is None or pos + info[0] > end:
+                if info is not None:
+                    break  # truncated final frame
+                # Lost sync (junk or a trailing tag): try to re-acquire a frame further on. Scan to the end:
+                # an embedded tag (cover art) or a concatenated file can be far longer than the default window
+                resync = find_mp3_frame(data, pos + 1, limit=len(data))
+                if resync is None:
+                    break
+                pos = resync[0]
+                continue
+            append_offset(pos)
+            append_samples(total)
+            total += info[1]
+            pos += info[0]
+        if not offsets:
+            return None
+        append_offset(offsets[-1] + cache[unpack_from(">I", data, offsets[-1])[0] >> 9][0])
+        append_samples(total)
+        return cls(offsets, samples, first.sample_rate)
+
+    def split_points(self, max_bytes: int, max_seconds: Optional[float] = None) -> list[tuple[int, int]]:
+        """Greedy frame ranges ``[start, end)`` whose byte size stays within ``max_bytes``
+        (and duration within ``max_seconds``, if given).
+
+        Frames are contiguous between resync gaps, so a range's size is bounded by
+        the distance between its first and sentinel offsets; its duration is the
+        difference of the cumulative sample counts.
+        """
+        ranges = []
+        start = 0
+        n = len(self)
+        offsets = self.offsets
+        samples = self.samples
+        max_samples = int(max_seconds * self.sample_rate) if max_seconds else None
+        while start < n:
+            end = bisect_right(offsets, offsets[start] + max_bytes, start + 1, n + 1) - 1
+            if max_samples is not None:
+                end = min(end, bisect_right(samples, samples[start] + max_samples, start + 1, n + 1) - 1)
+            end = max(end, start + 1)
+            ranges.append((start, end))
+            start = end
+        return ranges
+
+    def split(self, data: bytes, max_bytes: int, max_seconds: Optional[float] = None) -> list[Mp3Part]:
+        parts = []
+        for start, end in self.split_points(max_bytes, max_seconds):
+            chunk = data[self.offsets[start]:self.offsets[end]]
+            parts.append(Mp3Part(chunk, self.time_at(start), self.time_at(end)))
+        return parts
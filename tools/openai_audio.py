@@ -1,4 +1,4 @@
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 # ruff: noqa
 
 from typing import Any, Optional
@@ -7,15 +7,128 @@ import json
 import tempfile
 import pathlib
 import os
+import threading
+import time
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 
+from tools.audio_probe import adaptive_read_timeout, estimate_duration, looks_like_mp3
+from tools.channel_split import channel_labels
+from tools import metrics
+from tools.compact_transcript import TABLE_KEYS, CompactTranscript, loads as loads_json, loads_compact, to_plain
+from tools.preflight import PreflightError, check_audio, normalise_name
+from tools.result_offload import encode_result, result_text, summarize
+from tools.scheduler import choose_lane, get_scheduler
+from tools.transcript_merge import merge_channels, merge_results
+
+# API upload limit; larger MP3 inputs are split into parts below this size
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+# Longest audio per request for models with a duration limit (gpt-4o models reject ~1500s+);
+# longer MP3s are split into parts of at most this length, with some margin
+MODEL_MAX_SECONDS = {"gpt-4o-transcribe": 1400.0, "gpt-4o-mini-transcribe": 1400.0}
+# Largest input accepted at all (only MP3 can exceed MAX_UPLOAD_BYTES, via splitting)
+MAX_INPUT_BYTES = int(os.getenv("OPENAI_AUDIO_MAX_INPUT_MB", "200")) * 1024 * 1024
+# Concurrent part uploads per invocation when splitting
+SPLIT_CONCURRENCY = int(os.getenv("OPENAI_AUDIO_SPLIT_CONCURRENCY", "4"))
+# JSON bodies at least this large skip response.json(); verbose_json results that go out as a
+# file are decoded straight into compact columns (tools/compact_transcript.py); 0 disables
+COMPACT_MIN_BYTES = int(os.getenv("OPENAI_AUDIO_COMPACT_MIN_KB", "1024")) * 1024
+# With output_format=default, results at least this large are sent as one file
+# message plus an inline summary instead of full JSON + text (tools/result_offload.py); 0 disables
+OFFLOAD_MIN_BYTES = int(os.getenv("OPENAI_AUDIO_OFFLOAD_MIN_KB", "256")) * 1024
+
+
+class InvocationCancelled(Exception):
+    """Raised inside an invocation once its consumer has gone away."""
+
+
+def _endpoint_label(url: str) -> str:
+    # host + final path segment, e.g. "api.openai.com/transcriptions"
+    parsed = urlparse(url)
+    return f"{parsed.netloc}/{parsed.path.rstrip('/').rsplit('/', 1)[-1]}"
+
+
+def _close_quietly(response: Any) -> None:
+    # Releases (or discards) the pooled connection now instead of at garbage collection
+    close = getattr(response, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+def _parse_sse_line(line: bytes) -> Optional[tuple[str, str]]:
+    """One SSE line -> ("delta" | "done", text), ("end", "") for [DONE], or None to skip."""
+    line_text = line.decode('utf-8')
+    if not line_text.startswith('data: '):
+        return None
+    data = line_text[6:]
+    if data == "[DONE]":
+        return ("end", "")
+    try:
+        json_data = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(json_data, dict):
+        return None
+    if json_data.get('type') == 'transcript.text.delta':
+        if 'delta' in json_data:
+            return ("delta", json_data['delta'])
+    elif json_data.get('type') == 'transcript.text.done':
+        if 'text' in json_data:
+            return ("done", json_data['text'])
+    elif 'choices' in json_data and len(json_data['choices']) > 0:
+        delta = json_data['choices'][0].get('delta', {})
+        if 'text' in delta:
+            return ("delta", delta['text'])
+    return None
+
+
 class OpenaiAudioTool(Tool):
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        job_mode = tool_parameters.get("job_mode") or "sync"
+        if job_mode == "submit":
+            messages = self._submit_job(tool_parameters)
+        elif job_mode == "poll":
+            messages = self._poll_job(tool_parameters.get("job_id"))
+        else:
+            job_mode = "sync"
+            messages = self._transcribe(tool_parameters)
+        profile_dir = os.getenv("OPENAI_AUDIO_PROFILE_DIR")
+        if tool_parameters.get("debug_profile") or profile_dir:
+            # Imported on demand: without the switch nothing is wrapped or traced
+            from tools.profiling import InvocationProfiler
+
+            messages = InvocationProfiler(job_mode).wrap(
+                messages,
+                directory=profile_dir,
+                as_message=self.create_json_message if tool_parameters.get("debug_profile") else None,
+            )
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            yield from messages
+            outcome = "ok"
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.INVOCATIONS.inc(job_mode, outcome)
+            metrics.INVOCATION_SECONDS.observe(time.monotonic() - started, job_mode)
+            metrics.REGISTRY.maybe_export()
+
+    def _transcribe(
+        self, tool_parameters: dict[str, Any], on_progress: Optional[Callable[[str], None]] = None
+    ) -> Generator[ToolInvokeMessage]:
+        # on_progress (job mode): receives the transcript so far as split parts complete
         # Read a sane HTTP timeout from environment (connect, read)
         DEFAULT_TIMEOUT = int(os.getenv("MAX_REQUEST_TIMEOUT", "120"))
         HTTP_TIMEOUT = (10, DEFAULT_TIMEOUT)
+        # Upper bound for read timeouts on long recordings (see adaptive_read_timeout)
+        MAX_READ_TIMEOUT = max(DEFAULT_TIMEOUT, int(os.getenv("OPENAI_AUDIO_MAX_READ_TIMEOUT", "600")))
 
         # Credentials
         api_key = self.runtime.credentials.get("api_key")
@@ -52,6 +165,8 @@ class OpenaiAudioTool(Tool):
         stream = tool_parameters.get("stream", False)
         output_format = tool_parameters.get("output_format", "default")
         azure_deployment_override = tool_parameters.get("azure_deployment")
+        priority = tool_parameters.get("priority", "auto")
+        channel_mode = tool_parameters.get("channel_mode") or "mixed"
         
         # Determine endpoint & model rules
         is_azure = bool(azure_endpoint)
@@ -144,78 +259,94 @@ class OpenaiAudioTool(Tool):
                 # For Azure, rely on deployment being GPT-4o to stream; if user selected Whisper translate, disable stream
                 if transcription_type == "translate":
                     stream = False
+        if output_format == "file":
+            # The result is delivered as one file, so there is nothing to stream
+            stream = False
         
         if not file_data:
             raise Exception("No audio file provided")
             
         try:
-            if isinstance(file_data, dict):
-                file_content = file_data.get("content")
-                file_name = file_data.get("name", "audio_file")
-                file_type = file_data.get("type", "")
-            elif hasattr(file_data, "read"):
-                file_content = file_data.read()
-                file_name = getattr(file_data, "name", "audio_file")
-                file_type = ""
-            elif str(type(file_data)).find("dify_plugin.file.file.File") >= 0:
-                original_filename = ""
-                file_extension = ""
-                
-                if hasattr(file_data, "filename") and file_data.filename:
-                    original_filename = file_data.filename
-                    
-                if hasattr(file_data, "extension") and file_data.extension:
-                    file_extension = file_data.extension
-                    
-                if hasattr(file_data, "url"):
-                    try:
-                        file_response = requests.get(file_data.url, timeout=HTTP_TIMEOUT)
-                        if file_response.status_code == 200:
-                            # Basic size guard (25MB) if content-length present
-                            cl = file_response.headers.get("Content-Length")
-                            if cl and int(cl) > 25 * 1024 * 1024:
-                                raise Exception("Audio file too large (>25MB)")
-                            file_content = file_response.content
-                        else:
-                            raise Exception(f"Failed to download file from URL: {file_response.status_code}")
-                    except Exception as download_error:
-                        raise Exception(f"Error downloading file from URL: {str(download_error)}")
-                elif hasattr(file_data, "content"):
-                    file_content = file_data.content
-                elif hasattr(file_data, "read") and callable(file_data.read):
-                    file_content = file_data.read()
-                else:
-                    raise Exception("Dify File object does not have accessible content")
-                
-                if original_filename:
-                    file_name = original_filename
-                elif file_extension:
-                    file_name = f"audio_file{file_extension}"
-                else:
-                    file_name = "audio_file.mp4"
-                
-                if hasattr(file_data, "type"):
-                    file_type = file_data.type
-                elif hasattr(file_data, "mime_type"):
-                    file_type = file_data.mime_type
-                else:
-                    file_type = ""
-            else:
-                raise Exception(f"Unsupported file data type: {type(file_data)}")
-            
-            if not file_content:
-                raise Exception("Empty file content")
+            file_content, file_name, file_type = self._read_file_data(file_data, HTTP_TIMEOUT)
+            file_name, file_type = self._preflight(file_content, file_name, channel_mode)
+
+            # Size the read timeout from the audio duration (header parse only, no decoding)
+            audio_duration = estimate_duration(file_content)
+            UPLOAD_TIMEOUT = (10, adaptive_read_timeout(audio_duration, model, DEFAULT_TIMEOUT, MAX_READ_TIMEOUT))
+            stats = {"audio_duration": round(audio_duration, 3) if audio_duration is not None else None}
+
+            # Every upload waits for a slot in its priority lane (see tools/scheduler.py)
+            scheduler = get_scheduler()
+            lane = choose_lane(priority, len(file_content), audio_duration)
+            queue_waits = []
+
+            def _record_wait(waited: float) -> None:
+                queue_waits.append(waited)
+                metrics.QUEUE_WAIT_SECONDS.observe(waited, lane)
+
+            deployment_label = selected_deployment or "-"
+
+            def _finish_stats(started: float) -> dict:
+                # Time spent queued for a lane slot is reported separately from processing
+                queue_wait = max(queue_waits) if queue_waits else 0.0
+                elapsed = time.monotonic() - started - queue_wait
+                stats["processing_seconds"] = round(elapsed, 3)
+                if audio_duration:
+                    stats["real_time_factor"] = round(elapsed / audio_duration, 4)
+                stats["model"] = model
+                stats["lane"] = lane
+                stats["queue_wait"] = round(queue_wait, 3)
+                return stats
                 
             file_ext = ".mp4"
             if file_name and '.' in file_name:
                 file_ext = file_name[file_name.rindex('.'):]
             
             temp_file_path = None
+            # Set when the consumer goes away or a sibling part fails; checked before every upload
+            cancelled = threading.Event()
             
+            # channel_mode=split: one mono WAV per channel, transcribed concurrently.
+            # Splitting and MP3 indexing are CPU-bound and run in the preprocessing
+            # pool for large inputs (tools/preprocess.py) so other invocations keep their I/O
+            channel_split = None
+            channel_parts = None
+            if channel_mode == "split":
+                # Optional subsystems are imported when a request needs them (cold start)
+                from tools.preprocess import get_preprocess_pool, split_channels
+
+                channel_split = split_channels(get_preprocess_pool(), file_content)
+                if channel_split is None:
+                    raise Exception("Channel mode 'split' requires a PCM WAV file")
+                if len(channel_split.buffers) > 1:
+                    channel_parts = channel_split.buffers
+                    file_type = "audio/wav"
+                    stream = False
+
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-                    temp_file.write(file_content.encode() if isinstance(file_content, str) else file_content)
-                    temp_file_path = temp_file.name
+                if channel_parts and max(len(p) for p in channel_parts) > MAX_UPLOAD_BYTES:
+                    raise Exception("Audio channel too large (>25MB)")
+
+                # Oversized or overlong MP3s are split at frame boundaries (no decoding) and sent as parts
+                mp3_parts = None
+                max_seconds = MODEL_MAX_SECONDS.get(model)
+                too_long = bool(max_seconds and audio_duration and audio_duration > max_seconds)
+                if channel_parts is None and (len(file_content) > MAX_UPLOAD_BYTES or (too_long and looks_like_mp3(file_content))):
+                    from tools.preprocess import get_preprocess_pool, split_mp3
+
+                    mp3_parts = (
+                        split_mp3(get_preprocess_pool(), file_content, MAX_UPLOAD_BYTES, max_seconds)
+                        if looks_like_mp3(file_content) else None
+                    )
+                    if mp3_parts is None:
+                        raise Exception("Audio file too large (>25MB)")
+                    file_type = "audio/mpeg"
+                    stream = False
+
+                if mp3_parts is None and channel_parts is None:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+                        temp_file.write(file_content)
+                        temp_file_path = temp_file.name
                 
                 # Build headers & data depending on provider
                 if is_azure:
@@ -250,12 +381,36 @@ class OpenaiAudioTool(Tool):
                 
                 if stream:
                     request_data["stream"] = True
+
+                if channel_parts and model == "whisper-1":
+                    # Segment timestamps are what lets the channels be interleaved into one timeline
+                    request_data["response_format"] = "verbose_json"
                 
+                # Single upload: the temp file by default, or an in-memory part (bytes)
+                def _post(url: str, data: dict, upload: Optional[bytes], upload_name: str, timeout, use_stream: bool) -> requests.Response:
+                    if cancelled.is_set():
+                        raise InvocationCancelled("Invocation cancelled")
+                    labels = (_endpoint_label(url), deployment_label, model)
+                    started = time.monotonic()
+                    try:
+                        if upload is None:
+                            with open(temp_file_path, "rb") as f:
+                                files = {"file": (file_name, f, file_type)}
+                                resp = requests.post(url, headers=headers, data=data, files=files, timeout=timeout, stream=use_stream)
+                        else:
+                            files = {"file": (upload_name, upload, file_type)}
+                            resp = requests.post(url, headers=headers, data=data, files=files, timeout=timeout, stream=use_stream)
+                    except Exception:
+                        metrics.REQUESTS.inc(*labels, "error")
+                        raise
+                    metrics.REQUEST_SECONDS.observe(time.monotonic() - started, *labels)
+                    metrics.REQUESTS.inc(*labels, str(resp.status_code))
+                    metrics.UPLOAD_BYTES.inc(*labels, amount=len(upload) if upload is not None else len(file_content))
+                    return resp
+
                 # Helper to post with possible Azure fallback on 404 Resource not found
-                def _post_with_optional_fallback(url: str) -> requests.Response:
-                    with open(temp_file_path, "rb") as f:
-                        files = {"file": (file_name, f, file_type)}
-                        resp = requests.post(url, headers=headers, data=request_data, files=files, timeout=HTTP_TIMEOUT, stream=stream)
+                def _post_with_optional_fallback(url: str, upload: Optional[bytes] = None, upload_name: str = file_name, timeout=UPLOAD_TIMEOUT) -> requests.Response:
+                    resp = _post(url, request_data, upload, upload_name, timeout, stream)
                     if is_azure and resp.status_code == 404:
                         # Try fallback versions for Transcribe when Azure returns 404, regardless of initial version
                         if transcription_type != "translate":
@@ -267,101 +422,102 @@ class OpenaiAudioTool(Tool):
                                 if fv == azure_api_version:
                                     continue
                                 fallback_url = _build_azure_url(path_kind, version_override=fv)
-                                with open(temp_file_path, "rb") as f2:
-                                    files2 = {"file": (file_name, f2, file_type)}
-                                    r2 = requests.post(fallback_url, headers=headers, data=request_data, files=files2, timeout=HTTP_TIMEOUT, stream=stream)
-                                    if r2.status_code == 200:
-                                        resp = r2
-                                        break
-                    return resp
-                
-                # Execute request
-                response = _post_with_optional_fallback(api_endpoint)
-                
-                if response.status_code != 200:
-                    # Improve error reporting
-                    err_text = response.text
-                    try:
-                        j = response.json()
-                        msg = j.get("error", {}).get("message") or j.get("message")
-                        if msg:
-                            err_text = msg
-                    except Exception:
-                        pass
-                    raise Exception(f"Error {response.status_code}: {err_text}")
-                    
-                if stream:
-                    buffer = ""
-                    for line in response.iter_lines():
-                        if line:
-                            line_text = line.decode('utf-8')
-                            if line_text.startswith('data: '):
-                                data = line_text[6:]
-                                if data == "[DONE]":
+                                r2 = _post(fallback_url, request_data, upload, upload_name, timeout, stream)
+                                metrics.AZURE_VERSION_FALLBACKS.inc(deployment_label, fv, "ok" if r2.status_code == 200 else "failed")
+                                if r2.status_code == 200:
+                                    _close_quietly(resp)
+                                    resp = r2
                                     break
-                                try:
-                                    json_data = json.loads(data)
-                                    if 'type' in json_data and json_data['type'] == 'transcript.text.delta':
-                                        if 'delta' in json_data:
-                                            text_chunk = json_data['delta']
-                                            buffer += text_chunk
-                                            yield self.create_text_message(text_chunk)
-                                    elif 'type' in json_data and json_data['type'] == 'transcript.text.done':
-                                        if 'text' in json_data:
-                                            buffer = json_data['text']
-                                            yield self.create_text_message(buffer)
-                                    elif 'choices' in json_data and len(json_data['choices']) > 0:
-                                        delta = json_data['choices'][0].get('delta', {})
-                                        if 'text' in delta:
-                                            text_chunk = delta['text']
-                                            buffer += text_chunk
-                                            yield self.create_text_message(text_chunk)
-                                except json.JSONDecodeError:
-                                    pass
-                    if buffer and output_format in ["default", "json_only"]:
-                        yield self.create_json_message({"result": {"text": buffer}})
-                else:
-                    if response_format in ["json", "verbose_json"]:
-                        result = response.json()
-                    else:
-                        # Try to parse JSON for 'text' even when response_format==text (translations return JSON)
+                                _close_quietly(r2)
+                    return resp
+
+                def _raise_for_status(response: requests.Response) -> None:
+                    if response.status_code != 200:
+                        # Improve error reporting
+                        err_text = response.text
                         try:
                             j = response.json()
-                            if isinstance(j, dict) and "text" in j:
-                                result = {"text": j["text"]}
-                            else:
-                                result = j
+                            msg = j.get("error", {}).get("message") or j.get("message")
+                            if msg:
+                                err_text = msg
                         except Exception:
-                            result = {"text": response.text}
+                            pass
+                        raise Exception(f"Error {response.status_code}: {err_text}")
+
+                def _keep_compact(body_size: int) -> bool:
+                    # Columns only pay off if the result is written out as a file, not expanded back into dicts
+                    if channel_parts:
+                        return False
+                    if output_format == "file":
+                        return True
+                    return output_format == "default" and OFFLOAD_MIN_BYTES > 0 and body_size >= OFFLOAD_MIN_BYTES
 
-                    # Azure Whisper translation fallback: if translate returns non-English text, try transcriptions with translate=true
-                    def _looks_non_english(txt: str) -> bool:
-                        if not txt:
-                            return False
-                        total = len(txt)
-                        non_ascii = sum(1 for ch in txt if ord(ch) > 127)
-                        # If more than 20% of chars are non-ASCII, likely not English
-                        return (non_ascii / max(total, 1)) > 0.2
+                # Body sizes of the parsed responses: a cheap size estimate for the offload decision
+                response_sizes: list[int] = []
+
+                def _parse_result(response: requests.Response) -> Any:
+                    # Channel parts are parsed as the verbose_json they are requested as (their segments are
+                    # merged into the timeline); everything else by the caller's format, as before
+                    requested_format = request_data["response_format"] if channel_parts else response_format
+                    body = getattr(response, "content", None)
+                    if isinstance(body, bytes):
+                        response_sizes.append(len(body))
+                    if requested_format in ["json", "verbose_json"]:
+                        if COMPACT_MIN_BYTES and isinstance(body, bytes) and len(body) >= COMPACT_MIN_BYTES:
+                            # Large word/segment timestamp payloads: decode from bytes
+                            if requested_format == "verbose_json" and _keep_compact(len(body)):
+                                # Straight into columns, never holding the full dict tree
+                                return loads_compact(body)
+                            result = loads_json(body)
+                            if output_format == "text_only" and isinstance(result, dict):
+                                # Only the text is used; let the per-item dicts go right away
+                                return {k: v for k, v in result.items() if k not in TABLE_KEYS}
+                            return result
+                        return response.json()
+                    # Try to parse JSON for 'text' even when response_format==text (translations return JSON)
+                    try:
+                        j = response.json()
+                        if isinstance(j, dict) and "text" in j:
+                            return {"text": j["text"]}
+                        return j
+                    except Exception:
+                        return {"text": response.text}
+
+                # Azure Whisper translation fallback: if translate returns non-English text, try transcriptions with translate=true
+                def _looks_non_english(txt: str) -> bool:
+                    if not txt:
+                        return False
+                    total = len(txt)
+                    non_ascii = sum(1 for ch in txt if ord(ch) > 127)
+                    # If more than 20% of chars are non-ASCII, likely not English
+                    return (non_ascii / max(total, 1)) > 0.2
+
+                # Non-streaming transcription of one upload, including all fallbacks
+                def _transcribe_upload(upload: Optional[bytes] = None, upload_name: str = file_name, timeout=UPLOAD_TIMEOUT) -> Any:
+                    with scheduler.slot(lane) as waited:
+                        _record_wait(waited)
+                        return _transcribe_upload_unscheduled(upload, upload_name, timeout)
+
+                def _transcribe_upload_unscheduled(upload: Optional[bytes], upload_name: str, timeout) -> Any:
+                    response = _post_with_optional_fallback(api_endpoint, upload, upload_name, timeout)
+                    try:
+                        _raise_for_status(response)
+                        result = _parse_result(response)
+                    finally:
+                        _close_quietly(response)
 
                     if transcription_type == "translate" and is_azure:
                         # Extract text from result to assess language
-                        text_out = result.get("text") if isinstance(result, dict) else str(result)
+                        text_out = result.get("text") if isinstance(result, (dict, CompactTranscript)) else str(result)
                         if _looks_non_english(str(text_out)):
                             # Fallback to transcriptions with translate flag
                             fallback_url = _build_azure_url("transcriptions")
                             request_data_fallback = dict(request_data)
                             request_data_fallback.pop("stream", None)
                             request_data_fallback["translate"] = True
-                            with open(temp_file_path, "rb") as f3:
-                                files3 = {"file": (file_name, f3, file_type)}
-                                r3 = requests.post(
-                                    fallback_url,
-                                    headers=headers,
-                                    data=request_data_fallback,
-                                    files=files3,
-                                    timeout=HTTP_TIMEOUT,
-                                    stream=False,
-                                )
+                            r3 = _post(fallback_url, request_data_fallback, upload, upload_name, timeout, False)
+                            _close_quietly(r3)
+                            metrics.TRANSLATE_FALLBACKS.inc(deployment_label, "ok" if r3.status_code == 200 else "failed")
                             if r3.status_code == 200:
                                 try:
                                     j2 = r3.json()
@@ -371,21 +527,103 @@ class OpenaiAudioTool(Tool):
                                         result = j2
                                 except Exception:
                                     result = {"text": r3.text}
+                    return result
 
-                    if output_format == "json_only":
-                        yield self.create_json_message({"result": result})
-                    elif output_format == "text_only":
-                        if isinstance(result, dict) and "text" in result:
-                            yield self.create_text_message(result["text"])
-                        else:
-                            yield self.create_text_message(str(result))
+                request_started = time.monotonic()
+                if stream:
+                    # The lane slot is held until the stream has been consumed
+                    _record_wait(scheduler.acquire(lane))
+                    response = None
+                    stream_bytes = 0
+                    try:
+                        # Execute request
+                        response = _post_with_optional_fallback(api_endpoint)
+                        _raise_for_status(response)
+                        buffer = ""
+                        for line in response.iter_lines():
+                            if line:
+                                stream_bytes += len(line)
+                                event = _parse_sse_line(line)
+                                if event is None:
+                                    continue
+                                kind, text_chunk = event
+                                if kind == "end":
+                                    break
+                                if kind == "done":
+                                    buffer = text_chunk
+                                else:
+                                    buffer += text_chunk
+                                yield self.create_text_message(text_chunk)
+                    except GeneratorExit:
+                        # Consumer stopped reading (client disconnect / workflow abort)
+                        cancelled.set()
+                        raise
+                    finally:
+                        # Deterministic release: close the stream before giving the slot back
+                        _close_quietly(response)
+                        if response is not None:
+                            metrics.STREAM_BYTES.inc(_endpoint_label(api_endpoint), deployment_label, model, amount=stream_bytes)
+                        scheduler.release(lane)
+                    if buffer and output_format in ["default", "json_only"]:
+                        yield self.create_json_message({"result": {"text": buffer}, "stats": _finish_stats(request_started)})
+                else:
+                    def _transcribe_concurrently(uploads: list[tuple], workers: int, progress=None, borrowed: bool = False) -> list:
+                        # uploads: (bytes, name, timeout); results come back in input order.
+                        # progress(text) gets the text of the finished leading parts.
+                        # borrowed: the upload buffers are released once we return (pooled channel
+                        # segments), so in-flight uploads are waited for even after a failure
+                        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(uploads))))
+                        try:
+                            futures = [pool.submit(_transcribe_upload, data, name, t) for data, name, t in uploads]
+                            results = []
+                            for f in futures:
+                                results.append(f.result())
+                                if progress is not None and len(results) < len(futures):
+                                    progress(" ".join(result_text(r).strip() for r in results))
+                            return results
+                        except BaseException:
+                            # One upload failed (or we were interrupted): stop the rest right away
+                            cancelled.set()
+                            raise
+                        finally:
+                            pool.shutdown(wait=borrowed or not cancelled.is_set(), cancel_futures=True)
+
+                    stem = file_name.rsplit('.', 1)[0] if '.' in file_name else file_name
+                    if channel_parts:
+                        # Channels run side by side, so latency stays close to a single request
+                        labels = channel_labels(tool_parameters.get("channel_labels"), len(channel_parts))
+                        channel_results = _transcribe_concurrently(
+                            [(data, f"{stem}.{label}.wav", UPLOAD_TIMEOUT) for data, label in zip(channel_parts, labels)],
+                            len(channel_parts),
+                            borrowed=True,
+                        )
+                        result = merge_channels(channel_results, labels, response_format)
+                        stats["channels"] = len(channel_parts)
+                    elif mp3_parts:
+                        # Upload frame-aligned parts concurrently and stitch the results back together
+                        part_results = _transcribe_concurrently(
+                            [
+                                (
+                                    p.data,
+                                    f"{stem}.part{i + 1}.mp3",
+                                    (10, adaptive_read_timeout(p.end_time - p.start_time, model, DEFAULT_TIMEOUT, MAX_READ_TIMEOUT)),
+                                )
+                                for i, p in enumerate(mp3_parts)
+                            ],
+                            SPLIT_CONCURRENCY,
+                            progress=on_progress,
+                        )
+                        result = merge_results(part_results, [p.start_time for p in mp3_parts], request_data["response_format"])
+                        stats["parts"] = len(mp3_parts)
                     else:
-                        yield self.create_json_message({"result": result})
-                        if isinstance(result, dict) and "text" in result:
-                            yield self.create_text_message(result["text"])
-                        else:
-                            yield self.create_text_message(str(result))
+                        result = _transcribe_upload()
+
+                    _finish_stats(request_started)
+                    size_hint = sum(response_sizes) if response_sizes else None
+                    yield from self._format_result(result, stats, output_format, response_format, file_name, size_hint)
             finally:
+                if channel_split is not None:
+                    channel_split.close()
                 if temp_file_path:
                     try:
                         pathlib.Path(temp_file_path).unlink()
@@ -394,3 +632,215 @@ class OpenaiAudioTool(Tool):
             
         except Exception as e:
             raise Exception(f"Exception while processing audio: {str(e)}")
+
+    def _format_result(
+        self,
+        result: Any,
+        stats: dict,
+        output_format: str,
+        response_format: str = "text",
+        file_name: str = "audio_file",
+        size_hint: Optional[int] = None,
+    ) -> Generator[ToolInvokeMessage]:
+        # size_hint: response body bytes behind the result; below the threshold it goes inline unencoded
+        offload_candidate = OFFLOAD_MIN_BYTES and (size_hint is None or size_hint >= OFFLOAD_MIN_BYTES)
+        if output_format == "file" or (output_format == "default" and offload_candidate):
+            # Encoded once; small results still go inline as before
+            encoded = encode_result(result, response_format)
+            if output_format == "file" or len(encoded.payload) >= OFFLOAD_MIN_BYTES:
+                stem = file_name.rsplit(".", 1)[0] if "." in file_name else file_name
+                filename = f"{stem or 'audio_file'}.transcript{encoded.extension}"
+                metrics.RESULT_OFFLOADS.inc(encoded.extension.lstrip("."))
+                metrics.RESULT_OFFLOAD_BYTES.inc(amount=len(encoded.payload))
+                yield self.create_json_message({"result": summarize(result, encoded, filename, stats), "stats": stats})
+                yield self.create_blob_message(encoded.payload, meta={"mime_type": encoded.mime_type, "filename": filename})
+                return
+        # Compact results are expanded to the usual dict shape only for JSON output
+        if output_format == "json_only":
+            yield self.create_json_message({"result": to_plain(result), "stats": stats})
+        elif output_format == "text_only":
+            yield self.create_text_message(result_text(result))
+        else:
+            yield self.create_json_message({"result": to_plain(result), "stats": stats})
+            yield self.create_text_message(result_text(result))
+
+    @staticmethod
+    def _unpack_message(msg: Any) -> tuple[str, Any]:
+        """(kind, payload) for a message from create_text_message/create_json_message."""
+        kind = getattr(msg.type, "value", msg.type)
+        inner = getattr(msg, "message", msg)
+        if kind == "text":
+            return kind, getattr(inner, "text", "")
+        if kind == "json":
+            payload = getattr(inner, "json_object", None)
+            return kind, payload if payload is not None else getattr(inner, "data", None)
+        return kind, inner
+
+    def _submit_job(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        file_data = tool_parameters.get("file")
+        if not file_data:
+            raise Exception("No audio file provided")
+        try:
+            http_timeout = (10, int(os.getenv("MAX_REQUEST_TIMEOUT", "120")))
+            file_content, file_name, file_type = self._read_file_data(file_data, http_timeout)
+            file_name, file_type = self._preflight(file_content, file_name, tool_parameters.get("channel_mode") or "mixed")
+        except Exception as e:
+            raise Exception(f"Exception while processing audio: {str(e)}")
+
+        params = {k: v for k, v in tool_parameters.items() if k not in ("file", "job_mode", "job_id")}
+        params["file_meta"] = {"name": file_name, "type": file_type}
+        from tools.job_store import credential_fingerprint, get_job_runner
+
+        owner = credential_fingerprint(self.runtime.credentials)
+        runner = get_job_runner()
+        runner.maybe_purge()
+        job_id = runner.submit(params, file_content, owner)
+        runner.dispatch(job_id, self._run_job)
+        # Pick up this caller's jobs that a dead plugin process left behind
+        runner.recover(self._run_job, owner)
+        yield self.create_json_message({"job": {"id": job_id, "status": "queued"}})
+        yield self.create_text_message(job_id)
+
+    def _poll_job(self, job_id: Optional[str]) -> Generator[ToolInvokeMessage]:
+        if not job_id:
+            raise Exception("job_id is required when job_mode is poll")
+        from tools.job_store import credential_fingerprint, get_job_runner
+
+        owner = credential_fingerprint(self.runtime.credentials)
+        runner = get_job_runner()
+        runner.maybe_purge()
+        runner.recover(self._run_job, owner)
+        job = runner.store.get(job_id.strip())
+        # Jobs of other credentials are indistinguishable from missing ones
+        if job is None or job["owner"] != owner:
+            raise Exception(f"Unknown job id: {job_id}")
+        status = {
+            "id": job["id"],
+            "status": job["status"],
+            "partial_text": job["partial_text"],
+            "error": job["error"],
+            "created": job["created"],
+            "updated": job["updated"],
+        }
+        payload = job["result"] or {}
+        if job["status"] == "succeeded":
+            status["result"] = payload.get("result")
+            status["stats"] = payload.get("stats")
+        yield self.create_json_message({"job": status})
+        if job["status"] == "succeeded":
+            result = payload.get("result")
+            if isinstance(result, dict) and "text" in result:
+                yield self.create_text_message(result["text"])
+            elif result is not None:
+                yield self.create_text_message(str(result))
+
+    def _run_job(self, job: dict, on_partial) -> Optional[dict]:
+        """Job worker body: run the normal transcription path on the spooled audio."""
+        params = dict(job["params"])
+        file_meta = params.pop("file_meta", {})
+        params["file"] = {
+            "name": file_meta.get("name", "audio_file"),
+            "type": file_meta.get("type", ""),
+            "content": pathlib.Path(job["audio_path"]).read_bytes(),
+        }
+        params["output_format"] = "json_only"
+        # Background jobs never compete with interactive traffic unless asked to
+        if params.get("priority") in (None, "", "auto"):
+            params["priority"] = "bulk"
+        text = ""
+        payload = None
+        # Split uploads report per-part text; streamed ones report text chunks below
+        for msg in self._transcribe(params, on_progress=on_partial):
+            kind, data = self._unpack_message(msg)
+            if kind == "text":
+                text += data
+                on_partial(text)
+            elif kind == "json":
+                payload = data
+        return payload
+
+    def _preflight(self, file_content: bytes, file_name: str, channel_mode: str) -> tuple[str, str]:
+        """Local checks before any upload; returns the corrected (file name, MIME type)."""
+        try:
+            fmt = check_audio(file_content)
+            # Only MP3 (frame splitting) and split-channel WAV can exceed the upload limit
+            if len(file_content) > MAX_UPLOAD_BYTES and fmt.name != "mp3" and not (channel_mode == "split" and fmt.name == "wav"):
+                raise PreflightError("Audio file too large (>25MB)", "too_large")
+        except PreflightError as e:
+            metrics.PREFLIGHT_REJECTIONS.inc(e.reason)
+            raise
+        return normalise_name(file_name, fmt), fmt.mime
+
+    def _read_file_data(self, file_data: Any, http_timeout) -> tuple[bytes, str, str]:
+        """Resolve the ``file`` parameter (dict, file-like or Dify File) to (bytes, name, MIME)."""
+        if isinstance(file_data, dict):
+            file_content = file_data.get("content")
+            file_name = file_data.get("name", "audio_file")
+            file_type = file_data.get("type", "")
+        elif hasattr(file_data, "read"):
+            file_content = file_data.read()
+            file_name = getattr(file_data, "name", "audio_file")
+            file_type = ""
+        elif str(type(file_data)).find("dify_plugin.file.file.File") >= 0:
+            original_filename = ""
+            file_extension = ""
+
+            if hasattr(file_data, "filename") and file_data.filename:
+                original_filename = file_data.filename
+
+            if hasattr(file_data, "extension") and file_data.extension:
+                file_extension = file_data.extension
+
+            if hasattr(file_data, "url"):
+                try:
+                    file_response = requests.get(file_data.url, timeout=http_timeout, stream=True)
+                    try:
+                        if file_response.status_code != 200:
+                            raise Exception(f"Failed to download file from URL: {file_response.status_code}")
+                        # Basic size guard if content-length present (MP3s up to MAX_INPUT_BYTES can be split)
+                        cl = file_response.headers.get("Content-Length")
+                        if cl and int(cl) > MAX_INPUT_BYTES:
+                            raise Exception(f"Audio file too large (>{MAX_INPUT_BYTES // (1024 * 1024)}MB)")
+                        # Without Content-Length, stop reading as soon as the limit is passed
+                        chunks = []
+                        received = 0
+                        for chunk in file_response.iter_content(chunk_size=1024 * 1024):
+                            received += len(chunk)
+                            if received > MAX_INPUT_BYTES:
+                                raise Exception(f"Audio file too large (>{MAX_INPUT_BYTES // (1024 * 1024)}MB)")
+                            chunks.append(chunk)
+                        file_content = b"".join(chunks)
+                    finally:
+                        _close_quietly(file_response)
+                except Exception as download_error:
+                    raise Exception(f"Error downloading file from URL: {str(download_error)}")
+            elif hasattr(file_data, "content"):
+                file_content = file_data.content
+            elif hasattr(file_data, "read") and callable(file_data.read):
+                file_content = file_data.read()
+            else:
+                raise Exception("Dify File object does not have accessible content")
+
+            if original_filename:
+                file_name = original_filename
+            elif file_extension:
+                file_name = f"audio_file{file_extension}"
+            else:
+                file_name = "audio_file.mp4"
+
+            if hasattr(file_data, "type"):
+                file_type = file_data.type
+            elif hasattr(file_data, "mime_type"):
+                file_type = file_data.mime_type
+            else:
+                file_type = ""
+        else:
+            raise Exception(f"Unsupported file data type: {type(file_data)}")
+
+        if not file_content:
+            raise Exception("Empty file content")
+
+        if isinstance(file_content, str):
+            file_content = file_content.encode()
+
+        return file_content, file_name, file_type
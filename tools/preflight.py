@@ -0,0 +1,198 @@
+"""Pre-flight checks on the audio bytes before anything is uploaded.
+
+Identifies the container from its magic bytes (not the file name or the MIME
+type, which are often missing or wrong), rejects unsupported, empty,
+too-short and obviously truncated files, and supplies the extension and MIME
+type the API expects. Everything is header-only and takes well under a
+millisecond, so doomed requests fail before a multi-megabyte upload.
+"""
+import struct
+from typing import NamedTuple, Optional
+
+from tools.audio_probe import estimate_duration, find_mp3_frame, id3v2_size
+
+# The API rejects shorter audio ("Minimum audio length is 0.1 seconds")
+MIN_DURATION_SECONDS = 0.1
+
+
+class PreflightError(Exception):
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        # Short machine-readable cause, used as a metrics label
+        self.reason = reason
+
+
+class AudioFormat(NamedTuple):
+    name: str
+    extension: str  # with leading dot
+    mime: str
+
+
+WAV = AudioFormat("wav", ".wav", "audio/wav")
+MP3 = AudioFormat("mp3", ".mp3", "audio/mpeg")
+MP4 = AudioFormat("mp4", ".mp4", "audio/mp4")
+M4A = AudioFormat("m4a", ".m4a", "audio/mp4")
+OGG = AudioFormat("ogg", ".ogg", "audio/ogg")
+WEBM = AudioFormat("webm", ".webm", "audio/webm")
+FLAC = AudioFormat("flac", ".flac", "audio/flac")
+
+# Recognisable containers the API does not accept, for a clearer error
+_UNSUPPORTED_MAGIC = (
+    (0, b"#!AMR", "AMR"),
+    (0, b"caff", "Core Audio (CAF)"),
+    (8, b"AIFF", "AIFF"),
+    (8, b"AIFC", "AIFF-C"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "ASF/WMA"),
+    (0, b".snd", "Sun/NeXT AU"),
+    (8, b"AVI ", "AVI"),
+)
+
+
+def _ebml_doc_type(data: bytes) -> Optional[str]:
+    # DocType element (0x4282) inside the EBML header; read as ASCII
+    pos = data.find(b"\x42\x82", 4, 64)
+    if pos < 0 or pos + 3 > len(data):
+        return None
+    size_byte = data[pos + 2]
+    if not size_byte & 0x80:
+        return None
+    size = size_byte & 0x7F
+    return data[pos + 3:pos + 3 + size].decode("ascii", "replace").rstrip("\x00")
+
+
+def sniff_format(data: bytes) -> Optional[AudioFormat]:
+    """Container from magic bytes; None if it is not one the API accepts."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return WAV
+    if data[4:8] == b"ftyp":
+        return M4A if data[8:11] == b"M4A" else MP4
+    if data[:4] == b"OggS":
+        return OGG
+    if data[:4] == b"fLaC":
+        return FLAC
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return WEBM if _ebml_doc_type(data) == "webm" else None
+    if data[:3] == b"ID3" or find_mp3_frame(data, 0, 4096) is not None:
+        return MP3
+    return None
+
+
+def _describe_unknown(data: bytes) -> str:
+    for offset, magic, name in _UNSUPPORTED_MAGIC:
+        if data[offset:offset + len(magic)] == magic:
+            return name
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return f"Matroska ({_ebml_doc_type(data) or 'unknown doc type'})"
+    if data[:4] == b"RIFF":
+        return f"RIFF/{data[8:12].decode('ascii', 'replace')}"
+    return "unrecognised data"
+
+
+def _check_wav(data: bytes) -> Optional[str]:
+    pos = 12
+    have_fmt = False
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or pos + 24 > len(data):
+                return "WAV fmt chunk is truncated"
+            channels, rate = struct.unpack_from("<HI", data, pos + 10)
+            if not channels or not rate:
+                return "WAV header declares no channels or a zero sample rate"
+            have_fmt = True
+        elif chunk_id == b"data":
+            if not have_fmt:
+                return "WAV data chunk precedes the fmt chunk"
+            if pos + 8 >= len(data):
+                return "WAV file contains no audio data"
+            return None
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return "WAV file has no data chunk"
+
+
+def _check_mp4(data: bytes) -> Optional[str]:
+    pos = 0
+    seen = set()
+    while pos + 8 <= len(data):
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1 and pos + 16 <= len(data):
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - pos
+        if size < header:
+            return "MP4 box structure is corrupt"
+        seen.add(kind)
+        if pos + size > len(data):
+            # moov after a cut-off mdat is lost; a cut-off moov cannot be parsed
+            if b"moov" not in seen or kind == b"moov":
+                return "MP4 file is truncated"
+            return None
+        pos += size
+    return None if b"moov" in seen else "MP4 file has no moov box (incomplete or fragmented recording)"
+
+
+def _check_mp3(data: bytes) -> Optional[str]:
+    start = id3v2_size(data)
+    if start >= len(data):
+        return "MP3 file has an ID3 tag but no audio"
+    if find_mp3_frame(data, start) is None:
+        return "MP3 file contains no valid MPEG audio frames"
+    return None
+
+
+def _check_ogg(data: bytes) -> Optional[str]:
+    if len(data) < 27 or data[4] != 0:
+        return "Ogg page header is corrupt"
+    segments = data[26]
+    if len(data) < 27 + segments:
+        return "Ogg file is truncated"
+    return None
+
+
+def _check_flac(data: bytes) -> Optional[str]:
+    # First metadata block must be STREAMINFO (type 0, 34 bytes)
+    if len(data) < 42 or data[4] & 0x7F != 0 or int.from_bytes(data[5:8], "big") != 34:
+        return "FLAC STREAMINFO block is missing or corrupt"
+    return None
+
+
+_CHECKS = {"wav": _check_wav, "mp4": _check_mp4, "m4a": _check_mp4, "mp3": _check_mp3, "ogg": _check_ogg, "flac": _check_flac}
+
+
+def check_audio(data: bytes) -> AudioFormat:
+    """Validate ``data``; returns its format or raises ``PreflightError``."""
+    if not data:
+        raise PreflightError("Empty file content", "empty")
+    fmt = sniff_format(data)
+    if fmt is None:
+        raise PreflightError(
+            f"Unsupported audio format ({_describe_unknown(data)}); expected flac, m4a, mp3, mp4, ogg, wav or webm",
+            "unsupported",
+        )
+    check = _CHECKS.get(fmt.name)
+    try:
+        problem = check(data) if check else None
+    except (struct.error, IndexError):
+        problem = f"{fmt.name.upper()} header is corrupt"
+    if problem:
+        raise PreflightError(problem, "corrupt")
+    duration = estimate_duration(data)
+    if duration is not None and duration < MIN_DURATION_SECONDS:
+        raise PreflightError(f"Audio is too short ({duration:.3f}s); the minimum is {MIN_DURATION_SECONDS}s", "too_short")
+    return fmt
+
+
+def normalise_name(file_name: str, fmt: AudioFormat) -> str:
+    """Give ``file_name`` the extension of the detected format (the API goes by extension)."""
+    stem = file_name or "audio_file"
+    if "." in stem:
+        base, ext = stem.rsplit(".", 1)
+        if "." + ext.lower() == fmt.extension or (fmt in (MP4, M4A) and ext.lower() in ("mp4", "m4a")):
+            return stem
+        if ext.lower() in ("mpeg", "mpga") and fmt is MP3:
+            return stem
+        stem = base or "audio_file"
+    return stem + fmt.extension
@@ -0,0 +1,245 @@
+"""CPU-bound audio preprocessing in a bounded process pool.
+
+Channel de-interleaving and MP3 frame indexing are pure byte crunching; run on
+the invocation thread they hold the GIL and stall the HTTP I/O of every other
+invocation in the plugin process. Large inputs are handed to worker processes
+instead. The audio goes through ``multiprocessing.shared_memory``: the parent
+copies it into a segment once, the worker maps it, and the worker writes its
+output buffers into a second segment that the parent maps and uses in place
+(uploads take the ``memoryview`` slices directly). Nothing is pickled except
+names, sizes and small metadata.
+
+Inputs below ``OPENAI_AUDIO_PREPROCESS_MIN_MB`` (default 4), or all inputs
+with ``OPENAI_AUDIO_PREPROCESS_WORKERS=0``, are processed inline with the
+same functions; if the pool cannot be used (broken worker, task cancelled
+by a concurrent reset) the stage also runs inline. Where shared memory cannot
+be created or mapped (e.g. no ``/dev/shm``) the pool is switched off for the
+rest of the process after the first attempt.
+"""
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+from typing import Any, Callable, Optional, Union
+
+from tools import metrics
+from tools.channel_split import split_wav_channels
+from tools.mp3_frames import Mp3FrameIndex, Mp3Part
+
+# Worker processes; 0 runs every stage inline
+PREPROCESS_WORKERS = int(os.getenv("OPENAI_AUDIO_PREPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Smaller inputs are cheaper to process inline than to ship to a worker
+PREPROCESS_MIN_BYTES = int(float(os.getenv("OPENAI_AUDIO_PREPROCESS_MIN_MB", "4")) * 1024 * 1024)
+
+
+def _stage_split_channels(data: bytes) -> tuple[list[bytes], Any]:
+    buffers = split_wav_channels(data)
+    return (buffers or []), buffers is not None
+
+
+def _stage_mp3_split(data: bytes, max_bytes: int, max_seconds: Optional[float] = None) -> tuple[list[bytes], Any]:
+    index = Mp3FrameIndex.build(data)
+    if index is None:
+        return [], None
+    # Byte ranges and times only; the parent slices its own copy of the file
+    ranges = [
+        (index.offsets[start], index.offsets[end], index.time_at(start), index.time_at(end))
+        for start, end in index.split_points(max_bytes, max_seconds)
+    ]
+    return [], ranges
+
+
+_STAGES: dict[str, Callable[..., tuple[list[bytes], Any]]] = {
+    "split_channels": _stage_split_channels,
+    "mp3_split": _stage_mp3_split,
+}
+
+
+def _map_input(name: str, size: int) -> mmap.mmap:
+    """Read-only mapping of the first ``size`` bytes of a shared-memory segment.
+
+    An ``mmap`` reads like bytes (find, slicing, struct) without a copy, which
+    ``SharedMemory.buf`` (a memoryview) does not. Opened the way
+    ``multiprocessing.shared_memory`` does: by tag name on Windows, as a file
+    under /dev/shm elsewhere (OSError where there is none; the stage then runs inline).
+    """
+    if os.name == "nt":
+        return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_READ)
+    fd = os.open(os.path.join("/dev/shm", name.lstrip("/")), os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+def _run_in_worker(stage: str, input_name: str, size: int, kwargs: dict) -> tuple[Optional[str], list[int], Any]:
+    """Worker side: map the input, run the stage, publish outputs in a new segment."""
+    data = _map_input(input_name, size)
+    try:
+        buffers, meta = _STAGES[stage](data, **kwargs)
+    finally:
+        data.close()
+    if not buffers:
+        return None, [], meta
+    lengths = [len(b) for b in buffers]
+    out = shared_memory.SharedMemory(create=True, size=max(1, sum(lengths)))
+    pos = 0
+    for b in buffers:
+        out.buf[pos:pos + len(b)] = b
+        pos += len(b)
+    name = out.name
+    # The parent attaches and unlinks it; closing here only drops this mapping
+    out.close()
+    return name, lengths, meta
+
+
+class StageResult:
+    """Output buffers of a stage plus its metadata.
+
+    From the pool the buffers are ``memoryview`` slices of a shared-memory
+    segment, valid until :meth:`close`; inline they are ``bytes``.
+    """
+
+    def __init__(self, buffers: list[Union[bytes, memoryview]], meta: Any, shm: Optional[shared_memory.SharedMemory] = None):
+        self.buffers = buffers
+        self.meta = meta
+        self._shm = shm
+
+    def close(self) -> None:
+        for b in self.buffers:
+            if isinstance(b, memoryview):
+                b.release()
+        self.buffers = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self) -> "StageResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach_output(name: Optional[str], lengths: list[int], meta: Any) -> StageResult:
+    if name is None:
+        return StageResult([], meta)
+    shm = shared_memory.SharedMemory(name=name)
+    # Unlinked right away: the mapping stays valid and nothing can leak if we die
+    shm.unlink()
+    buffers = []
+    pos = 0
+    for n in lengths:
+        buffers.append(shm.buf[pos:pos + n])
+        pos += n
+    return StageResult(buffers, meta, shm)
+
+
+class PreprocessPool:
+    def __init__(self, max_workers: int, min_bytes: int = PREPROCESS_MIN_BYTES):
+        self.max_workers = max_workers
+        self.min_bytes = min_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Set once shared memory turned out to be unusable here
+        self.disabled = False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process with live HTTP threads can copy held locks
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context("spawn"))
+            return self._executor
+
+    def _reset(self, broken: Optional[ProcessPoolExecutor] = None) -> None:
+        """Drop the executor (only if it is still ``broken``, when given) for a fresh one on next use.
+
+        Pending tasks of other callers are not cancelled: on a broken pool they
+        have failed already, otherwise they are left to finish.
+        """
+        with self._lock:
+            if broken is not None and self._executor is not broken:
+                return  # another caller already replaced it
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        self._reset()
+
+    def run(self, stage: str, data: bytes, **kwargs) -> StageResult:
+        """Run ``stage`` on ``data``, in a worker process when worthwhile."""
+        started = time.monotonic()
+        where = "inline"
+        result = None
+        if self.max_workers > 0 and not self.disabled and data and len(data) >= self.min_bytes:
+            executor = self._get_executor()
+            try:
+                result = self._run_pooled(executor, stage, data, kwargs)
+                where = "pool"
+            except OSError:
+                # Shared memory cannot be created or mapped here: stop paying for the attempt
+                self.disabled = True
+                self._reset()
+            except BrokenProcessPool:
+                # A worker died: fall back to this thread, start a fresh pool next time
+                self._reset(executor)
+            except CancelledError:
+                # Cancelled by a concurrent shutdown: fall back to this thread
+                pass
+        if result is None:
+            buffers, meta = _STAGES[stage](data, **kwargs)
+            result = StageResult(buffers, meta)
+        metrics.PREPROCESS_SECONDS.observe(time.monotonic() - started, stage, where)
+        return result
+
+    def _run_pooled(self, executor: ProcessPoolExecutor, stage: str, data: bytes, kwargs: dict) -> StageResult:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        try:
+            shm.buf[:len(data)] = data
+            try:
+                future = executor.submit(_run_in_worker, stage, shm.name, len(data), kwargs)
+            except BrokenProcessPool:
+                raise
+            except RuntimeError:
+                # Shut down by a concurrent caller between _get_executor() and here
+                raise CancelledError() from None
+            return _attach_output(*future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def split_channels(pool: PreprocessPool, data: bytes) -> Optional[StageResult]:
+    """One mono WAV per channel (see ``split_wav_channels``); None if not PCM/float WAV."""
+    result = pool.run("split_channels", data)
+    if not result.meta:
+        result.close()
+        return None
+    return result
+
+
+def split_mp3(pool: PreprocessPool, data: bytes, max_bytes: int, max_seconds: Optional[float] = None) -> Optional[list[Mp3Part]]:
+    """Frame-aligned parts as zero-copy slices of ``data``; None if no MP3 stream is found."""
+    with pool.run("mp3_split", data, max_bytes=max_bytes, max_seconds=max_seconds) as result:
+        ranges = result.meta
+    if ranges is None:
+        return None
+    view = memoryview(data)
+    return [Mp3Part(view[a:b], t0, t1) for a, b, t0, t1 in ranges]
+
+
+_pool: Optional[PreprocessPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_preprocess_pool() -> PreprocessPool:
+    """Process-wide pool, configured from the environment on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PreprocessPool(PREPROCESS_WORKERS)
+        return _pool
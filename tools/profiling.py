@@ -0,0 +1,172 @@
+"""Opt-in CPU and allocation profiling of a single invocation.
+
+Enabled per call with the ``debug_profile`` parameter (the report is returned
+as an extra JSON message) or for every call with ``OPENAI_AUDIO_PROFILE_DIR``
+(reports and ``.prof`` files written there). The tool imports this module
+only when one of them is set, so the default path has no profiling cost.
+
+cProfile is enabled only while the invocation's generator is running, so time
+spent by the consumer between messages is not charged to the tool. It sees
+the invoking thread only; part uploads on worker threads appear as time spent
+waiting on their futures.
+
+tracemalloc is process-wide: it traces all threads and has a single peak, so
+only one invocation at a time profiles allocations. Invocations profiled
+while it is taken (or while something else is tracing) report CPU only, with
+``allocations_skipped`` set; nothing else in the plugin pays for tracing
+outside that one invocation.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable, Generator
+from typing import Any, Optional
+
+# Entries kept in each top-N list
+TOP_N = 25
+# Frames kept per allocation trace; 1 groups by allocating line
+TRACE_FRAMES = 1
+# Functions from this package are always listed (SSE parsing, file ingestion, formatting)
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Held by the one invocation currently tracing allocations
+_tracemalloc_lock = threading.Lock()
+
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+class InvocationProfiler:
+    def __init__(self, label: str, top_n: int = TOP_N):
+        self.label = label
+        self.top_n = top_n
+        self.cpu: Optional[cProfile.Profile] = cProfile.Profile()
+        self.wall_seconds = 0.0
+        self.report: Optional[dict] = None
+        self._owns_tracemalloc = False
+
+    def _start_tracemalloc(self) -> bool:
+        """Start tracing for this invocation; False if another one (or someone else) is tracing."""
+        if not _tracemalloc_lock.acquire(blocking=False):
+            return False
+        if tracemalloc.is_tracing():
+            # Not ours (e.g. python -X tracemalloc): its peak and lifetime are not ours to touch
+            _tracemalloc_lock.release()
+            return False
+        tracemalloc.start(TRACE_FRAMES)
+        self._owns_tracemalloc = True
+        return True
+
+    def _stop_tracemalloc(self) -> tuple[tracemalloc.Snapshot, int]:
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            return snapshot, peak
+        finally:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+            _tracemalloc_lock.release()
+
+    def _step(self, send: Callable) -> Any:
+        if self.cpu is not None:
+            try:
+                self.cpu.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                self.cpu = None
+        try:
+            return send()
+        finally:
+            if self.cpu is not None:
+                self.cpu.disable()
+
+    def wrap(
+        self,
+        gen: Generator,
+        directory: Optional[str] = None,
+        as_message: Optional[Callable[[dict], Any]] = None,
+    ) -> Generator:
+        """Drive ``gen`` under the profilers.
+
+        The report is written to ``directory`` (also when ``gen`` fails) and, if
+        ``as_message`` is given, yielded as ``as_message({"profile": report})``
+        after the last message.
+        """
+        started = time.monotonic()
+        baseline = None
+        try:
+            if self._start_tracemalloc():
+                baseline = tracemalloc.take_snapshot()
+            while True:
+                try:
+                    message = self._step(gen.__next__)
+                except StopIteration:
+                    break
+                yield message
+        finally:
+            gen.close()
+            self.wall_seconds = time.monotonic() - started
+            snapshot, peak = self._stop_tracemalloc() if self._owns_tracemalloc else (None, 0)
+            self.report = self._report(baseline, snapshot, peak)
+            if directory:
+                try:
+                    self.report["file"] = self.write(directory, self.report)
+                except OSError:
+                    pass
+        if as_message is not None:
+            yield as_message({"profile": self.report})
+
+    def _report(self, baseline: Optional[tracemalloc.Snapshot], snapshot: Optional[tracemalloc.Snapshot], peak: int) -> dict:
+        report: dict[str, Any] = {
+            "label": self.label,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "peak_traced_kb": round(peak / 1024, 1),
+            "cpu": [],
+            "plugin_cpu": [],
+            "allocations": [],
+        }
+        if self.cpu is not None:
+            stats = pstats.Stats(self.cpu)
+            report["cpu_seconds"] = round(stats.total_tt, 4)
+            rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)
+            for (filename, line, name), (_, ncalls, tottime, cumtime, _) in rows:
+                row = {
+                    "function": f"{_short_path(filename)}:{line}({name})",
+                    "calls": ncalls,
+                    "tottime": round(tottime, 6),
+                    "cumtime": round(cumtime, 6),
+                }
+                if len(report["cpu"]) < self.top_n:
+                    report["cpu"].append(row)
+                if os.path.dirname(os.path.abspath(filename)) == _PACKAGE_DIR:
+                    report["plugin_cpu"].append(row)
+        if baseline is None or snapshot is None:
+            report["allocations_skipped"] = "another invocation is tracing allocations"
+            report["peak_traced_kb"] = None
+            return report
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = snapshot.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), "lineno")
+        for stat in diff[: self.top_n]:
+            frame = stat.traceback[0]
+            report["allocations"].append({
+                "site": f"{_short_path(frame.filename)}:{frame.lineno}",
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            })
+        return report
+
+    def write(self, directory: str, report: dict) -> str:
+        """Write ``<id>.json`` (report) and ``<id>.prof`` (pstats); returns the base path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.label}-{uuid.uuid4().hex[:8]}")
+        if self.cpu is not None:
+            self.cpu.dump_stats(base + ".prof")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        return base
@@ -0,0 +1,83 @@
+"""Deliver a large result as one file message with a small inline summary.
+
+With ``output_format=default`` the full result goes out twice (JSON and text
+messages), and both copies are serialized by the plugin and again by the Dify
+host into workflow variables. Above ``OPENAI_AUDIO_OFFLOAD_MIN_KB`` (or always
+with ``output_format=file``) the result is encoded once, sent as a blob, and
+only a preview, duration, word count and a reference to the file are inline.
+"""
+import hashlib
+from typing import Any, NamedTuple
+
+from tools.compact_transcript import CompactTranscript, dumps
+
+# Characters of transcript kept inline when the result is offloaded
+PREVIEW_CHARS = 500
+
+_TEXT_FORMATS = {
+    "srt": ("application/x-subrip", ".srt"),
+    "vtt": ("text/vtt", ".vtt"),
+    "text": ("text/plain", ".txt"),
+}
+
+
+class EncodedResult(NamedTuple):
+    payload: bytes
+    mime_type: str
+    extension: str  # with leading dot
+
+
+def result_text(result: Any) -> str:
+    if isinstance(result, CompactTranscript):
+        return result.text
+    if isinstance(result, dict) and "text" in result:
+        return str(result["text"])
+    return str(result)
+
+
+def encode_result(result: Any, response_format: str) -> EncodedResult:
+    """The result as file contents: the JSON document, or the subtitles/plain text.
+
+    Goes by the shape of the result, since timestamps can turn a ``text``
+    request into ``verbose_json`` and a text body is returned as ``{"text": ...}``.
+    """
+    if isinstance(result, CompactTranscript):
+        # Written from the columns; the per-item dicts are never built
+        return EncodedResult(result.to_json_bytes(), "application/json", ".json")
+    if isinstance(result, dict) and set(result) != {"text"}:
+        return EncodedResult(dumps(result), "application/json", ".json")
+    mime, extension = _TEXT_FORMATS.get(response_format, _TEXT_FORMATS["text"])
+    return EncodedResult(result_text(result).encode("utf-8"), mime, extension)
+
+
+def _word_count(text: str, subtitles: bool) -> int:
+    if not subtitles:
+        return len(text.split())
+    # Skip cue numbers, timing lines and the WEBVTT header
+    return sum(
+        len(line.split())
+        for line in text.splitlines()
+        if line.strip() and not line.strip().isdigit() and "-->" not in line and not line.startswith("WEBVTT")
+    )
+
+
+def summarize(result: Any, encoded: EncodedResult, filename: str, stats: dict) -> dict:
+    """Inline stand-in for an offloaded result (same top-level shape as the full JSON)."""
+    text = result_text(result)
+    summary = {
+        "text": text[:PREVIEW_CHARS],
+        "truncated": len(text) > PREVIEW_CHARS,
+        "word_count": _word_count(text, encoded.extension in (".srt", ".vtt")),
+        "duration": result.get("duration") if isinstance(result, (dict, CompactTranscript)) else None,
+        "file": {
+            "filename": filename,
+            "mime_type": encoded.mime_type,
+            "size": len(encoded.payload),
+            "sha256": hashlib.sha256(encoded.payload).hexdigest(),
+        },
+    }
+    if summary["duration"] is None:
+        summary["duration"] = stats.get("audio_duration")
+    if isinstance(result, (dict, CompactTranscript)) and result.get("language"):
+        summary["language"] = result.get("language")
+    return summary
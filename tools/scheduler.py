@@ -0,0 +1,189 @@
+"""Admission control for outbound transcription requests.
+
+Every upload takes a slot in one of two lanes before it is sent:
+
+- ``interactive``: short files a user is waiting on;
+- ``bulk``: long files, background jobs and backfills.
+
+Free slots go to the waiting lane with the lowest weighted service count
+(weighted fair sharing), subject to a per-lane concurrency cap and a global
+capacity. Each lane has a bounded queue; arrivals beyond it are rejected
+immediately. When interactive queueing delay rises above a threshold, bulk
+is deferred (strict priority) until interactive waiters are served. The delay
+signal decays with time and only counts while interactive requests are
+queued or running, so one congested burst cannot keep bulk deferred.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Files at or above either threshold go to the bulk lane under priority=auto
+BULK_MIN_BYTES = 5 * 1024 * 1024
+BULK_MIN_SECONDS = 120.0
+
+
+class LaneRejected(Exception):
+    pass
+
+
+class LaneConfig(NamedTuple):
+    max_concurrency: int
+    weight: float
+    max_queue: int
+    max_wait: float  # seconds a request may wait for a slot before being rejected
+
+
+class _Lane:
+    def __init__(self, config: LaneConfig):
+        self.config = config
+        self.running = 0
+        self.waiting: deque = deque()
+        self.virtual_time = 0.0
+
+
+class LaneScheduler:
+    def __init__(self, capacity: int, lanes: dict[str, LaneConfig], degrade_wait: float = 2.0, decay_half_life: float = 10.0):
+        self.capacity = capacity
+        self.degrade_wait = degrade_wait
+        self.decay_half_life = decay_half_life
+        self._lanes = {name: _Lane(cfg) for name, cfg in lanes.items()}
+        self._cond = threading.Condition()
+        self._running = 0
+        # EWMA of interactive queue wait (drives bulk deferral) and when it was last updated
+        self._wait_ewma = 0.0
+        self._wait_ewma_at = time.monotonic()
+
+    @property
+    def interactive_wait_ewma(self) -> float:
+        """Interactive wait EWMA, halved for every ``decay_half_life`` seconds without an update."""
+        idle = time.monotonic() - self._wait_ewma_at
+        return self._wait_ewma * 0.5 ** (idle / self.decay_half_life) if self.decay_half_life > 0 else self._wait_ewma
+
+    @interactive_wait_ewma.setter
+    def interactive_wait_ewma(self, value: float) -> None:
+        self._wait_ewma = value
+        self._wait_ewma_at = time.monotonic()
+
+    @property
+    def degraded(self) -> bool:
+        interactive = self._lanes.get(INTERACTIVE)
+        # With no interactive traffic there is nothing to protect
+        if interactive is None or not (interactive.waiting or interactive.running):
+            return False
+        return self.interactive_wait_ewma > self.degrade_wait
+
+    def _next_lane(self) -> Optional[str]:
+        if self._running >= self.capacity:
+            return None
+        eligible = [
+            (lane.virtual_time, name)
+            for name, lane in self._lanes.items()
+            if lane.waiting and lane.running < lane.config.max_concurrency
+        ]
+        if not eligible:
+            return None
+        if self.degraded and any(name == INTERACTIVE for _, name in eligible):
+            return INTERACTIVE
+        return min(eligible)[1]
+
+    def acquire(self, lane_name: str) -> float:
+        """Block until a slot is granted; returns the queue wait in seconds."""
+        lane = self._lanes[lane_name]
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            max_queue = lane.config.max_queue
+            if lane_name != INTERACTIVE and self.degraded:
+                # Shed bulk earlier while interactive latency is above target (but keep a slot)
+                max_queue = max(min(max_queue, 1), max_queue // 2)
+            if len(lane.waiting) >= max_queue:
+                raise LaneRejected(f"{lane_name} queue is full ({max_queue} waiting); retry later")
+            if not lane.waiting and lane.running == 0:
+                # A lane becoming active must not cash in credit from its idle time
+                active = [l.virtual_time for l in self._lanes.values() if l.waiting or l.running]
+                if active:
+                    lane.virtual_time = max(lane.virtual_time, min(active))
+            lane.waiting.append(ticket)
+            deadline = started + lane.config.max_wait
+            try:
+                while not (lane.waiting[0] is ticket and self._next_lane() == lane_name):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LaneRejected(f"{lane_name} request waited more than {lane.config.max_wait:.0f}s for a slot")
+                    self._cond.wait(remaining)
+            except BaseException:
+                lane.waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            lane.waiting.popleft()
+            lane.running += 1
+            lane.virtual_time += 1.0 / lane.config.weight
+            self._running += 1
+            waited = time.monotonic() - started
+            if lane_name == INTERACTIVE:
+                self.interactive_wait_ewma = 0.8 * self.interactive_wait_ewma + 0.2 * waited
+            # Another lane may also be grantable now
+            self._cond.notify_all()
+        return waited
+
+    def release(self, lane_name: str) -> None:
+        with self._cond:
+            self._lanes[lane_name].running -= 1
+            self._running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane_name: str) -> Iterator[float]:
+        waited = self.acquire(lane_name)
+        try:
+            yield waited
+        finally:
+            self.release(lane_name)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                name: {"running": lane.running, "waiting": len(lane.waiting)}
+                for name, lane in self._lanes.items()
+            }
+
+
+def choose_lane(priority: Optional[str], size: int, duration: Optional[float]) -> str:
+    """Resolve the ``priority`` parameter; ``auto`` classifies by size/duration."""
+    if priority in (INTERACTIVE, BULK):
+        return priority
+    if size >= BULK_MIN_BYTES or (duration is not None and duration >= BULK_MIN_SECONDS):
+        return BULK
+    return INTERACTIVE
+
+
+_scheduler: Optional[LaneScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LaneScheduler:
+    """Process-wide scheduler, configured from the environment on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            capacity = int(os.getenv("OPENAI_AUDIO_MAX_CONCURRENCY", "8"))
+            _scheduler = LaneScheduler(
+                capacity,
+                {
+                    INTERACTIVE: LaneConfig(capacity, 4.0, int(os.getenv("OPENAI_AUDIO_INTERACTIVE_QUEUE", "64")), 120.0),
+                    BULK: LaneConfig(
+                        min(capacity, int(os.getenv("OPENAI_AUDIO_BULK_CONCURRENCY", "4"))),
+                        1.0,
+                        int(os.getenv("OPENAI_AUDIO_BULK_QUEUE", "32")),
+                        600.0,
+                    ),
+                },
+                degrade_wait=float(os.getenv("OPENAI_AUDIO_INTERACTIVE_WAIT_SLO", "2.0")),
+            )
+        return _scheduler
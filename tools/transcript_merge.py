@@ -0,0 +1,192 @@
+"""Merge transcription results of consecutive audio parts into one result.
+
+Each part was transcribed independently, so its timestamps start at zero;
+``offsets`` gives the start time of every part within the original audio.
+"""
+import re
+from typing import Any, Optional
+
+from tools.compact_transcript import TABLE_KEYS, ColumnTable, CompactTranscript, to_plain
+
+_TIMESTAMP = re.compile(r"(\d{2,}):(\d{2}):(\d{2})([,.])(\d{3})")
+
+
+def _shift_timestamp(match: re.Match, offset: float) -> str:
+    h, m, s, sep, ms = match.groups()
+    total_ms = ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms) + round(offset * 1000)
+    h, rem = divmod(total_ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def merge_subtitles(texts: list[str], offsets: list[float], response_format: str) -> str:
+    """Concatenate SRT/VTT documents, shifting cue times and renumbering SRT cues."""
+    blocks = []
+    for text, offset in zip(texts, offsets):
+        for block in re.split(r"\n\s*\n", text.strip()):
+            if not block.strip() or block.lstrip().startswith("WEBVTT"):
+                continue
+            blocks.append(_TIMESTAMP.sub(lambda m: _shift_timestamp(m, offset), block))
+    if response_format == "srt":
+        renumbered = []
+        for i, block in enumerate(blocks, 1):
+            lines = block.split("\n")
+            if lines[0].strip().isdigit():
+                lines = lines[1:]
+            renumbered.append("\n".join([str(i)] + lines))
+        blocks = renumbered
+        return "\n\n".join(blocks) + "\n"
+    return "WEBVTT\n\n" + "\n\n".join(blocks) + "\n"
+
+
+def _shift_items(items: list, offset: float, renumber_from: Optional[int] = None) -> list:
+    shifted = []
+    for i, item in enumerate(items):
+        item = dict(item)
+        for key in ("start", "end"):
+            if isinstance(item.get(key), (int, float)):
+                item[key] = round(item[key] + offset, 3)
+        if renumber_from is not None and "id" in item:
+            item["id"] = renumber_from + i
+        shifted.append(item)
+    return shifted
+
+
+def _merge_compact(results: list[CompactTranscript], offsets: list[float]) -> Optional[CompactTranscript]:
+    """Column-wise merge; None when the parts' tables differ in shape."""
+    fields: dict[str, Any] = {}
+    for result, offset in zip(results, offsets):
+        for key, value in result.fields.items():
+            if key not in ("text", "duration") + TABLE_KEYS:
+                fields.setdefault(key, value)
+        if isinstance(result.fields.get("duration"), (int, float)):
+            fields["duration"] = round(offset + result.fields["duration"], 3)
+    fields["text"] = " ".join(t for t in (r.text.strip() for r in results) if t)
+    for key in TABLE_KEYS:
+        present = [(r, o) for r, o in zip(results, offsets) if key in r.fields]
+        if not present:
+            continue
+        if any(r.table(key) is None for r, _ in present):
+            return None
+        shifted = []
+        count = 0
+        for r, offset in present:
+            shifted.append(r.table(key).shifted(offset, renumber_from=count if key == "segments" else None))
+            count += len(shifted[-1])
+        table = ColumnTable.concat(shifted)
+        if table is None:
+            return None
+        fields[key] = table
+    return CompactTranscript(fields)
+
+
+def merge_results(results: list[Any], offsets: list[float], response_format: str) -> Any:
+    """Combine per-part results (dicts as produced by the tool) in part order."""
+    if len(results) == 1:
+        return results[0]
+    if all(isinstance(r, CompactTranscript) for r in results):
+        merged = _merge_compact(results, offsets)
+        if merged is not None:
+            return merged
+    results = [to_plain(r) for r in results]
+    if response_format in ("srt", "vtt"):
+        texts = [r.get("text", "") if isinstance(r, dict) else str(r) for r in results]
+        return {"text": merge_subtitles(texts, offsets, response_format)}
+
+    texts = []
+    merged: dict[str, Any] = {}
+    segments: list = []
+    words: list = []
+    for result, offset in zip(results, offsets):
+        if not isinstance(result, dict):
+            texts.append(str(result).strip())
+            continue
+        texts.append(str(result.get("text", "")).strip())
+        for key, value in result.items():
+            if key not in ("text", "segments", "words", "duration"):
+                merged.setdefault(key, value)
+        if isinstance(result.get("segments"), list):
+            segments.extend(_shift_items(result["segments"], offset, renumber_from=len(segments)))
+        if isinstance(result.get("words"), list):
+            words.extend(_shift_items(result["words"], offset))
+        if isinstance(result.get("duration"), (int, float)):
+            merged["duration"] = round(offset + result["duration"], 3)
+    merged["text"] = " ".join(t for t in texts if t)
+    if segments:
+        merged["segments"] = segments
+    if words:
+        merged["words"] = words
+    return merged
+
+
+def _format_timestamp(seconds: float, sep: str) -> str:
+    total_ms = max(0, round(seconds * 1000))
+    h, rem = divmod(total_ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def render_subtitles(segments: list[dict], response_format: str) -> str:
+    """SRT/VTT cues for speaker-labelled segments."""
+    sep = "," if response_format == "srt" else "."
+    cues = []
+    for i, seg in enumerate(segments, 1):
+        timing = f"{_format_timestamp(seg['start'], sep)} --> {_format_timestamp(seg['end'], sep)}"
+        text = f"{seg['speaker']}: {str(seg.get('text', '')).strip()}"
+        cues.append(f"{i}\n{timing}\n{text}" if response_format == "srt" else f"{timing}\n{text}")
+    body = "\n\n".join(cues) + "\n"
+    return body if response_format == "srt" else "WEBVTT\n\n" + body
+
+
+def merge_channels(results: list[Any], labels: list[str], response_format: str) -> dict:
+    """Interleave per-channel results into one speaker-labelled timeline.
+
+    Segments (and words) are tagged with their speaker and ordered by start
+    time; ``text`` has one line per speaker turn. Results without segments
+    (e.g. gpt-4o models, which return text only) are listed per channel.
+    """
+    results = [to_plain(r) for r in results]
+    texts = [str(r.get("text", "")).strip() if isinstance(r, dict) else str(r).strip() for r in results]
+    segments: list = []
+    words: list = []
+    for channel, (result, label) in enumerate(zip(results, labels)):
+        if not isinstance(result, dict):
+            continue
+        for key, out in (("segments", segments), ("words", words)):
+            if isinstance(result.get(key), list):
+                out.extend(dict(item, speaker=label, channel=channel) for item in result[key])
+    merged: dict[str, Any] = {"speakers": list(labels), "channels": [{"speaker": l, "text": t} for l, t in zip(labels, texts)]}
+    for result in results:
+        if isinstance(result, dict):
+            for key in ("task", "language"):
+                if key in result:
+                    merged.setdefault(key, result[key])
+            if isinstance(result.get("duration"), (int, float)):
+                merged["duration"] = max(merged.get("duration", 0.0), result["duration"])
+    if not segments:
+        merged["text"] = "\n".join(f"{label}: {text}" for label, text in zip(labels, texts) if text)
+        return merged
+
+    segments.sort(key=lambda s: (s.get("start", 0.0), s["channel"]))
+    for i, seg in enumerate(segments):
+        seg["id"] = i
+    turns: list[list] = []
+    for seg in segments:
+        text = str(seg.get("text", "")).strip()
+        if not text:
+            continue
+        if turns and turns[-1][0] == seg["speaker"]:
+            turns[-1][1].append(text)
+        else:
+            turns.append([seg["speaker"], [text]])
+    if response_format in ("srt", "vtt"):
+        merged["text"] = render_subtitles(segments, response_format)
+    else:
+        merged["text"] = "\n".join(f"{speaker}: {' '.join(parts)}" for speaker, parts in turns)
+    merged["segments"] = segments
+    if words:
+        words.sort(key=lambda w: (w.get("start", 0.0), w["channel"]))
+        merged["words"] = words
+    return merged